@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+菜谱提取性能基准
+
+对 recipe_new 中按固定种子抽取的样本以及 bench_fixtures 中的固定样例运行
+extract_recipe_info，统计吞吐量（文件/秒）、单文件延迟 p50/p99、进程峰值内存，
+以及各提取段（读取、建树、名称、描述、图片、食材……）的耗时分布。
+结果保存为JSON，可用 --compare 与之前的结果对比。
+"""
+
+import json
+import math
+import platform
+import random
+import resource
+import time
+from pathlib import Path
+from typing import Dict, List, Union
+
+import bs4
+
+from extract_recipe import ExtractStats, PARSER_BACKENDS, extract_recipe_info, load_html
+
+FIXTURE_DIR = Path(__file__).parent / "bench_fixtures"
+
+
+def sample_files(input_dir: Union[str, Path], sample_size: int, seed: int) -> List[Path]:
+    """按固定种子从目录中抽样，保证多次运行使用同一批文件"""
+    html_files = sorted(Path(input_dir).glob("*.htm*"))
+    if sample_size and sample_size < len(html_files):
+        html_files = sorted(random.Random(seed).sample(html_files, sample_size))
+    return html_files
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """最近秩法求百分位数"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def run_benchmark(html_files: List[Path], backend: str, repeat: int = 1) -> Dict:
+    """对给定文件运行提取并汇总各项指标（乱码文件跳过，不删除）"""
+    html_files = [
+        p for p in html_files
+        if load_html(p) is not None
+    ]
+    stats = ExtractStats()
+    latencies: List[float] = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for html_path in html_files:
+            t0 = time.perf_counter()
+            extract_recipe_info(html_path, backend, stats=stats)
+            latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+
+    runs = len(latencies) or 1
+    return {
+        "files": len(html_files),
+        "runs": len(latencies),
+        "elapsed_s": round(elapsed, 4),
+        "files_per_sec": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        # 各段平均每文件耗时
+        "sections_ms": {
+            name: round(total / runs * 1000, 3) for name, total in stats.sections.items()
+        },
+    }
+
+
+def print_result(label: str, result: Dict) -> None:
+    print(f"[{label}] {result['files']} 个文件 × {result['runs'] // max(result['files'], 1)} 轮")
+    print(
+        f"  吞吐: {result['files_per_sec']} 文件/秒 | "
+        f"p50: {result['p50_ms']} ms | p99: {result['p99_ms']} ms"
+    )
+    total = sum(result["sections_ms"].values()) or 1.0
+    for name, ms in result["sections_ms"].items():
+        print(f"  {name:<12} {ms:>8.3f} ms  {ms / total:6.1%}")
+
+
+def compare_results(base: Dict, current: Dict) -> None:
+    """打印两次结果的对比（当前 / 基线）"""
+    print(f"基线: {base['meta']['backend']} @ {base['meta']['timestamp']}")
+    print(f"当前: {current['meta']['backend']} @ {current['meta']['timestamp']}")
+    for label, result in current["results"].items():
+        old = base["results"].get(label)
+        if not old:
+            continue
+        print(f"[{label}]")
+        for key in ("files_per_sec", "p50_ms", "p99_ms"):
+            ratio = result[key] / old[key] if old[key] else 0.0
+            print(f"  {key:<14} {old[key]:>10} -> {result[key]:>10}  (x{ratio:.2f})")
+        for name, ms in result["sections_ms"].items():
+            old_ms = old["sections_ms"].get(name)
+            if old_ms:
+                print(f"  {name:<14} {old_ms:>10} -> {ms:>10}  (x{ms / old_ms:.2f})")
+    old_rss, rss = base["meta"]["peak_rss_kb"], current["meta"]["peak_rss_kb"]
+    print(f"峰值内存: {old_rss} KB -> {rss} KB")
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="菜谱提取性能基准")
+    parser.add_argument("--dir", "-d", default="recipe_new", help="样本来源目录（默认: recipe_new）")
+    parser.add_argument("--sample", "-n", type=int, default=500, help="抽样文件数，0 表示全部（默认: 500）")
+    parser.add_argument("--seed", type=int, default=20240601, help="抽样随机种子")
+    parser.add_argument("--repeat", "-r", type=int, default=1, help="每个文件重复提取的轮数（默认: 1）")
+    parser.add_argument("--backend", "-b", choices=PARSER_BACKENDS, default="bs4", help="HTML解析后端（默认: bs4）")
+    parser.add_argument("--out", "-o", help="将结果保存为JSON文件")
+    parser.add_argument("--compare", "-c", help="与之前保存的JSON结果对比")
+    args = parser.parse_args()
+
+    results = {}
+    if FIXTURE_DIR.exists():
+        results["fixtures"] = run_benchmark(sorted(FIXTURE_DIR.glob("*.htm*")), args.backend, args.repeat)
+        print_result("fixtures", results["fixtures"])
+    if Path(args.dir).exists():
+        results["sample"] = run_benchmark(sample_files(args.dir, args.sample, args.seed), args.backend, args.repeat)
+        print_result("sample", results["sample"])
+
+    report = {
+        "meta": {
+            "backend": args.backend,
+            "sample": args.sample,
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "bs4": bs4.__version__,
+            # Linux 下 ru_maxrss 单位为 KB
+            "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        },
+        "results": results,
+    }
+    print(f"峰值内存: {report['meta']['peak_rss_kb']} KB")
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"✓ 结果已保存到: {args.out}")
+    if args.compare:
+        compare_results(json.loads(Path(args.compare).read_text(encoding="utf-8")), report)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+分类页解析基准
+
+对比 get_html 中原有的 extract_recipe_links + find_next_page（各自建一棵树、
+多次全文档查找）与单次解析的 analyze_category_page，统计每页耗时并校验两者结果一致。
+
+分类页样本来自 get_html.LISTING_DIR 保存的页面；没有保存的分类页时，
+用 recipe_new 中的详情页代替（详情页没有分页链接，相当于下一页查找走完全部回退的最坏情况）。
+"""
+
+import logging
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import get_html
+from bench_extract import percentile, sample_files
+
+# 样本页面的 base_url，用于解析相对链接和 /page/N/ 回退
+DEFAULT_BASE_URL = "https://home.meishichina.com/recipe/liangcai/page/2/"
+
+
+def _legacy(html: str, base_url: str) -> Tuple[set, object]:
+    return get_html.extract_recipe_links(html, base_url), get_html.find_next_page(html, base_url)
+
+
+def _analyze_bs4(html: str, base_url: str) -> Tuple[set, object]:
+    parser = get_html.LexborHTMLParser
+    get_html.LexborHTMLParser = None
+    try:
+        return get_html.analyze_category_page(html, base_url)
+    finally:
+        get_html.LexborHTMLParser = parser
+
+
+def time_method(func: Callable, pages: List[str], base_url: str, repeat: int) -> Dict:
+    latencies: List[float] = []
+    for _ in range(repeat):
+        for html in pages:
+            t0 = time.perf_counter()
+            func(html, base_url)
+            latencies.append(time.perf_counter() - t0)
+    total = sum(latencies) or 1e-9
+    return {
+        "pages_per_sec": round(len(latencies) / total, 1),
+        "mean_ms": round(total / len(latencies) * 1000, 3),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="分类页解析基准")
+    parser.add_argument("--dir", "-d", help="保存的分类页目录（默认: get_html.LISTING_DIR，不存在时用 recipe_new 详情页代替）")
+    parser.add_argument("--sample", "-n", type=int, default=200, help="抽样页面数，0 表示全部（默认: 200）")
+    parser.add_argument("--seed", type=int, default=20240601, help="抽样随机种子")
+    parser.add_argument("--repeat", "-r", type=int, default=3, help="每个页面重复解析的轮数（默认: 3）")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL, help="页面的 base_url")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    source = Path(args.dir) if args.dir else get_html.LISTING_DIR
+    if source is None or not source.exists():
+        source = Path("recipe_new")
+        print("未找到保存的分类页，使用 recipe_new 中的详情页代替")
+    pages = [p.read_text(encoding="utf-8", errors="replace") for p in sample_files(source, args.sample, args.seed)]
+    if not pages:
+        raise SystemExit(f"✗ 没有可用的页面: {source}")
+
+    methods = {"legacy": _legacy, "analyze-bs4": _analyze_bs4}
+    if get_html.LexborHTMLParser is not None:
+        methods["analyze-lexbor"] = get_html.analyze_category_page
+
+    mismatches = {name: 0 for name in methods if name != "legacy"}
+    for html in pages:
+        expected = _legacy(html, args.base_url)
+        for name in mismatches:
+            if methods[name](html, args.base_url) != expected:
+                mismatches[name] += 1
+
+    print(f"{len(pages)} 个页面 × {args.repeat} 轮（{source}）")
+    baseline = None
+    for name, func in methods.items():
+        result = time_method(func, pages, args.base_url, args.repeat)
+        baseline = baseline or result["mean_ms"]
+        print(
+            f"  {name:<15} {result['pages_per_sec']:>9} 页/秒 | 平均 {result['mean_ms']} ms | "
+            f"p50 {result['p50_ms']} ms | p99 {result['p99_ms']} ms | x{baseline / result['mean_ms']:.1f}"
+        )
+    for name, count in mismatches.items():
+        print(f"{'✓' if not count else '✗'} {name} 与原实现不一致: {count} 个页面")
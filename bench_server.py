@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+本地菜谱查询服务压测
+
+默认在本进程内以随机端口启动 recipe_server（也可用 --url 压测已启动的服务），
+多个并发客户端各自保持一个长连接，在给定时长内循环发送混合请求
+（分页列表、分类筛选、搜索、详情、按现有食材推荐），
+统计每秒请求数、延迟 p50/p99 和各类请求的延迟，以及服务端响应缓存命中情况。
+"""
+
+import http.client
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+from urllib.parse import quote, urlsplit
+
+from bench_extract import percentile
+
+# 请求类型及其在混合负载中的权重
+REQUEST_MIX = (
+    ("list", 3),
+    ("category", 2),
+    ("search", 3),
+    ("detail", 3),
+    ("pantry", 1),
+)
+SEARCH_WORDS = ("鸡蛋", "土豆", "牛肉", "粥", "豆腐", "番茄", "排骨", "蛋糕", "鸡翅", "黄瓜", "土豆 牛肉", "红烧")
+PANTRY_WORDS = ("鸡蛋", "番茄", "土豆", "洋葱", "猪肉", "牛肉", "豆腐", "青椒", "大米", "面粉", "牛奶", "白糖")
+CATEGORIES = ("热菜", "凉菜", "汤羹", "主食", "小吃", "西餐", "烘焙", "饮品", "早餐", "家常菜")
+
+
+def make_target(kind: str, rng: random.Random, total: int) -> str:
+    """生成一个请求路径；页码和关键词集中在少数取值上，接近真实访问的分布"""
+    page = min(int(rng.paretovariate(1.5)), 50)
+    if kind == "list":
+        return f"/api/recipes?page={page}"
+    if kind == "category":
+        return f"/api/recipes?category={quote(rng.choice(CATEGORIES))}&page={page}"
+    if kind == "search":
+        return f"/api/search?q={quote(rng.choice(SEARCH_WORDS))}&page={min(page, 5)}"
+    if kind == "detail":
+        return f"/api/recipes/recipe_{rng.randrange(max(total, 1))}"
+    have = ",".join(rng.sample(PANTRY_WORDS, rng.randint(2, 4)))
+    return f"/api/pantry?have={quote(have)}&max_missing=3"
+
+
+def run_client(
+    host: str, port: int, deadline: float, total: int, seed: int, gzip: bool,
+    results: List[Tuple[str, float, int]], lock: threading.Lock,
+) -> None:
+    rng = random.Random(seed)
+    kinds = [kind for kind, weight in REQUEST_MIX for _ in range(weight)]
+    headers = {"Accept-Encoding": "gzip"} if gzip else {}
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    local: List[Tuple[str, float, int]] = []
+    while time.perf_counter() < deadline:
+        kind = rng.choice(kinds)
+        target = make_target(kind, rng, total)
+        t0 = time.perf_counter()
+        try:
+            conn.request("GET", target, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            status = 0
+        local.append((kind, time.perf_counter() - t0, status))
+    conn.close()
+    with lock:
+        results.extend(local)
+
+
+def fetch_json(host: str, port: int, path: str) -> dict:
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    conn.request("GET", path)
+    data = json.loads(conn.getresponse().read())
+    conn.close()
+    return data
+
+
+def load_test(host: str, port: int, concurrency: int, duration: float, seed: int, gzip: bool) -> Dict:
+    total = fetch_json(host, port, "/api/stats")["recipes"]
+    results: List[Tuple[str, float, int]] = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=run_client, args=(host, port, deadline, total, seed + i, gzip, results, lock))
+        for i in range(concurrency)
+    ]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    by_kind: Dict[str, List[float]] = defaultdict(list)
+    for kind, latency, _ in results:
+        by_kind[kind].append(latency)
+    latencies = [latency for _, latency, _ in results]
+    return {
+        "requests": len(results),
+        "errors": sum(1 for _, _, status in results if status != 200),
+        "rps": round(len(results) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "kinds": {
+            kind: {
+                "requests": len(values),
+                "p50_ms": round(percentile(values, 50) * 1000, 3),
+                "p99_ms": round(percentile(values, 99) * 1000, 3),
+            }
+            for kind, values in sorted(by_kind.items())
+        },
+        "server": fetch_json(host, port, "/api/stats"),
+    }
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="本地菜谱查询服务压测")
+    parser.add_argument("input", nargs="?", default="recipes_parsed.json", help="菜谱文件，在本进程内启动服务（默认: recipes_parsed.json）")
+    parser.add_argument("--url", help="压测已启动的服务，如 http://127.0.0.1:8765（指定后忽略 input）")
+    parser.add_argument("--concurrency", "-c", type=int, default=8, help="并发客户端数（默认: 8）")
+    parser.add_argument("--duration", "-t", type=float, default=10.0, help="压测时长（秒，默认: 10）")
+    parser.add_argument("--seed", type=int, default=20240601, help="请求序列的随机种子")
+    parser.add_argument("--cache-size", type=int, help="内置服务的响应缓存条数，0 表示关闭缓存")
+    parser.add_argument("--no-gzip", action="store_true", help="客户端不接受 gzip")
+    parser.add_argument("--out", "-o", help="将结果保存为JSON文件")
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        parts = urlsplit(args.url)
+        host, port = parts.hostname, parts.port or 80
+    else:
+        from recipe_server import CACHE_SIZE, RecipeIndex, make_server
+
+        index = RecipeIndex(args.input)
+        print(f"✓ 已加载 {len(index)} 条菜谱（{index.load_seconds:.2f} 秒）")
+        cache_size = CACHE_SIZE if args.cache_size is None else args.cache_size
+        server = make_server(index, port=0, cache_size=cache_size, quiet=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = server.server_address[:2]
+
+    report = load_test(host, port, args.concurrency, args.duration, args.seed, not args.no_gzip)
+    print(f"{args.concurrency} 个并发 × {args.duration:g} 秒：{report['requests']} 个请求，错误 {report['errors']} 个")
+    print(f"  吞吐: {report['rps']} 请求/秒 | p50: {report['p50_ms']} ms | p99: {report['p99_ms']} ms")
+    for kind, item in report["kinds"].items():
+        print(f"  {kind:<10} {item['requests']:>8} 个 | p50 {item['p50_ms']} ms | p99 {item['p99_ms']} ms")
+    cache = report["server"]["cache"]
+    lookups = cache["hits"] + cache["misses"]
+    print(f"  响应缓存: {cache['entries']} 条，命中率 {cache['hits'] / lookups:.1%}" if lookups else "  响应缓存: 未使用")
+
+    if server is not None:
+        server.shutdown()
+        server.server_close()
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"✓ 结果已保存到: {args.out}")
@@ -0,0 +1,314 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+菜谱HTML语料归档：把大量小HTML文件打包为一个数据文件加一个偏移索引
+
+- 数据文件 X.pack：逐个文档独立压缩（zlib，安装 zstandard 后可选 zstd）后顺序追加
+- 索引文件 X.pack.idx：每行一条 "文件名\\t菜谱ID\\t偏移\\t长度\\t压缩方式\\tsha1"，
+  长度为 -1 表示该文档已删除；同名文档以最后一行为准
+- 读取时对数据文件做 mmap，按偏移随机访问单个文档
+
+爬虫可以持续 append，extract_recipe.process_directory 可以直接以归档为输入。
+"""
+
+import hashlib
+import mmap
+import os
+import threading
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Union
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖，仅 zstd 压缩需要
+    zstandard = None
+
+ARCHIVE_SUFFIX = ".pack"
+INDEX_SUFFIX = ".idx"
+CODECS = ("zlib", "zstd", "raw")
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 10
+
+# 每个进程按路径缓存已打开的归档，供多进程解析时复用 mmap
+_OPEN_ARCHIVES: Dict[str, "CorpusArchive"] = {}
+
+
+def is_archive(path: Union[str, Path]) -> bool:
+    return Path(path).suffix == ARCHIVE_SUFFIX and Path(path).is_file()
+
+
+def compress(data: bytes, codec: str) -> bytes:
+    if codec == "zlib":
+        return zlib.compress(data, ZLIB_LEVEL)
+    if codec == "zstd":
+        if zstandard is None:
+            raise ImportError("zstd 压缩需要先安装: pip install zstandard")
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    if codec == "raw":
+        return data
+    raise ValueError(f"未知的压缩方式: {codec}")
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zlib":
+        return zlib.decompress(data)
+    if codec == "zstd":
+        if zstandard is None:
+            raise ImportError("zstd 解压需要先安装: pip install zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "raw":
+        return bytes(data)
+    raise ValueError(f"未知的压缩方式: {codec}")
+
+
+class ArchiveEntry(NamedTuple):
+    name: str
+    recipe_id: str
+    offset: int
+    length: int
+    codec: str
+    digest: str
+
+
+class ArchiveMember(NamedTuple):
+    """
+    归档中的单个文档，提供与 pathlib.Path 相同的 name/read_bytes/read_text/unlink，
+    以便与目录中的HTML文件走同一套处理流程；可被 pickle 传给子进程
+    """
+    archive: str
+    entry: ArchiveEntry
+
+    @property
+    def name(self) -> str:
+        return self.entry.name
+
+    def read_bytes(self) -> bytes:
+        return open_archive(self.archive).read_entry(self.entry)
+
+    def read_text(self, encoding: str = "utf-8", errors: str = "strict") -> str:
+        # 与文本模式 open() 一致，统一换行符
+        text = self.read_bytes().decode(encoding, errors)
+        return text.replace("\r\n", "\n").replace("\r", "\n")
+
+    def unlink(self, missing_ok: bool = False) -> None:
+        open_archive(self.archive).delete(self.name)
+
+
+def open_archive(path: Union[str, Path]) -> "CorpusArchive":
+    """打开（或复用本进程已打开的）归档"""
+    key = str(Path(path).resolve())
+    if key not in _OPEN_ARCHIVES:
+        _OPEN_ARCHIVES[key] = CorpusArchive(key)
+    return _OPEN_ARCHIVES[key]
+
+
+class CorpusArchive:
+    """可追加、可随机读取的HTML语料归档"""
+
+    def __init__(self, path: Union[str, Path], codec: str = "zlib"):
+        if codec not in CODECS:
+            raise ValueError(f"未知的压缩方式: {codec}")
+        self.path = Path(path)
+        self.index_path = self.path.with_name(self.path.name + INDEX_SUFFIX)
+        self.codec = codec
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.touch(exist_ok=True)
+        self.index_path.touch(exist_ok=True)
+        self._entries: Dict[str, ArchiveEntry] = {}
+        self._by_id: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._mm: Optional[mmap.mmap] = None
+        self._data = open(self.path, "rb")
+        self._load_index()
+
+    def _load_index(self) -> None:
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.rstrip("\n").split("\t")
+                if len(parts) != 6:
+                    # 追加中断留下的残缺行
+                    continue
+                self._apply(ArchiveEntry(parts[0], parts[1], int(parts[2]), int(parts[3]), parts[4], parts[5]))
+
+    def _apply(self, entry: ArchiveEntry) -> None:
+        if entry.length < 0:
+            old = self._entries.pop(entry.name, None)
+            if old is not None and self._by_id.get(old.recipe_id) == entry.name:
+                del self._by_id[old.recipe_id]
+            return
+        self._entries[entry.name] = entry
+        if entry.recipe_id:
+            self._by_id[entry.recipe_id] = entry.name
+
+    def _write_index(self, entry: ArchiveEntry) -> None:
+        line = "\t".join(str(v) for v in entry) + "\n"
+        # 追加模式下单次 write 一行；索引只应由一个进程写入（并行提取时由主进程隔离乱码）
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            f.write(line)
+        self._apply(entry)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._entries
+
+    def names(self) -> List[str]:
+        return sorted(self._entries)
+
+    def members(self) -> List[ArchiveMember]:
+        """按文件名排序的全部文档，与 sorted(目录.glob()) 的顺序一致"""
+        archive = str(self.path.resolve())
+        return [ArchiveMember(archive, self._entries[name]) for name in self.names()]
+
+    def name_for_id(self, recipe_id: str) -> Optional[str]:
+        return self._by_id.get(recipe_id)
+
+    def append(self, name: str, data: bytes, recipe_id: str = "") -> ArchiveEntry:
+        """追加一个文档（同名文档会被覆盖），先写数据再写索引，中断时不会留下指向残缺数据的索引"""
+        payload = compress(data, self.codec)
+        digest = hashlib.sha1(data).hexdigest()
+        with self._lock:
+            with open(self.path, "ab") as f:
+                offset = f.seek(0, 2)
+                f.write(payload)
+            entry = ArchiveEntry(name, recipe_id, offset, len(payload), self.codec, digest)
+            self._write_index(entry)
+        return entry
+
+    def delete(self, name: str) -> None:
+        """写入删除标记；数据本身保留在文件中，直到 compact"""
+        with self._lock:
+            if name in self._entries:
+                self._write_index(ArchiveEntry(name, "", 0, -1, "", ""))
+
+    def compact(self) -> int:
+        """重写数据文件和索引，只保留有效文档，回收删除和覆盖留下的空间，返回回收的字节数"""
+        with self._lock:
+            old_size = self.path.stat().st_size
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            tmp_index = self.index_path.with_name(self.index_path.name + ".tmp")
+            entries: Dict[str, ArchiveEntry] = {}
+            with open(self.path, "rb") as src, open(tmp_path, "wb") as dst:
+                for name in sorted(self._entries):
+                    entry = self._entries[name]
+                    src.seek(entry.offset)
+                    entries[name] = entry._replace(offset=dst.tell())
+                    dst.write(src.read(entry.length))
+            with open(tmp_index, "w", encoding="utf-8") as f:
+                for entry in entries.values():
+                    f.write("\t".join(str(v) for v in entry) + "\n")
+            if self._mm is not None:
+                self._mm.close()
+                self._mm = None
+            self._data.close()
+            os.replace(tmp_path, self.path)
+            os.replace(tmp_index, self.index_path)
+            self._data = open(self.path, "rb")
+            self._entries = entries
+            return old_size - self.path.stat().st_size
+
+    def read_entry(self, entry: ArchiveEntry) -> bytes:
+        end = entry.offset + entry.length
+        if self._mm is None or end > len(self._mm):
+            # 首次读取或文件在打开后被追加，重新映射
+            with self._lock:
+                if self._mm is not None:
+                    self._mm.close()
+                self._mm = mmap.mmap(self._data.fileno(), 0, access=mmap.ACCESS_READ)
+        return decompress(self._mm[entry.offset:end], entry.codec)
+
+    def read(self, name: str) -> bytes:
+        return self.read_entry(self._entries[name])
+
+    def read_by_id(self, recipe_id: str) -> bytes:
+        return self.read(self._by_id[recipe_id])
+
+    def iter_documents(self) -> Iterator[tuple]:
+        """按文件名顺序产出 (文件名, 原始HTML字节)"""
+        for name in self.names():
+            yield name, self.read(name)
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._data.close()
+        _OPEN_ARCHIVES.pop(str(self.path.resolve()), None)
+
+
+def pack_directory(input_dir: Union[str, Path], archive_path: Union[str, Path], codec: str = "zlib") -> int:
+    """把目录中的HTML文件追加进归档（已存在的同名文档跳过），返回新增数量"""
+    archive = CorpusArchive(archive_path, codec)
+    added = 0
+    raw_size = 0
+    for html_path in sorted(Path(input_dir).glob("*.htm*")):
+        if html_path.name in archive:
+            continue
+        data = html_path.read_bytes()
+        archive.append(html_path.name, data)
+        raw_size += len(data)
+        added += 1
+    packed_size = archive.path.stat().st_size
+    archive.close()
+    print(f"✓ 新增 {added} 个文档（原始 {raw_size / 1e6:.1f} MB），归档大小 {packed_size / 1e6:.1f} MB -> {archive_path}")
+    return added
+
+
+def unpack_archive(archive_path: Union[str, Path], output_dir: Union[str, Path]) -> int:
+    """把归档还原为目录中的HTML文件，返回文件数量"""
+    archive = CorpusArchive(archive_path)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    count = 0
+    for name, data in archive.iter_documents():
+        (output_dir / name).write_bytes(data)
+        count += 1
+    archive.close()
+    print(f"✓ 已还原 {count} 个文档 -> {output_dir}")
+    return count
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="菜谱HTML语料归档")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_pack = sub.add_parser("pack", help="把目录中的HTML追加进归档")
+    p_pack.add_argument("input_dir")
+    p_pack.add_argument("archive")
+    p_pack.add_argument("--codec", choices=CODECS, default="zlib", help="压缩方式（默认: zlib）")
+    p_unpack = sub.add_parser("unpack", help="把归档还原为HTML文件")
+    p_unpack.add_argument("archive")
+    p_unpack.add_argument("output_dir")
+    p_compact = sub.add_parser("compact", help="回收已删除或被覆盖文档占用的空间")
+    p_compact.add_argument("archive")
+    p_list = sub.add_parser("list", help="列出归档中的文档")
+    p_list.add_argument("archive")
+    p_get = sub.add_parser("get", help="输出单个文档（按文件名或菜谱ID）")
+    p_get.add_argument("archive")
+    p_get.add_argument("key")
+    args = parser.parse_args()
+
+    if args.command == "pack":
+        pack_directory(args.input_dir, args.archive, args.codec)
+    elif args.command == "unpack":
+        unpack_archive(args.archive, args.output_dir)
+    elif args.command == "compact":
+        freed = CorpusArchive(args.archive).compact()
+        print(f"✓ 已回收 {freed / 1e6:.1f} MB")
+    elif args.command == "list":
+        corpus = CorpusArchive(args.archive)
+        for member in corpus.members():
+            entry = member.entry
+            print(f"{entry.name}\t{entry.recipe_id}\t{entry.length}\t{entry.codec}")
+        print(f"共 {len(corpus)} 个文档")
+    else:
+        import sys
+
+        corpus = CorpusArchive(args.archive)
+        name = args.key if args.key in corpus else corpus.name_for_id(args.key)
+        if name is None:
+            raise SystemExit(f"未找到文档: {args.key}")
+        sys.stdout.buffer.write(corpus.read(name))
@@ -0,0 +1,435 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+爬虫的持久化状态（SQLite），中断后重新运行可从断点继续
+
+- seen：已保存的菜谱ID及其文件名（ID -> 文件映射）
+- frontier：已入队的详情页URL及状态（pending/done/failed）和失败次数，重启时未完成的URL
+  以及失败未满 MAX_ATTEMPTS 次的URL重新入队
+- pages：每个分类最后一个已处理完的分页，重启时从下一页继续（按ID区间遍历时记录最后入队的ID）
+- dead：返回 404/410 或被重定向走的失效ID，不再重试
+- validators：每个已保存ID的 ETag、Last-Modified 和内容哈希，供条件请求刷新使用
+- meta：下一个可用的文件序号等
+
+已保存ID同时保存在内存集合中，去重检查为 O(1)；写操作攒批提交，
+每 COMMIT_EVERY 次写入或 COMMIT_INTERVAL 秒提交一次。
+
+分片抓取时每个分片使用自己的状态库，文件序号按分片交错分配（第 k 片只分配 ≡ k mod n 的序号），
+按分类遍历时多个分片之间的去重由 ClaimDir 在共享目录中原子认领ID完成；结束后用 merge_from（或 --merge）
+合并回主状态库，get_html --processes 在全部分片结束后自动合并。
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, List, Optional, Set, Tuple, Union
+
+COMMIT_EVERY = 200
+COMMIT_INTERVAL = 5.0
+# 详情页最多尝试的次数（跨多次运行累计），用完后不再自动重试
+MAX_ATTEMPTS = 3
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+
+def _id_key(recipe_id: str) -> Union[int, str]:
+    # 菜谱ID均为数字，按 int 存放在内存集合中，百万级ID时内存占用远小于 str
+    return int(recipe_id) if recipe_id.isdigit() else recipe_id
+
+
+class CrawlState:
+    """可在多个线程间共享的爬虫状态，所有数据库操作串行执行"""
+
+    def __init__(self, db_file: Union[str, Path], index_stride: int = 1, index_offset: int = 0):
+        self.db_file = Path(db_file)
+        # 只分配 ≡ index_offset (mod index_stride) 的序号，分片之间不会冲突
+        self.index_stride = index_stride
+        self.index_offset = index_offset
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_file), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen (recipe_id TEXT PRIMARY KEY, file TEXT, url TEXT, saved_at REAL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS frontier ("
+            "url TEXT PRIMARY KEY, recipe_id TEXT, category TEXT, status TEXT, attempts INTEGER, updated REAL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS frontier_status ON frontier (status)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages (category TEXT PRIMARY KEY, last_page INTEGER, next_url TEXT)"
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS dead (recipe_id TEXT PRIMARY KEY, status INTEGER, checked_at REAL)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS validators ("
+            "recipe_id TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, digest TEXT, checked_at REAL)"
+        )
+        self.conn.commit()
+        self._lock = threading.Lock()
+        self._dirty = 0
+        self._last_commit = time.monotonic()
+        self._seen = {_id_key(rid) for (rid,) in self.conn.execute("SELECT recipe_id FROM seen")}
+        self._dead = {_id_key(rid) for (rid,) in self.conn.execute("SELECT recipe_id FROM dead")}
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'next_index'").fetchone()
+        self._next_index = self._align(int(row[0]) if row else 1)
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def _wrote(self, n: int = 1) -> None:
+        """记录写入次数，达到批量阈值或间隔时提交（调用方已持有锁）"""
+        self._dirty += n
+        if self._dirty >= COMMIT_EVERY or time.monotonic() - self._last_commit >= COMMIT_INTERVAL:
+            self.conn.commit()
+            self._dirty = 0
+            self._last_commit = time.monotonic()
+
+    def flush(self) -> None:
+        with self._lock:
+            self.conn.commit()
+            self._dirty = 0
+            self._last_commit = time.monotonic()
+
+    def close(self) -> None:
+        self.flush()
+        self.conn.close()
+
+    def __enter__(self) -> "CrawlState":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ---- 已保存ID ----
+
+    def is_seen(self, recipe_id: str) -> bool:
+        return _id_key(recipe_id) in self._seen
+
+    def import_seen_ids(self, recipe_ids: Iterable[str]) -> int:
+        """导入旧版 seen_ids.txt 中的ID（没有文件映射），返回新增数量"""
+        with self._lock:
+            new = [rid for rid in recipe_ids if _id_key(rid) not in self._seen]
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO seen (recipe_id, file, url, saved_at) VALUES (?, NULL, NULL, ?)",
+                [(rid, time.time()) for rid in new],
+            )
+            self._seen.update(_id_key(rid) for rid in new)
+            self.conn.commit()
+        return len(new)
+
+    def hold(self, recipe_id: str) -> None:
+        """已抓取、等待确认保存的ID：只在本次运行的内存中视为已保存，不写入状态库"""
+        with self._lock:
+            self._seen.add(_id_key(recipe_id))
+
+    def release(self, recipe_id: str) -> None:
+        """撤销 hold（保存失败），之后可以重新入队"""
+        with self._lock:
+            self._seen.discard(_id_key(recipe_id))
+
+    def mark_saved(self, recipe_id: str, file_name: Optional[str], url: str) -> None:
+        """记录已保存的ID；file_name 为 None 表示原始HTML未落盘（如只保留提取结果）"""
+        with self._lock:
+            now = time.time()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO seen (recipe_id, file, url, saved_at) VALUES (?, ?, ?, ?)",
+                (recipe_id, file_name, url, now),
+            )
+            self.conn.execute(
+                "UPDATE frontier SET status = ?, updated = ? WHERE url = ?", (DONE, now, url)
+            )
+            self._seen.add(_id_key(recipe_id))
+            self._wrote(2)
+
+    def file_for_id(self, recipe_id: str) -> Optional[str]:
+        with self._lock:
+            row = self.conn.execute("SELECT file FROM seen WHERE recipe_id = ?", (recipe_id,)).fetchone()
+        return row[0] if row else None
+
+    def unmapped_ids(self) -> List[str]:
+        """旧版 seen_ids.txt 导入的已保存ID：既没有文件映射也没有URL，文件可能仍在输出目录中"""
+        with self._lock:
+            return [
+                rid for (rid,) in self.conn.execute("SELECT recipe_id FROM seen WHERE file IS NULL AND url IS NULL")
+            ]
+
+    def extract_only_ids(self) -> List[str]:
+        """只保留了提取结果、原始HTML未落盘的已保存ID（有URL，没有文件映射）"""
+        with self._lock:
+            return [
+                rid for (rid,) in self.conn.execute("SELECT recipe_id FROM seen WHERE file IS NULL AND url IS NOT NULL")
+            ]
+
+    def mapped_files(self) -> Set[str]:
+        with self._lock:
+            return {name for (name,) in self.conn.execute("SELECT file FROM seen WHERE file IS NOT NULL")}
+
+    def set_file(self, recipe_id: str, file_name: str) -> None:
+        """为没有文件映射的已保存ID补上文件名"""
+        with self._lock:
+            self.conn.execute(
+                "UPDATE seen SET file = ? WHERE recipe_id = ? AND file IS NULL", (file_name, recipe_id)
+            )
+            self._wrote()
+
+    def saved_entries(self) -> List[Tuple[str, str, Optional[str]]]:
+        """所有有文件映射的已保存ID，返回 [(菜谱ID, 文件名, URL), ...]"""
+        with self._lock:
+            return self.conn.execute(
+                "SELECT recipe_id, file, url FROM seen WHERE file IS NOT NULL ORDER BY saved_at"
+            ).fetchall()
+
+    # ---- 条件请求 ----
+
+    def validators(self, recipe_id: str) -> Optional[Tuple[Optional[str], Optional[str], Optional[str]]]:
+        """返回 (ETag, Last-Modified, 内容哈希)，没有记录时返回 None"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT etag, last_modified, digest FROM validators WHERE recipe_id = ?", (recipe_id,)
+            ).fetchone()
+        return (row[0], row[1], row[2]) if row else None
+
+    def set_validators(
+        self, recipe_id: str, etag: Optional[str], last_modified: Optional[str], digest: Optional[str]
+    ) -> None:
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO validators (recipe_id, etag, last_modified, digest, checked_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (recipe_id, etag, last_modified, digest, time.time()),
+            )
+            self._wrote()
+
+    # ---- 失效ID ----
+
+    def is_dead(self, recipe_id: str) -> bool:
+        return _id_key(recipe_id) in self._dead
+
+    def mark_dead(self, recipe_id: str, status: int, url: str = "") -> None:
+        """记录失效ID（status 为 HTTP 状态码），同时把对应URL移出待抓取队列"""
+        with self._lock:
+            now = time.time()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO dead (recipe_id, status, checked_at) VALUES (?, ?, ?)",
+                (recipe_id, status, now),
+            )
+            if url:
+                self.conn.execute(
+                    "UPDATE frontier SET status = ?, updated = ? WHERE url = ?", (DONE, now, url)
+                )
+            self._dead.add(_id_key(recipe_id))
+            self._wrote(2)
+
+    # ---- 文件序号 ----
+
+    def _align(self, index: int) -> int:
+        """不小于 index 且属于本分片的最小序号"""
+        return index + (self.index_offset - index) % self.index_stride
+
+    def reserve_index(self, at_least: int = 1) -> None:
+        """保证之后分配的序号不小于 at_least（用于与已有文件对齐）"""
+        with self._lock:
+            self._next_index = self._align(max(self._next_index, at_least))
+
+    def allocate_index(self, durable: bool = False) -> int:
+        """
+        分配一个新的文件序号；崩溃时尚未提交的序号由启动时 reserve_index 按已有文件补齐。
+        序号不对应落盘文件时（如只保留提取结果）无从补齐，durable=True 在返回前立即提交
+        """
+        with self._lock:
+            index = self._next_index
+            self._next_index += self.index_stride
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('next_index', ?)", (str(self._next_index),)
+            )
+            if durable:
+                self.conn.commit()
+                self._dirty = 0
+                self._last_commit = time.monotonic()
+            else:
+                self._wrote()
+        return index
+
+    # ---- 待抓取队列 ----
+
+    def add_frontier(self, url: str, recipe_id: str, category: str = "") -> None:
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO frontier (url, recipe_id, category, status, attempts, updated) "
+                "VALUES (?, ?, ?, ?, 0, ?) "
+                "ON CONFLICT (url) DO UPDATE SET status = excluded.status, updated = excluded.updated",
+                (url, recipe_id, category, PENDING, time.time()),
+            )
+            self._wrote()
+
+    def mark_failed(self, url: str) -> None:
+        with self._lock:
+            self.conn.execute(
+                "UPDATE frontier SET status = ?, attempts = attempts + 1, updated = ? WHERE url = ?",
+                (FAILED, time.time(), url),
+            )
+            self._wrote()
+
+    def pending_urls(self, max_attempts: int = MAX_ATTEMPTS) -> List[str]:
+        """
+        需要（重新）抓取的URL：上次运行中已入队但未完成的，以及失败次数少于 max_attempts 的；
+        后者所在的分类页已记为完成，不重新入队的话网络抖动导致的失败会永久丢失该菜谱
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT url FROM frontier WHERE status = ? OR (status = ? AND attempts < ?) ORDER BY updated",
+                (PENDING, FAILED, max_attempts),
+            ).fetchall()
+        return [url for (url,) in rows]
+
+    # ---- 分类分页进度 ----
+
+    def mark_page(self, category: str, page: int, next_url: Optional[str]) -> None:
+        """记录分类中已处理完（链接均已入队）的分页，以及下一页URL（无下一页时为 None）"""
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages (category, last_page, next_url) VALUES (?, ?, ?)",
+                (category, page, next_url),
+            )
+            self._wrote()
+
+    def page_progress(self, category: str) -> Optional[Tuple[int, Optional[str]]]:
+        """返回 (最后完成的页码, 下一页URL)，从未抓取过该分类时返回 None"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT last_page, next_url FROM pages WHERE category = ?", (category,)
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def reset_pages(self) -> None:
+        """清空分页进度，下次从每个分类的起始页重新遍历（已保存ID仍然保留）"""
+        with self._lock:
+            self.conn.execute("DELETE FROM pages")
+            self.conn.commit()
+
+    def merge_from(self, other_db: Union[str, Path]) -> int:
+        """
+        把另一个状态库（如分片状态库）中的已保存ID、失效ID和校验信息并入本库，返回新增的已保存ID数量
+        同一ID两边都有时优先保留非空的文件名和URL：分片启动时从主库导入的ID没有文件映射，
+        不能覆盖主库中的映射；分片中新保存的映射则补上主库中缺失的
+        """
+        with self._lock:
+            before = len(self._seen)
+            self.conn.commit()
+            self.conn.execute("ATTACH DATABASE ? AS other", (str(other_db),))
+            self.conn.execute(
+                "INSERT INTO seen (recipe_id, file, url, saved_at) "
+                "SELECT recipe_id, file, url, saved_at FROM other.seen WHERE true "
+                "ON CONFLICT (recipe_id) DO UPDATE SET "
+                "saved_at = CASE WHEN excluded.file IS NOT NULL THEN excluded.saved_at ELSE seen.saved_at END, "
+                "file = COALESCE(excluded.file, seen.file), "
+                "url = COALESCE(excluded.url, seen.url)"
+            )
+            self.conn.execute("INSERT OR IGNORE INTO dead SELECT * FROM other.dead")
+            self.conn.execute("INSERT OR REPLACE INTO validators SELECT * FROM other.validators")
+            row = self.conn.execute("SELECT value FROM other.meta WHERE key = 'next_index'").fetchone()
+            self.conn.commit()
+            self.conn.execute("DETACH DATABASE other")
+            if row:
+                self._next_index = self._align(max(self._next_index, int(row[0])))
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('next_index', ?)", (str(self._next_index),)
+                )
+            self._seen = {_id_key(rid) for (rid,) in self.conn.execute("SELECT recipe_id FROM seen")}
+            self._dead = {_id_key(rid) for (rid,) in self.conn.execute("SELECT recipe_id FROM dead")}
+            self.conn.commit()
+            return len(self._seen) - before
+
+    def counts(self) -> dict:
+        with self._lock:
+            frontier = dict(self.conn.execute("SELECT status, COUNT(*) FROM frontier GROUP BY status"))
+            pages = self.conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+        return {
+            "seen": len(self._seen),
+            "dead": len(self._dead),
+            "frontier": frontier,
+            "categories": pages,
+            "next_index": self._next_index,
+        }
+
+
+class ClaimDir:
+    """
+    多个爬虫进程（或共享同一目录的多台机器）之间的菜谱ID认领
+    每个ID对应目录中的一个认领文件，内容为认领者：先写好临时文件，再以 os.link 原子地链接为认领文件
+    （目标已存在时失败），不会留下内容为空的认领文件；
+    创建成功或文件已由自己认领时返回 True，分片重启后仍归原分片；抓取失败时 release 放弃认领，
+    其他分片之后可以重新认领。按ID区间遍历时各分片的ID本就不相交，无需认领
+    """
+
+    def __init__(self, root: Union[str, Path], owner: str):
+        self.root = Path(root)
+        self.owner = owner
+        self._dirs = set()
+
+    def _path(self, recipe_id: str) -> Path:
+        # 按ID分桶，避免单个目录下文件过多
+        bucket = str(int(recipe_id) // 10000) if recipe_id.isdigit() else "_"
+        return self.root / bucket / recipe_id
+
+    def _owner_of(self, path: Path) -> Optional[str]:
+        try:
+            return path.read_text(encoding="utf-8")
+        except OSError:
+            return None
+
+    def claim(self, recipe_id: str) -> bool:
+        path = self._path(recipe_id)
+        if path.parent not in self._dirs:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._dirs.add(path.parent)
+        tmp_path = path.with_name(f".{recipe_id}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_text(self.owner, encoding="utf-8")
+        try:
+            os.link(tmp_path, path)
+        except FileExistsError:
+            return self._owner_of(path) == self.owner
+        finally:
+            tmp_path.unlink()
+        return True
+
+    def release(self, recipe_id: str) -> None:
+        """放弃自己持有的认领（如抓取失败），其他分片之后可以重新认领"""
+        path = self._path(recipe_id)
+        if self._owner_of(path) == self.owner:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="查看或重置爬虫状态")
+    parser.add_argument("db_file", help="状态数据库文件")
+    parser.add_argument("--reset-pages", action="store_true", help="清空分页进度，下次从起始页重新遍历")
+    parser.add_argument("--id", help="查询菜谱ID对应的文件")
+    parser.add_argument("--merge", nargs="+", metavar="SHARD_DB", help="把分片状态库合并进该状态库")
+    args = parser.parse_args()
+
+    state = CrawlState(args.db_file)
+    for shard_db in args.merge or []:
+        if not Path(shard_db).is_file():
+            print(f"✗ 分片状态库不存在: {shard_db}")
+            continue
+        print(f"✓ 已合并 {shard_db}，新增已保存ID {state.merge_from(shard_db)} 个")
+    if args.reset_pages:
+        state.reset_pages()
+        print("✓ 已清空分页进度")
+    if args.id:
+        print(state.file_for_id(args.id) or f"✗ 未找到ID: {args.id}")
+    print(json.dumps(state.counts(), ensure_ascii=False, indent=2))
+    state.close()
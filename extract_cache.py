@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+菜谱提取结果的持久化缓存（SQLite）
+
+以文件路径（或归档中的文档）为键，记录文件大小、修改时间和内容哈希：
+- 大小与修改时间均未变化时直接命中，无需读取文件
+- 否则计算内容哈希，哈希一致仍视为命中，仅更新文件状态
+- 提取器版本变化时整个缓存失效
+
+未命中的文件由解析方在读取时一并取得文件状态和内容哈希（snapshot），写入时不再重读文件。
+
+每 COMMIT_EVERY 次写入提交一次，运行中断时只丢失最后一批未提交的结果。
+"""
+
+import hashlib
+import json
+import sqlite3
+from pathlib import Path
+from typing import Callable, Iterable, Optional, Tuple, Union
+
+from corpus_archive import ArchiveMember
+
+COMMIT_EVERY = 200
+
+
+def file_digest(data: bytes) -> str:
+    """计算HTML内容哈希"""
+    return hashlib.sha1(data).hexdigest()
+
+
+class ExtractionCache:
+    """提取结果缓存，hits/misses 统计本次运行的命中情况"""
+
+    def __init__(self, db_file: Union[str, Path], version: str):
+        self.db_file = Path(db_file)
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_file))
+        self.hits = 0
+        self.misses = 0
+        self._dirty = 0
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, digest TEXT, record TEXT)"
+        )
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is None or row[0] != version:
+            # 提取器版本变化，旧结果全部作废
+            self.conn.execute("DELETE FROM entries")
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (version,))
+            self.conn.commit()
+
+    @staticmethod
+    def _key(source: Union[Path, ArchiveMember]) -> str:
+        """缓存键，不访问文件（文件可能已被隔离移走）"""
+        if isinstance(source, ArchiveMember):
+            return f"{source.archive}::{source.entry.name}"
+        return str(source.resolve())
+
+    @staticmethod
+    def snapshot(source: Union[Path, ArchiveMember]) -> Tuple[Optional[bytes], Tuple[int, int, str]]:
+        """
+        读取内容并返回 (内容, (大小, 修改时间, 内容哈希))，供 put 直接使用；
+        先取文件状态再读内容，文件在两者之间被改写时下次只会多解析一次而不会误命中。
+        归档成员的状态和哈希取自索引，不读取内容（返回 None，由解析方照常读取）
+        """
+        if isinstance(source, ArchiveMember):
+            entry = source.entry
+            return None, (entry.length, entry.offset, entry.digest)
+        stat = source.stat()
+        data = source.read_bytes()
+        return data, (stat.st_size, stat.st_mtime_ns, file_digest(data))
+
+    @staticmethod
+    def _signature(source: Union[Path, ArchiveMember]) -> Tuple[str, int, int, Callable[[], str]]:
+        """
+        返回 (键, 大小, 修改时间, 取内容哈希的函数)
+        归档成员以 "归档路径::文件名" 为键，用压缩后长度和偏移代替大小和修改时间，哈希直接取自索引
+        """
+        key = ExtractionCache._key(source)
+        if isinstance(source, ArchiveMember):
+            entry = source.entry
+            return key, entry.length, entry.offset, lambda: entry.digest
+        stat = source.stat()
+        return key, stat.st_size, stat.st_mtime_ns, lambda: file_digest(source.read_bytes())
+
+    def get(self, html_path: Union[Path, ArchiveMember]) -> Optional[dict]:
+        """查询缓存，命中返回菜谱记录，未命中返回 None"""
+        key, cur_size, cur_mtime_ns, digest_of = self._signature(html_path)
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, digest, record FROM entries WHERE path = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        size, mtime_ns, digest, record = row
+        if (cur_size, cur_mtime_ns) != (size, mtime_ns):
+            if digest_of() != digest:
+                self.misses += 1
+                return None
+            # 内容未变（如被重新拷贝），只刷新文件状态
+            self.conn.execute(
+                "UPDATE entries SET size = ?, mtime_ns = ? WHERE path = ?",
+                (cur_size, cur_mtime_ns, key),
+            )
+        self.hits += 1
+        return json.loads(record)
+
+    def put(
+        self,
+        html_path: Union[Path, ArchiveMember],
+        recipe: dict,
+        signature: Optional[Tuple[int, int, str]] = None,
+    ) -> None:
+        """写入（或覆盖）一条提取结果；signature 为解析时 snapshot 取得的 (大小, 修改时间, 哈希)，缺省时现取"""
+        if signature is None:
+            _, size, mtime_ns, digest_of = self._signature(html_path)
+            signature = (size, mtime_ns, digest_of())
+        self.conn.execute(
+            "INSERT OR REPLACE INTO entries (path, size, mtime_ns, digest, record) VALUES (?, ?, ?, ?, ?)",
+            (self._key(html_path), *signature, json.dumps(recipe, ensure_ascii=False)),
+        )
+        self._dirty += 1
+        if self._dirty >= COMMIT_EVERY:
+            self.flush()
+
+    def prune(self, input_dir: Path, html_files: Iterable[Union[Path, ArchiveMember]]) -> int:
+        """删除 input_dir（目录或归档）下已不存在于 html_files 中的缓存条目，返回删除数量"""
+        if input_dir.is_file():
+            prefix = f"{input_dir.resolve()}::"
+        else:
+            prefix = str(input_dir.resolve() / "_")[:-1]
+        keep = {self._key(p) for p in html_files}
+        stale = [
+            (path,)
+            for (path,) in self.conn.execute("SELECT path FROM entries")
+            if path.startswith(prefix) and path not in keep
+        ]
+        self.conn.executemany("DELETE FROM entries WHERE path = ?", stale)
+        return len(stale)
+
+    def flush(self) -> None:
+        self.conn.commit()
+        self._dirty = 0
+
+    def close(self) -> None:
+        self.flush()
+        self.conn.close()
@@ -5,10 +5,47 @@
 """
 
 from bs4 import BeautifulSoup
+import heapq
 import json
+import os
 import re
+import shutil
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
-from typing import List, Tuple, Union
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from corpus_archive import ArchiveMember, is_archive, open_archive
+from extract_cache import ExtractionCache
+from recipe_stream import OUTPUT_FORMATS, RecipeWriter
+
+try:
+    from bs4.filter import ElementFilter
+except ImportError:  # bs4 < 4.13，scoped 后端不可用
+    ElementFilter = object
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # 可选依赖，仅 selectolax 后端需要
+    LexborHTMLParser = None
+
+PARSER_BACKENDS = ("bs4", "scoped", "selectolax")
+# scoped 后端需要建树的 div 区域（mo 为小窍门标题所在的父节点）
+_REGION_DIV_CLASSES = {'recipeCategory_sub_R', 'recipeStep', 'recipeTip', 'mo'}
+# 提取逻辑或输出字段变化时递增，使增量缓存失效
+EXTRACTOR_VERSION = "2"
+# 乱码判定阈值：'�' 数量达到 _GARBLED_MARKS，或长度不足 _SHORT_HTML_CHARS 且中文少于 _MIN_CJK_CHARS
+_GARBLED_MARKS = 5
+_SHORT_HTML_CHARS = 500
+_MIN_CJK_CHARS = 10
+_REPLACEMENT_BYTES = "�".encode("utf-8")
+_CJK_RE = re.compile(r"[\u4e00-\u9fff]")
+# 未指定隔离目录时，乱码文件移入输入目录下的该子目录
+QUARANTINE_DIRNAME = "quarantine"
+
 
 def is_garbled_html(html_text: str) -> bool:
     """
@@ -17,15 +54,95 @@ def is_garbled_html(html_text: str) -> bool:
     if not html_text:
         return True
     unknown_count = html_text.count("�")
-    if unknown_count >= 5:
+    if unknown_count >= _GARBLED_MARKS:
         return True
-    # 若缺乏明显中文且长度很短，也视为异常
-    chinese_count = len(re.findall(r"[\u4e00-\u9fff]", html_text))
-    if chinese_count < 10 and len(html_text) < 500:
+    # 若缺乏明显中文且长度很短，也视为异常；数到足够的中文即停止
+    if len(html_text) < _SHORT_HTML_CHARS:
+        for chinese_count, _ in enumerate(_CJK_RE.finditer(html_text), 1):
+            if chinese_count >= _MIN_CJK_CHARS:
+                return False
         return True
     return False
 
 
+def _decode_html(data: bytes, errors: str = "strict") -> str:
+    """按UTF-8解码，换行符处理与文本模式 open() 一致"""
+    return data.decode("utf-8", errors).replace("\r\n", "\n").replace("\r", "\n")
+
+
+def is_garbled_bytes(data: bytes) -> bool:
+    """
+    字节级乱码预检，对合法UTF-8内容与 is_garbled_html 的判定一致：
+    '�' 直接按其UTF-8编码查找，找够数量即停止；
+    每个字符最多4字节，足够长的内容必然不是"短文本"，无需解码统计中文
+    """
+    if not data:
+        return True
+    pos = -1
+    for _ in range(_GARBLED_MARKS):
+        pos = data.find(_REPLACEMENT_BYTES, pos + 1)
+        if pos < 0:
+            break
+    else:
+        return True
+    if len(data) >= _SHORT_HTML_CHARS * 4:
+        return False
+    return is_garbled_html(_decode_html(data, "ignore"))
+
+
+def load_html(html_file, stats: Optional["ExtractStats"] = None, data: Optional[bytes] = None) -> Optional[str]:
+    """
+    读取并预检HTML（文件只读一次）：先在字节层面检测乱码，通过后再解码为文本
+    乱码返回 None；含非法UTF-8字节但不属于乱码时抛出 UnicodeDecodeError，与按 utf-8 打开文件的行为一致
+    data 为调用方已读出的内容时不再读文件
+    """
+    if isinstance(html_file, str):
+        html_file = Path(html_file)
+    if data is None:
+        data = html_file.read_bytes()
+    if stats is not None:
+        stats.count('bytes_read', len(data))
+    html_content = decode_html_bytes(data)
+    if stats is not None:
+        stats.mark('read')
+    return html_content
+
+
+def decode_html_bytes(data: bytes) -> Optional[str]:
+    """
+    预检并解码内存中的HTML字节，乱码返回 None
+    含非法UTF-8字节但不属于乱码时抛出 UnicodeDecodeError
+    """
+    if is_garbled_bytes(data):
+        return None
+    try:
+        return _decode_html(data)
+    except UnicodeDecodeError:
+        # 非法字节：按忽略错误解码后的文本复查，仍不是乱码则照常报错
+        if not is_garbled_html(_decode_html(data, "ignore")):
+            raise
+        return None
+
+
+def default_quarantine_dir(input_dir: Path) -> Path:
+    """目录输入时为 目录/quarantine，归档输入时为 归档名.quarantine"""
+    if input_dir.is_file():
+        return input_dir.with_name(f"{input_dir.name}.{QUARANTINE_DIRNAME}")
+    return input_dir / QUARANTINE_DIRNAME
+
+
+def quarantine_html(html_path: Union[Path, ArchiveMember], quarantine_dir: Path) -> Path:
+    """把乱码文件移入隔离目录（归档成员则复制出内容并在归档中删除），误判时可直接移回"""
+    quarantine_dir.mkdir(parents=True, exist_ok=True)
+    target = quarantine_dir / html_path.name
+    if isinstance(html_path, ArchiveMember):
+        target.write_bytes(html_path.read_bytes())
+        html_path.unlink()
+    else:
+        shutil.move(str(html_path), str(target))
+    return target
+
+
 def split_quantity(q: str) -> Tuple[str, str]:
     """
     将数量拆分为(数量, 单位)，适量/少许等无单位
@@ -49,16 +166,161 @@ def split_quantity(q: str) -> Tuple[str, str]:
     return q, ""
 
 
-def extract_recipe_info(html_file):
-    """从HTML文件中提取菜谱信息"""
-    
-    with open(html_file, 'r', encoding='utf-8') as f:
-        html_content = f.read()
-    
-    soup = BeautifulSoup(html_content, 'html.parser')
-    
-    # 提取基本信息
-    recipe = {
+# 适量/少许等不定量的标记词，规范单位统一为 "适量"
+_VAGUE_WORDS = (
+    "适", "適", "少许", "小许", "少量", "些许", "若干", "随意", "一点", "一丢",
+    "几", "数", "酌", "按需", "看着", "自选", "根据", "足量", "大量", "可选", "可有", "可放", "或无", "或不",
+)
+VAGUE_UNIT = "适量"
+# 原始单位 -> (规范单位, 换算系数)；质量统一为克，体积统一为毫升，勺匙按大小归并；
+# 不在表中的计数量词（个、根、片……）本身即规范单位
+_UNIT_TABLE = {
+    "克": ("克", 1), "g": ("克", 1), "gram": ("克", 1), "kg": ("克", 1000),
+    "千克": ("克", 1000), "公斤": ("克", 1000), "斤": ("克", 500), "两": ("克", 50),
+    "毫升": ("毫升", 1), "ml": ("毫升", 1), "cc": ("毫升", 1), "l": ("毫升", 1000), "升": ("毫升", 1000),
+    "小勺": ("茶匙", 1), "小匙": ("茶匙", 1), "茶匙": ("茶匙", 1), "茶勺": ("茶匙", 1), "tsp": ("茶匙", 1),
+    "大勺": ("汤匙", 1), "大匙": ("汤匙", 1), "汤匙": ("汤匙", 1), "汤勺": ("汤匙", 1), "tbsp": ("汤匙", 1),
+    "勺": ("勺", 1), "匙": ("勺", 1), "勺子": ("勺", 1), "调羹": ("勺", 1),
+    "杯": ("杯", 1), "cup": ("杯", 1),
+}
+_CANONICAL_UNITS = {unit_id for unit_id, _ in _UNIT_TABLE.values()}
+_CN_DIGITS = {"零": 0, "一": 1, "二": 2, "两": 2, "俩": 2, "三": 3, "四": 4, "五": 5, "六": 6, "七": 7, "八": 8, "九": 9}
+# 全角数字、全角符号以及各种范围连接符统一为半角
+_QUANTITY_TRANS = str.maketrans({
+    **{chr(0xFF10 + i): str(i) for i in range(10)},
+    "．": ".", "／": "/", "～": "-", "~": "-", "〜": "-", "－": "-", "—": "-", "–": "-", "至": "-", "到": "-",
+})
+_NUM_PATTERN = r"\d+(?:\.\d+)?(?:/\d+(?:\.\d+)?)?|[零一二两俩三四五六七八九十百]+分之[零一二两俩三四五六七八九十百]+|[零一二两俩三四五六七八九十百]+|半"
+_QUANTITY_RE = re.compile(rf"^(?:大约|大概|约|各|共)?({_NUM_PATTERN})(?:-({_NUM_PATTERN}))?(.*)$")
+# 单位后的备注从这些字符处截断，如 "克（可选）"、"g(和面中)"
+_UNIT_NOTE_RE = re.compile(r"[(（\[【,，、;；:：/\s].*$")
+
+
+def _number_value(text: str) -> Optional[float]:
+    """把 "3.5"、"1/2"、"十五"、"三分之一"、"半" 转为数值，"三四" 这类连写取中值"""
+    if "分之" in text:
+        denominator, numerator = (_number_value(part) for part in text.split("分之", 1))
+        return numerator / denominator if denominator and numerator is not None else None
+    if text == "半":
+        return 0.5
+    if text[0].isdigit():
+        try:
+            if "/" in text:
+                numerator, denominator = text.split("/", 1)
+                return float(numerator) / float(denominator) if float(denominator) else None
+            return float(text)
+        except ValueError:
+            return None
+    if len(text) == 2 and all(ch in _CN_DIGITS for ch in text) and text[0] != text[1]:
+        return (_CN_DIGITS[text[0]] + _CN_DIGITS[text[1]]) / 2
+    total, current = 0, 0
+    for ch in text:
+        if ch == "十":
+            total += (current or 1) * 10
+            current = 0
+        elif ch == "百":
+            total += (current or 1) * 100
+            current = 0
+        else:
+            current = _CN_DIGITS[ch]
+    return float(total + current)
+
+
+def _normalize_unit(unit: str) -> Tuple[str, float]:
+    unit = _UNIT_NOTE_RE.sub("", unit)
+    # "十几个"、"10多克"、"300克左右" 之类的约数修饰
+    unit = unit.lstrip("几多余.").strip()
+    for suffix in ("左右", "上下", "以上", "以内", "多"):
+        if unit.endswith(suffix) and len(unit) > len(suffix):
+            unit = unit[:-len(suffix)]
+    key = unit.lower() if unit.isascii() else unit
+    return _UNIT_TABLE.get(key, (unit, 1))
+
+
+@lru_cache(maxsize=None)
+def parse_quantity(q: str) -> Tuple[str, str, Optional[float], str]:
+    """
+    解析食材用量，返回 (数量, 单位, 规范数值, 规范单位)
+    前两项与 split_quantity 一致；规范数值已换算到规范单位（如 "半斤" -> 250, "克"），
+    范围取中值，不定量或无法识别时为 None；同一原始字符串只解析一次
+    """
+    amount, unit = split_quantity(q)
+    text = (q or "").translate(_QUANTITY_TRANS).replace(" ", "")
+    if not text:
+        return amount, unit, None, ""
+    if not text[0].isdigit() and any(word in text for word in _VAGUE_WORDS):
+        return amount, unit, None, VAGUE_UNIT
+    if text.startswith("一半"):
+        text = "半" + text[2:]
+
+    match = _QUANTITY_RE.match(text)
+    if not match:
+        unit_id, _ = _normalize_unit(text)
+        return amount, unit, None, unit_id if unit_id in _CANONICAL_UNITS else ""
+    low = _number_value(match.group(1))
+    high = _number_value(match.group(2)) if match.group(2) else low
+    rest = match.group(3)
+    if low is None or high is None:
+        return amount, unit, None, _normalize_unit(rest)[0]
+    value = (low + high) / 2
+    # "一根半"、"1个半"
+    rest = _UNIT_NOTE_RE.sub("", rest)
+    if rest.endswith("半") and len(rest) > 1:
+        value += 0.5
+        rest = rest[:-1]
+    unit_id, factor = _normalize_unit(rest)
+    value = round(value * factor, 3)
+    return amount, unit, int(value) if value.is_integer() else value, unit_id
+
+
+class ExtractStats:
+    """
+    提取过程埋点：mark(name) 把距上次打点的时间计入 name 段，count(name, n) 累加计数器
+    未开启时各处改用空操作 _noop，几乎没有额外开销
+    """
+
+    def __init__(self):
+        self.sections: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self._last = time.perf_counter()
+
+    def begin(self) -> None:
+        self._last = time.perf_counter()
+
+    def mark(self, name: str) -> None:
+        now = time.perf_counter()
+        self.sections[name] = self.sections.get(name, 0.0) + now - self._last
+        self._last = now
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def merge(self, other: "ExtractStats") -> None:
+        """把另一份统计（如子进程返回的单文件统计）累加进来"""
+        for name, seconds in other.sections.items():
+            self.sections[name] = self.sections.get(name, 0.0) + seconds
+        for name, n in other.counters.items():
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    @property
+    def total_ms(self) -> float:
+        return sum(self.sections.values()) * 1000
+
+    def to_dict(self) -> dict:
+        return {
+            "total_ms": round(self.total_ms, 3),
+            "sections_ms": {name: round(seconds * 1000, 3) for name, seconds in self.sections.items()},
+            "counters": dict(self.counters),
+        }
+
+
+def _noop(*args) -> None:
+    """未开启埋点时使用的空操作"""
+
+
+def _empty_recipe() -> dict:
+    """菜谱记录的初始结构，各解析后端共用"""
+    return {
         'name': '',
         #'author': '',
         'description': '',
@@ -76,6 +338,108 @@ def extract_recipe_info(html_file):
         'tips': '',  # 小窍门
         'tools': '',  # 使用的厨具
     }
+
+
+def _collect_j_photo(script_text: str, cover_images: List[str]) -> bool:
+    """从脚本文本中的 J_photo 数组提取封面图片，追加到 cover_images；JSON 解析失败改用正则时返回 True"""
+    # 提取 J_photo 数组
+    if 'J_photo' in script_text and 'src' in script_text:
+        # 匹配 var J_photo = [{...}];
+        match = re.search(r'var\s+J_photo\s*=\s*(\[.*?\])', script_text, re.DOTALL)
+        if match:
+            json_str = match.group(1)
+            try:
+                images_data = json.loads(json_str)
+                for img_data in images_data:
+                    if isinstance(img_data, dict) and 'src' in img_data:
+                        img_url = img_data['src']
+                        if img_url not in cover_images:
+                            cover_images.append(img_url)
+            except json.JSONDecodeError:
+                # 如果JSON解析失败，尝试正则提取
+                img_urls = re.findall(r'"src"\s*:\s*"([^"]+)"', json_str)
+                for img_url in img_urls:
+                    if img_url not in cover_images:
+                        cover_images.append(img_url)
+                return True
+    return False
+
+
+def extract_recipe_info(html_file, backend: str = "bs4", stats: Optional[ExtractStats] = None):
+    """
+    从HTML文件（或归档中的文档）中提取菜谱信息，backend 可选 bs4（默认）、scoped 或 selectolax
+    提供 stats 时记录各段耗时（读取、建树及各提取步骤）和计数器
+    """
+    mark, count = (stats.mark, stats.count) if stats is not None else (_noop, _noop)
+    if stats is not None:
+        stats.begin()
+    
+    if isinstance(html_file, ArchiveMember):
+        html_content = html_file.read_text(encoding='utf-8')
+        # 归档中实际读取的是压缩后的数据
+        count('bytes_read', html_file.entry.length)
+    else:
+        with open(html_file, 'r', encoding='utf-8') as f:
+            html_content = f.read()
+            count('bytes_read', os.fstat(f.fileno()).st_size)
+    mark('read')
+    
+    return extract_recipe_from_html(html_content, backend, stats)
+
+
+def extract_recipe_from_html(html_content: str, backend: str = "bs4", stats: Optional[ExtractStats] = None):
+    """从HTML文本中提取菜谱信息"""
+    count = stats.count if stats is not None else _noop
+    if backend == "bs4":
+        recipe = _extract_with_bs4(html_content, stats=stats)
+    elif backend == "scoped":
+        recipe = _extract_with_bs4(html_content, scoped=True, stats=stats)
+    elif backend == "selectolax":
+        recipe = _extract_with_selectolax(html_content, stats=stats)
+    else:
+        raise ValueError(f"未知的解析后端: {backend}")
+    count('steps', len(recipe['steps']))
+    count('cover_images', len(recipe['cover_images']))
+    return recipe
+
+
+class _RecipeRegionFilter(ElementFilter):
+    """仅为菜谱相关区域建树的过滤器（只作用于顶层，区域内部的标签全部保留）"""
+
+    def allow_tag_creation(self, nsprefix, name, attrs) -> bool:
+        attrs = attrs or {}
+        classes = set((attrs.get('class') or '').split())
+        elem_id = attrs.get('id')
+        if name == 'div':
+            return elem_id in ('recipe_De_imgBox', 'path') or bool(classes & _REGION_DIV_CLASSES)
+        if name == 'fieldset':
+            return 'particulars' in classes
+        if name == 'h1':
+            return 'recipe_De_title' in classes
+        if name == 'input':
+            return elem_id == 'recipe_title'
+        if name == 'blockquote':
+            return elem_id == 'block_txt'
+        return name == 'script'
+
+    def allow_string_creation(self, string) -> bool:
+        return False
+
+
+def _extract_with_bs4(html_content: str, scoped: bool = False, stats: Optional[ExtractStats] = None) -> dict:
+    """
+    基于 BeautifulSoup(html.parser) 的提取实现
+    scoped=True 时只为相关区域建树，并省去步骤节点复制和小窍门的二次解析
+    """
+    mark, count = (stats.mark, stats.count) if stats is not None else (_noop, _noop)
+    if scoped:
+        if ElementFilter is object:
+            raise ImportError("scoped 后端需要 beautifulsoup4 >= 4.13")
+        soup = BeautifulSoup(html_content, 'html.parser', parse_only=_RecipeRegionFilter())
+    else:
+        soup = BeautifulSoup(html_content, 'html.parser')
+    recipe = _empty_recipe()
+    mark('parse')
     
     # 1. 提取菜谱名称
     title_elem = soup.find('h1', class_='recipe_De_title')
@@ -86,6 +450,7 @@ def extract_recipe_info(html_file):
     title_input = soup.find('input', {'id': 'recipe_title'})
     if title_input and title_input.get('value'):
         recipe['name'] = title_input.get('value')
+    mark('title')
     
     # # 2. 提取作者
     # author_elem = soup.find('span', {'id': 'recipe_username'})
@@ -106,6 +471,7 @@ def extract_recipe_info(html_file):
             # 移除引号和特殊字符
             desc_text = desc_text.replace('"', '').replace('"', '').replace('"', '').replace('"', '').strip()
             recipe['description'] = desc_text
+    mark('description')
     
     # 5. 提取封面图片
     img_box = soup.find('div', {'id': 'recipe_De_imgBox'})
@@ -126,26 +492,11 @@ def extract_recipe_info(html_file):
         if not script.string:
             continue
         script_text = script.string
+        count('scripts_scanned')
         
-        # 提取 J_photo 数组
-        if 'J_photo' in script_text and 'src' in script_text:
-            # 匹配 var J_photo = [{...}];
-            match = re.search(r'var\s+J_photo\s*=\s*(\[.*?\])', script_text, re.DOTALL)
-            if match:
-                json_str = match.group(1)
-                try:
-                    images_data = json.loads(json_str)
-                    for img_data in images_data:
-                        if isinstance(img_data, dict) and 'src' in img_data:
-                            img_url = img_data['src']
-                            if img_url not in recipe['cover_images']:
-                                recipe['cover_images'].append(img_url)
-                except json.JSONDecodeError:
-                    # 如果JSON解析失败，尝试正则提取
-                    img_urls = re.findall(r'"src"\s*:\s*"([^"]+)"', json_str)
-                    for img_url in img_urls:
-                        if img_url not in recipe['cover_images']:
-                            recipe['cover_images'].append(img_url)
+        if _collect_j_photo(script_text, recipe['cover_images']):
+            count('j_photo_regex_fallbacks')
+    mark('images')
     
     # 6. 提取食材（主料、辅料、调料）
     particulars = soup.find_all('fieldset', class_='particulars')
@@ -170,12 +521,14 @@ def extract_recipe_info(html_file):
                 # 提取数量并拆分
                 quantity_elem = li.find('span', class_='category_s2')
                 quantity_raw = quantity_elem.get_text(strip=True) if quantity_elem else ''
-                amount, unit = split_quantity(quantity_raw)
+                amount, unit, quantity, unit_id = parse_quantity(quantity_raw)
                 
                 ingredients.append({
                     'name': ingredient_name,
                     'amount': amount,
-                    'unit': unit
+                    'unit': unit,
+                    'quantity': quantity,
+                    'unit_id': unit_id
                 })
         
         if legend_text == '主料':
@@ -184,6 +537,7 @@ def extract_recipe_info(html_file):
             recipe['auxiliary_ingredients'] = ingredients
         elif legend_text == '调料':
             recipe['seasonings'] = ingredients
+    mark('ingredients')
     
     # 7. 提取口味、工艺、耗时、难度
     category_lists = soup.find_all('div', class_='recipeCategory_sub_R')
@@ -205,6 +559,7 @@ def extract_recipe_info(html_file):
                     recipe['time'] = value
                 elif label == '难度':
                     recipe['difficulty'] = value
+    mark('attributes')
     
     # 8. 提取分类
     category_links = soup.select('div.recipeTip.mt16 a[title]')
@@ -223,6 +578,7 @@ def extract_recipe_info(html_file):
             title = link.get('title', '')
             if title and title not in recipe['categories']:
                 recipe['categories'].append(title)
+    mark('categories')
     
     # 9. 提取烹饪步骤（包含图片）
     recipe_step_div = soup.find('div', class_='recipeStep')
@@ -235,7 +591,14 @@ def extract_recipe_info(html_file):
             step_num = step_num_elem.get_text(strip=True) if step_num_elem else ''
             step_text = ''
             
-            if step_text_elem:
+            if step_text_elem and scoped:
+                # 取文本时跳过步骤编号子树，无需复制节点
+                grey_div = step_text_elem.find('div', class_='grey')
+                skipped = set(map(id, grey_div.descendants)) if grey_div else set()
+                step_text = ''.join(
+                    text.strip() for text in step_text_elem.strings if id(text) not in skipped and text.strip()
+                )
+            elif step_text_elem:
                 # 移除步骤编号，只保留文本
                 step_clone = step_text_elem.__copy__()
                 grey_div = step_clone.find('div', class_='grey')
@@ -248,6 +611,7 @@ def extract_recipe_info(html_file):
                     'step': step_num,
                     'description': step_text
                 })
+    mark('steps')
     
     # 10. 提取小窍门
     # 查找包含"小窍门"的h3，然后找下一个recipeTip div
@@ -265,6 +629,12 @@ def extract_recipe_info(html_file):
                     tip_text_check = next_div.get_text(strip=True)
                     # 检查是否包含无关信息
                     if '来自 美食天下' not in tip_text_check and '使用的厨具' not in tip_text_check and '所属分类' not in tip_text_check:
+                        if scoped:
+                            # br 替换成的换行在 strip 拼接后不会保留，结果与直接取文本相同
+                            if tip_text_check:
+                                recipe['tips'] = tip_text_check
+                                break
+                            continue
                         tips_soup = BeautifulSoup(tips_html, 'html.parser')
                         # 移除br标签，替换为换行
                         for br in tips_soup.find_all('br'):
@@ -273,6 +643,7 @@ def extract_recipe_info(html_file):
                         if tips_text:
                             recipe['tips'] = tips_text
                             break
+    mark('tips')
     
     # 11. 提取使用的厨具
     tip_divs = soup.find_all('div', class_='recipeTip')
@@ -281,12 +652,201 @@ def extract_recipe_info(html_file):
         if '使用的厨具' in text or '厨具' in text:
             recipe['tools'] = text.replace('使用的厨具：', '').strip()
             break
+    mark('tools')
     
     # 去重封面图片
     recipe['cover_images'] = list(dict.fromkeys(recipe['cover_images']))
     
     return recipe
 
+# bs4 的 get_text 不包含注释及 script/style/template 中的文本
+_LX_SKIP_TAGS = {'-comment', 'script', 'style', 'template'}
+
+
+def _lx_text(node, skip=None) -> str:
+    """
+    与 BeautifulSoup get_text(strip=True) 等价的文本提取：
+    逐个文本节点去除首尾空白后直接拼接；skip 指定的子树不计入
+    """
+    parts: List[str] = []
+
+    def _walk(parent):
+        for child in parent.iter(include_text=True):
+            tag = child.tag
+            if tag == '-text':
+                text = child.text_content.strip()
+                if text:
+                    parts.append(text)
+            elif tag not in _LX_SKIP_TAGS and not (skip is not None and child == skip):
+                _walk(child)
+
+    _walk(node)
+    return ''.join(parts)
+
+
+def _lx_has_class(node, class_name: str) -> bool:
+    return class_name in (node.attributes.get('class') or '').split()
+
+
+def _extract_with_selectolax(html_content: str, stats: Optional[ExtractStats] = None) -> dict:
+    """基于 selectolax(lexbor) 的提取实现，字段与 bs4 后端保持一致"""
+    mark, count = (stats.mark, stats.count) if stats is not None else (_noop, _noop)
+    if LexborHTMLParser is None:
+        raise ImportError("selectolax 后端需要先安装: pip install selectolax")
+    tree = LexborHTMLParser(html_content)
+    recipe = _empty_recipe()
+    mark('parse')
+    
+    # 1. 提取菜谱名称
+    title_elem = tree.css_first('h1.recipe_De_title')
+    if title_elem:
+        recipe['name'] = _lx_text(title_elem).replace('独家', '').strip()
+    
+    title_input = tree.css_first('input#recipe_title')
+    if title_input and title_input.attributes.get('value'):
+        recipe['name'] = title_input.attributes['value']
+    mark('title')
+    
+    # 4. 提取描述
+    block_txt = tree.css_first('blockquote#block_txt')
+    if block_txt:
+        desc_div = block_txt.css_first('div#block_txt1')
+        if desc_div:
+            desc_text = _lx_text(desc_div)
+            desc_text = desc_text.replace('"', '').replace('"', '').replace('"', '').replace('"', '').strip()
+            recipe['description'] = desc_text
+    mark('description')
+    
+    # 5. 提取封面图片
+    img_box = tree.css_first('div#recipe_De_imgBox')
+    if img_box:
+        main_img = img_box.css_first('img')
+        if main_img:
+            img_src = main_img.attributes.get('src') or ''
+            if 'blank.gif' in img_src:
+                img_src = main_img.attributes.get('data-src', img_src) or ''
+            if img_src and 'blank.gif' not in img_src:
+                recipe['cover_images'].append(img_src)
+    
+    for script in tree.css('script'):
+        script_text = script.text(deep=True)
+        if script_text:
+            count('scripts_scanned')
+            if _collect_j_photo(script_text, recipe['cover_images']):
+                count('j_photo_regex_fallbacks')
+    mark('images')
+    
+    # 6. 提取食材（主料、辅料、调料）
+    for fieldset in tree.css('fieldset.particulars'):
+        legend = fieldset.css_first('legend')
+        if not legend:
+            continue
+        
+        legend_text = _lx_text(legend)
+        ingredients = []
+        for li in fieldset.css('li'):
+            name_elem = li.css_first('b') or li.css_first('a')
+            if name_elem:
+                quantity_elem = li.css_first('span.category_s2')
+                quantity_raw = _lx_text(quantity_elem) if quantity_elem else ''
+                amount, unit, quantity, unit_id = parse_quantity(quantity_raw)
+                ingredients.append({
+                    'name': _lx_text(name_elem),
+                    'amount': amount,
+                    'unit': unit,
+                    'quantity': quantity,
+                    'unit_id': unit_id
+                })
+        
+        if legend_text == '主料':
+            recipe['main_ingredients'] = ingredients
+        elif legend_text == '辅料':
+            recipe['auxiliary_ingredients'] = ingredients
+        elif legend_text == '调料':
+            recipe['seasonings'] = ingredients
+    mark('ingredients')
+    
+    # 7. 提取口味、工艺、耗时、难度
+    for category_list in tree.css('div.recipeCategory_sub_R'):
+        for li in category_list.css('li'):
+            label_elem = li.css_first('span.category_s2')
+            value_elem = li.css_first('a')
+            if label_elem and value_elem:
+                label = _lx_text(label_elem)
+                value = _lx_text(value_elem)
+                if label == '口味':
+                    recipe['flavor'] = value
+                elif label == '工艺':
+                    recipe['technique'] = value
+                elif label == '耗时':
+                    recipe['time'] = value
+                elif label == '难度':
+                    recipe['difficulty'] = value
+    mark('attributes')
+    
+    # 8. 提取分类
+    for link in tree.css('div.recipeTip.mt16 a[title]'):
+        title = link.attributes.get('title') or ''
+        if title in ['凉菜', '汤羹', '主食', '小吃', '西餐', '烘焙', '饮品']:
+            if title not in recipe['categories']:
+                recipe['categories'].append(title)
+    
+    path_div = tree.css_first('div#path')
+    if path_div:
+        for link in path_div.css('a.vest'):
+            title = link.attributes.get('title') or ''
+            if title and title not in recipe['categories']:
+                recipe['categories'].append(title)
+    mark('categories')
+    
+    # 9. 提取烹饪步骤，步骤编号子树在取文本时直接跳过，无需复制节点
+    recipe_step_div = tree.css_first('div.recipeStep')
+    if recipe_step_div:
+        for li in recipe_step_div.css('li'):
+            step_num_elem = li.css_first('div.grey')
+            step_text_elem = li.css_first('div.recipeStep_word')
+            
+            step_num = _lx_text(step_num_elem) if step_num_elem else ''
+            step_text = ''
+            if step_text_elem:
+                step_text = _lx_text(step_text_elem, skip=step_text_elem.css_first('div.grey'))
+            
+            if step_num or step_text:
+                recipe['steps'].append({
+                    'step': step_num,
+                    'description': step_text
+                })
+    mark('steps')
+    
+    # 10. 提取小窍门（br 在去空白拼接后不产生字符，无需二次解析）
+    for h3 in tree.css('h3'):
+        h3_text = _lx_text(h3)
+        if '小窍门' in h3_text or '小贴士' in h3_text:
+            parent = h3.parent
+            if parent:
+                next_div = parent.next
+                while next_div is not None and next_div.tag != 'div':
+                    next_div = next_div.next
+                if next_div is not None and _lx_has_class(next_div, 'recipeTip'):
+                    tips_text = _lx_text(next_div)
+                    if '来自 美食天下' not in tips_text and '使用的厨具' not in tips_text and '所属分类' not in tips_text:
+                        if tips_text:
+                            recipe['tips'] = tips_text
+                            break
+    mark('tips')
+    
+    # 11. 提取使用的厨具
+    for tip_div in tree.css('div.recipeTip'):
+        text = _lx_text(tip_div)
+        if '使用的厨具' in text or '厨具' in text:
+            recipe['tools'] = text.replace('使用的厨具：', '').strip()
+            break
+    mark('tools')
+    
+    recipe['cover_images'] = list(dict.fromkeys(recipe['cover_images']))
+    
+    return recipe
+
 def save_to_json(recipe, output_file):
     """保存为JSON文件"""
     with open(output_file, 'w', encoding='utf-8') as f:
@@ -340,50 +900,266 @@ def print_recipe_info(recipe):
     
     print("=" * 60)
 
-def process_directory(input_dir: Union[str, Path], output_file: Union[str, Path]) -> int:
-    """批量处理目录中的HTML菜谱，边解析边写入JSON数组，返回成功数量"""
+def _quarantine_garbled(
+    html_path: Union[Path, ArchiveMember],
+    quarantine_dir: Optional[Path],
+    stats: Optional[ExtractStats],
+) -> Tuple[str, Any, Optional[ExtractStats]]:
+    """隔离乱码文件（quarantine_dir 默认为所在目录下的 quarantine），返回 parse_html_file 形式的结果"""
+    if quarantine_dir is None:
+        root = Path(html_path.archive) if isinstance(html_path, ArchiveMember) else html_path.parent
+        quarantine_dir = default_quarantine_dir(root)
+    target = quarantine_html(html_path, quarantine_dir)
+    if stats is not None:
+        stats.count('garbled_quarantined')
+    return "garbled", str(target), stats
+
+
+def parse_html_file(
+    html_path: Union[Path, ArchiveMember],
+    backend: str = "bs4",
+    instrument: bool = False,
+    quarantine_dir: Optional[Path] = None,
+    quarantine: bool = True,
+    data: Optional[bytes] = None,
+) -> Tuple[str, Any, Optional[ExtractStats]]:
+    """
+    解析单个HTML文件，返回 (状态, 结果, 埋点统计)：
+    ("ok", recipe, ...) / ("garbled", 隔离后的路径, ...) / ("error", 错误信息, ...)
+    instrument=False 时埋点统计为 None
+    乱码文件移入 quarantine_dir（默认为所在目录下的 quarantine）；quarantine=False 时不隔离，
+    返回 ("garbled", None, ...) 由调用方隔离（子进程中不能并发删除归档成员）
+    data 为调用方已读出的文件内容（见 parse_html_file_for_cache）
+    该函数需可被子进程调用，因此不直接打印
+    """
+    stats = ExtractStats() if instrument else None
+    try:
+        content = load_html(html_path, stats, data)
+        if content is None:
+            if not quarantine:
+                return "garbled", None, stats
+            return _quarantine_garbled(html_path, quarantine_dir, stats)
+        recipe = extract_recipe_from_html(content, backend, stats)
+        recipe["source_file"] = html_path.name
+        return "ok", recipe, stats
+    except Exception as e:
+        if stats is not None:
+            stats.count('errors')
+        return "error", str(e), stats
+
+
+def parse_html_file_for_cache(
+    html_path: Union[Path, ArchiveMember],
+    backend: str = "bs4",
+    instrument: bool = False,
+    quarantine_dir: Optional[Path] = None,
+    quarantine: bool = True,
+) -> Tuple[Tuple[str, Any, Optional[ExtractStats]], Optional[Tuple[int, int, str]]]:
+    """
+    与 parse_html_file 相同，另返回缓存写入用的文件状态和内容哈希（见 ExtractionCache.snapshot），
+    文件只读一次；读取失败时状态为 None，错误照常由 parse_html_file 报告
+    """
+    try:
+        data, signature = ExtractionCache.snapshot(html_path)
+    except OSError:
+        data, signature = None, None
+    return parse_html_file(html_path, backend, instrument, quarantine_dir, quarantine, data), signature
+
+
+def parse_html_bytes(data: bytes, name: str, backend: str = "bs4") -> Tuple[str, Any]:
+    """
+    解析内存中的HTML（如爬虫刚抓到的页面），返回 ("ok", recipe) / ("garbled", None) / ("error", 错误信息)
+    recipe 的 source_file 为 name；该函数需可被子进程调用，因此不直接打印
+    """
+    try:
+        content = decode_html_bytes(data)
+        if content is None:
+            return "garbled", None
+        recipe = extract_recipe_from_html(content, backend)
+        recipe["source_file"] = name
+        return "ok", recipe
+    except Exception as e:
+        return "error", str(e)
+
+
+def iter_parsed(
+    html_files: Iterable[Union[Path, ArchiveMember]],
+    workers: int = 1,
+    backend: str = "bs4",
+    cache: Optional[ExtractionCache] = None,
+    instrument: bool = False,
+    quarantine_dir: Optional[Path] = None,
+) -> Iterator[Tuple[Union[Path, ArchiveMember], Tuple[str, Any, Optional[ExtractStats]]]]:
+    """
+    按输入顺序逐个产出 (文件, parse_html_file 的结果)
+    workers > 1 时使用进程池并行解析，仅保持有限个任务在途，内存占用有上界
+    提供 cache 时，未变化的文件直接使用缓存结果（埋点统计为 None），新解析成功的结果连同解析时
+    取得的文件状态和哈希写回缓存（不再重读文件）
+    并行时乱码文件由主进程逐个隔离：归档成员的删除会追加写索引文件，不能由多个子进程同时进行
+    """
+    def _cached(html_path):
+        recipe = cache.get(html_path) if cache is not None else None
+        return ("ok", recipe, None) if recipe is not None else None
+
+    parse = parse_html_file if cache is None else parse_html_file_for_cache
+
+    def _store(html_path, result):
+        result, signature = result if cache is not None else (result, None)
+        if result[0] == "garbled" and result[1] is None:
+            try:
+                return _quarantine_garbled(html_path, quarantine_dir, result[2])
+            except Exception as e:
+                return "error", str(e), result[2]
+        if cache is not None and result[0] == "ok":
+            cache.put(html_path, result[1], signature)
+        return result
+
+    if workers <= 1:
+        for html_path in html_files:
+            yield html_path, _cached(html_path) or _store(html_path, parse(html_path, backend, instrument, quarantine_dir))
+        return
+
+    files = iter(html_files)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        def _submit(html_path):
+            return _cached(html_path) or executor.submit(parse, html_path, backend, instrument, quarantine_dir, False)
+
+        pending = deque((html_path, _submit(html_path)) for html_path in islice(files, workers * 4))
+        while pending:
+            html_path, task = pending.popleft()
+            # 取出一个结果前补充一个新任务，保持窗口大小
+            for next_path in islice(files, 1):
+                pending.append((next_path, _submit(next_path)))
+            if isinstance(task, tuple):
+                yield html_path, task
+            else:
+                yield html_path, _store(html_path, task.result())
+
+
+def process_directory(
+    input_dir: Union[str, Path],
+    output_file: Union[str, Path],
+    workers: int = 1,
+    backend: str = "bs4",
+    cache_file: Optional[Union[str, Path]] = None,
+    metrics_file: Optional[Union[str, Path]] = None,
+    output_format: Optional[str] = None,
+    quarantine_dir: Optional[Union[str, Path]] = None,
+) -> int:
+    """
+    批量处理目录（或 .pack 语料归档）中的HTML菜谱，边解析边写入，返回成功数量
+    output_format 为 json（indent=2 数组）或 ndjson（每行一条紧凑记录），默认按扩展名判断
+    workers > 1 时多进程并行解析，输出顺序及内容与单进程一致
+    cache_file 指定增量缓存文件，只重新解析新增或变化的HTML
+    quarantine_dir 为乱码文件的隔离目录（默认见 default_quarantine_dir），误判的文件移回即可，无需重新抓取
+    metrics_file 指定后开启埋点：每个文件写一行JSON（各段耗时与计数器），结束时追加汇总
+    """
     input_dir = Path(input_dir)
     output_file = Path(output_file)
     
     if not input_dir.exists():
         raise FileNotFoundError(f"目录不存在: {input_dir}")
     
-    html_files = sorted(input_dir.glob("*.htm*"))
+    if is_archive(input_dir):
+        html_files = open_archive(input_dir).members()
+    else:
+        html_files = sorted(input_dir.glob("*.htm*"))
     if not html_files:
         raise FileNotFoundError(f"目录中未找到HTML文件: {input_dir}")
     
     output_file.parent.mkdir(parents=True, exist_ok=True)
     print(f"开始处理目录: {input_dir}，共 {len(html_files)} 个HTML文件")
+    if workers > 1:
+        print(f"并行模式: {workers} 个进程")
+    cache = ExtractionCache(cache_file, EXTRACTOR_VERSION) if cache_file else None
+    metrics = open(metrics_file, "w", encoding="utf-8") if metrics_file else None
+    totals = ExtractStats()
+    slowest: List[Tuple[float, str]] = []
     
-    written_count = 0
-    first_written = False
-    with open(output_file, "w", encoding="utf-8") as out:
-        out.write("[\n")
-        for html_path in html_files:
+    with RecipeWriter(output_file, output_format) as writer:
+        quarantine_dir = Path(quarantine_dir) if quarantine_dir else default_quarantine_dir(input_dir)
+        parsed = iter_parsed(
+            html_files, workers, backend, cache, instrument=metrics is not None, quarantine_dir=quarantine_dir
+        )
+        for html_path, (status, result, stats) in parsed:
+            if metrics is not None and stats is not None:
+                totals.merge(stats)
+                heapq.heappush(slowest, (stats.total_ms, html_path.name))
+                if len(slowest) > 10:
+                    heapq.heappop(slowest)
+                metrics.write(json.dumps({"file": html_path.name, "status": status, **stats.to_dict()}) + "\n")
+            if status == "garbled":
+                print(f"✗ 检测为乱码，已隔离: {html_path.name} -> {result}")
+                continue
+            if status == "error":
+                print(f"✗ 解析失败: {html_path.name} -> {result}")
+                continue
             try:
-                content = html_path.read_text(encoding="utf-8", errors="ignore")
-                if is_garbled_html(content):
-                    print(f"✗ 检测为乱码，已删除: {html_path.name}")
-                    html_path.unlink(missing_ok=True)
-                    continue
-                recipe = extract_recipe_info(html_path)
-                recipe["source_file"] = html_path.name
-                
-                if first_written:
-                    out.write(",\n")
-                json.dump(recipe, out, ensure_ascii=False, indent=2)
-                out.flush()
-                
-                first_written = True
-                written_count += 1
+                writer.write(result)
                 print(f"✓ 解析并写入: {html_path.name}")
             except Exception as e:
                 print(f"✗ 解析失败: {html_path.name} -> {e}")
-        out.write("\n]\n")
+    written_count = writer.count
     
+    if metrics is not None:
+        summary = {
+            "files": len(html_files),
+            "written": written_count,
+            **totals.to_dict(),
+            "slowest": [{"file": name, "total_ms": round(ms, 3)} for ms, name in sorted(slowest, reverse=True)],
+        }
+        metrics.write(json.dumps({"summary": summary}, ensure_ascii=False) + "\n")
+        metrics.close()
+        print_metrics_summary(summary)
+    if cache is not None:
+        pruned = cache.prune(input_dir, html_files)
+        cache.close()
+        print(f"缓存命中 {cache.hits} 个，未命中 {cache.misses} 个，清理失效条目 {pruned} 个")
     print(f"完成，成功写入 {written_count} 条数据 -> {output_file}")
     return written_count
 
+def print_metrics_summary(summary: dict) -> None:
+    """打印埋点汇总：各段总耗时、计数器和最慢的文件"""
+    print("埋点汇总:")
+    total_ms = summary["total_ms"] or 1.0
+    for name, ms in summary["sections_ms"].items():
+        print(f"  {name:<12} {ms:>12.1f} ms  {ms / total_ms:6.1%}")
+    for name, n in summary["counters"].items():
+        print(f"  {name:<24} {n}")
+    print("  最慢的文件:")
+    for item in summary["slowest"]:
+        print(f"    {item['file']}: {item['total_ms']} ms")
+
+
+def compare_backends(input_dir: Union[str, Path], backend: str = "selectolax", limit: int = 0) -> int:
+    """
+    回归检查：逐个文件比较指定后端与 bs4 后端的提取结果，返回不一致的文件数
+    limit > 0 时只检查排序后的前 limit 个文件
+    """
+    html_files = sorted(Path(input_dir).glob("*.htm*"))
+    if limit > 0:
+        html_files = html_files[:limit]
+
+    mismatched = 0
+    for html_path in html_files:
+        try:
+            content = load_html(html_path)
+            if content is None:
+                continue
+            expected = extract_recipe_from_html(content, "bs4")
+            actual = extract_recipe_from_html(content, backend)
+        except Exception as e:
+            mismatched += 1
+            print(f"✗ 解析失败: {html_path.name} -> {e}")
+            continue
+        diff_keys = [key for key in expected if expected[key] != actual.get(key)]
+        if diff_keys:
+            mismatched += 1
+            print(f"✗ 结果不一致: {html_path.name} -> {', '.join(diff_keys)}")
+
+    print(f"比较完成: {len(html_files)} 个文件，{mismatched} 个不一致 (bs4 vs {backend})")
+    return mismatched
+
 if __name__ == '__main__':
     import argparse
 
@@ -392,7 +1168,7 @@ if __name__ == '__main__':
         "--dir",
         "-d",
         default="recipe_new",
-        help="包含菜谱HTML的目录（默认: recipe_new）"
+        help="包含菜谱HTML的目录或 .pack 语料归档（默认: recipe_new）"
     )
     parser.add_argument(
         "--out",
@@ -405,20 +1181,70 @@ if __name__ == '__main__':
         "-f",
         help="仅处理单个HTML文件（若提供，将忽略--dir）"
     )
+    parser.add_argument(
+        "--workers",
+        "-w",
+        type=int,
+        default=1,
+        help="并行解析的进程数（默认: 1，即单进程）"
+    )
+    parser.add_argument(
+        "--backend",
+        "-b",
+        choices=PARSER_BACKENDS,
+        default="bs4",
+        help="HTML解析后端（默认: bs4；scoped 只解析菜谱相关区域；selectolax 速度最快，需额外安装）"
+    )
+    parser.add_argument(
+        "--compare-backends",
+        action="store_true",
+        help="比较 --backend 与 bs4 后端在 --dir 上的提取结果是否一致"
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=0,
+        help="配合 --compare-backends，仅比较前 N 个文件（默认: 全部）"
+    )
+    parser.add_argument(
+        "--cache",
+        help="增量缓存文件路径（SQLite），提供后仅重新解析新增或变化的HTML"
+    )
+    parser.add_argument(
+        "--metrics",
+        help="开启埋点，将每个文件的耗时与计数器按JSON行写入该文件，并在结束时打印汇总"
+    )
+    parser.add_argument(
+        "--quarantine",
+        help="乱码文件的隔离目录（默认: 输入目录下的 quarantine 子目录）"
+    )
+    parser.add_argument(
+        "--format",
+        "-F",
+        choices=OUTPUT_FORMATS,
+        help="输出格式：json 为带缩进的数组（供前端使用），ndjson 为每行一条紧凑记录（默认按扩展名判断）"
+    )
     args = parser.parse_args()
 
     try:
-        if args.file:
+        if args.compare_backends:
+            if compare_backends(args.dir, args.backend, args.limit):
+                raise SystemExit(1)
+        elif args.file:
             print(f"正在从 {args.file} 提取菜谱信息...")
-            content = Path(args.file).read_text(encoding="utf-8", errors="ignore")
-            if is_garbled_html(content):
+            content = load_html(Path(args.file))
+            if content is None:
                 print(f"检测到文件乱码，已跳过: {args.file}")
             else:
-                recipe = extract_recipe_info(args.file)
+                recipe = extract_recipe_from_html(content, args.backend)
                 print_recipe_info(recipe)
                 save_to_json(recipe, args.out)
         else:
-            process_directory(args.dir, args.out)
+            process_directory(
+                args.dir, args.out, workers=args.workers, backend=args.backend,
+                cache_file=args.cache, metrics_file=args.metrics, output_format=args.format,
+                quarantine_dir=args.quarantine,
+            )
     except Exception as e:
         print(f"错误: {e}")
         import traceback
@@ -1,19 +1,37 @@
 """爬取美食天下菜谱详情页 HTML，按递增序号 1.html、2.html... 保存."""
 from __future__ import annotations
 
+import codecs
 import logging
+import multiprocessing
+import queue
 import re
+import subprocess
+import sys
 import random
 import time
 import threading
-from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import Iterable, Optional
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional
 from urllib.parse import urljoin, urlsplit
 
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
 
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # 可选依赖，缺失时 analyze_category_page 使用 BeautifulSoup
+    LexborHTMLParser = None
+
+from corpus_archive import open_archive
+from crawl_state import ClaimDir, CrawlState
+from extract_cache import file_digest
+from extract_recipe import PARSER_BACKENDS, is_garbled_bytes, parse_html_bytes
+from recipe_stream import RecipeWriter
+
 BASE_HOST = "https://home.meishichina.com"
 BASE_TYPE_URL = "https://home.meishichina.com/recipe-type.html"
 # 仅抓取"热菜"分类（递归翻页），避免保存分页页本身，只保存菜谱详情页
@@ -32,7 +50,28 @@ TARGET_CATEGORY_URLS = [
 
 OUTPUT_DIR = Path("/home/zhangpu/food-app/recipe_new")
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+# 爬虫状态库（已保存ID、待抓取队列、分页进度、ID->文件），见 crawl_state.py
+STATE_FILE = OUTPUT_DIR / "crawl_state.db"
+# 分片抓取：(k, n) 表示本进程是 n 个分片中的第 k 个（从 0 开始）；分类按序号、ID按取模分配给各分片，
+# 状态库、归档和提取输出各分片一份（文件名加 .shard-k-of-n），文件序号按分片交错分配，
+# 按分类遍历时，跨分片去重通过输出目录下的认领目录完成（按ID区间遍历时各分片的ID本就不相交）
+SHARD: Optional[tuple[int, int]] = None
+CLAIMS_DIR = OUTPUT_DIR / "claims"
+# 旧版的已抓取ID列表，首次使用状态库时导入
 SEEN_IDS_FILE = OUTPUT_DIR / "seen_ids.txt"
+# 设置后把抓到的分类页原样保存到该目录，供 bench_listing.py 做基准
+LISTING_DIR: Optional[Path] = None
+# 设置后详情页追加写入该语料归档（见 corpus_archive.py），不再逐个保存 N.html
+ARCHIVE_PATH: Optional[Path] = None
+# 边抓边提取：设置后详情页抓到即在进程池中提取，记录追加写入该 NDJSON 文件；
+# 此模式下原始HTML只在设置了 ARCHIVE_PATH 时压缩保留，否则不落盘
+EXTRACT_OUTPUT: Optional[Path] = None
+EXTRACT_WORKERS = 2
+EXTRACT_BACKEND = "bs4"
+# 每个提取进程允许积压的任务数，积压超过 EXTRACT_WORKERS * 该值时抓取线程等待
+EXTRACT_BACKLOG = 8
+# 提取结果每写入这么多条刷新一次输出文件，刷新后才把对应ID记为已保存
+EXTRACT_CONFIRM_EVERY = 50
 
 USER_AGENT = (
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -40,6 +79,11 @@ USER_AGENT = (
     "Chrome/122.0 Safari/537.36"
 )
 RECIPE_LINK_RE = re.compile(r"https://home\.meishichina\.com/recipe-\d+\.html")
+# 已保存详情页中菜谱自身的ID：标题链接，其次结构化数据中的 @id
+PAGE_RECIPE_ID_RES = (
+    re.compile(rb'<a href="https://home\.meishichina\.com/recipe-(\d+)\.html" id="recipe_title"'),
+    re.compile(rb'"@id":\s*"https://home\.meishichina\.com/recipe-(\d+)\.html"'),
+)
 CATEGORY_LINK_RE = re.compile(
     r"https://home\.meishichina\.com/recipe/[^/]+/?$", re.IGNORECASE
 )
@@ -48,18 +92,169 @@ CATEGORY_PAGE_RE = re.compile(
     r"https://home\.meishichina\.com/recipe/[^/]+/page/(\d+)/?", re.IGNORECASE
 )
 _THREAD_LOCAL = threading.local()
-MAX_WORKERS = 3  # 并发数，避免 429 可酌情调低或调高（3~6）
+# 响应头或 <meta> 中声明的编码；meta 只在文档开头查找
+CONTENT_TYPE_CHARSET_RE = re.compile(r"charset=[\"']?([\w.:-]+)", re.IGNORECASE)
+META_CHARSET_RE = re.compile(rb"<meta[^>]+charset=[\"']?([\w.:-]+)", re.IGNORECASE)
+META_SCAN_BYTES = 4096
+# 按主机缓存统计检测出的编码，同一站点只检测一次
+_HOST_CHARSETS: dict[str, str] = {}
+# 详情页抓取线程数；请求速率由下方自适应限速器控制，线程数只决定最大并发
+MAX_WORKERS = 6
+# 全局同时进行中的请求上限（分类页与详情页共用），跨分页、跨分类生效；
+# 比抓取线程数多一个名额，保证翻页请求不必排在详情页之后
+MAX_IN_FLIGHT = MAX_WORKERS + 1
+# 待抓取详情页队列上限，队列满时分类页遍历等待，避免链接无限堆积
+MAX_PENDING = MAX_WORKERS * 4
+_IN_FLIGHT = threading.BoundedSemaphore(MAX_IN_FLIGHT)
+# 同时遍历分类页的生产者线程数（每个线程负责一个分类）
+LISTING_WORKERS = 3
+# 吞吐统计的日志间隔（秒）
+STATS_INTERVAL = 10.0
 MAX_RETRIES = 3
+# 这些状态码表示菜谱不存在，记为失效ID，不再重试
+DEAD_STATUSES = (404, 410)
+# 按ID区间遍历时，状态库中记录进度所用的"分类"名前缀
+ID_RANGE_PREFIX = "ids:"
+# 按ID区间遍历时每入队多少个ID记录一次进度
+ID_PROGRESS_EVERY = 100
+# 刷新模式每处理多少个菜谱输出一次进度
+REFRESH_LOG_EVERY = 500
 BACKOFF_BASE = 1.5
 BACKOFF_JITTER = 0.2
+# 自适应限速（令牌桶 + AIMD）：成功时每秒约增加 RATE_INCREASE 次/秒，
+# 429/5xx/网络错误或响应过慢时乘以 RATE_DECREASE；同一 DECREASE_WINDOW 内只降一次，
+# 避免并发中的请求同时失败时速率被连续压到底
+INITIAL_RATE = 2.0
+MIN_RATE = 0.2
+MAX_RATE = 10.0
+RATE_BURST = 3.0
+RATE_INCREASE = 0.2
+RATE_DECREASE = 0.5
+SLOW_DECREASE = 0.8
+SLOW_LATENCY = 5.0
+DECREASE_WINDOW = 2.0
+# Retry-After 的上限（秒），防止异常值让爬虫长时间停顿
+MAX_RETRY_AFTER = 300.0
 # 若需强制遍历固定页区间，配置起止页；为 None 时从第 1 页开始，按页面"下一页"解析
 # 默认抓取每个分类的前100页
 FORCE_START_PAGE: Optional[int] = 1
 FORCE_END_PAGE: Optional[int] = 100
 
 
+class RateLimiter:
+    """所有 Session 共用的自适应令牌桶限速器。
+
+    每个请求发出前 acquire() 取一个令牌；响应返回后 feedback() 按 AIMD 调整速率：
+    成功则加性增长，429/5xx/网络错误/响应过慢则乘性下降；带 Retry-After 时
+    在指定时间内暂停发放令牌。
+    """
+
+    def __init__(
+        self,
+        rate: float = INITIAL_RATE,
+        min_rate: float = MIN_RATE,
+        max_rate: float = MAX_RATE,
+        burst: float = RATE_BURST,
+    ) -> None:
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.throttled = 0
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._resume_at = 0.0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._resume_at - now
+                if wait <= 0:
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def feedback(self, status: Optional[int], latency: float, retry_after: Optional[float] = None) -> None:
+        """根据响应调整速率；status 为 None 表示网络错误。"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if status is None or status == 429 or status >= 500:
+                self.throttled += 1
+                if retry_after:
+                    self._resume_at = max(self._resume_at, now + min(retry_after, MAX_RETRY_AFTER))
+                    self._tokens = 0.0
+                    logging.warning("限流：服务端要求 %.0f 秒后重试", retry_after)
+                self._decrease(now, RATE_DECREASE, f"HTTP {status}" if status else "网络错误")
+            elif latency > SLOW_LATENCY:
+                self._decrease(now, SLOW_DECREASE, f"响应耗时 {latency:.1f}s")
+            else:
+                # 加性增长：速率为 r 时每秒约完成 r 个请求，每个请求增加 RATE_INCREASE / r
+                self.rate = min(self.max_rate, self.rate + RATE_INCREASE / self.rate)
+
+    def _decrease(self, now: float, factor: float, reason: str) -> None:
+        if now - self._last_decrease < DECREASE_WINDOW:
+            return
+        self._last_decrease = now
+        old = self.rate
+        self.rate = max(self.min_rate, self.rate * factor)
+        logging.warning("限流：%s，速率 %.2f -> %.2f 次/秒", reason, old, self.rate)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After（秒数或 HTTP 日期），无法解析时返回 None。"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class ThrottledAdapter(HTTPAdapter):
+    """在传输层接入限速器，经由该适配器的每个请求（含重定向）都受同一速率控制。"""
+
+    def __init__(self, limiter: RateLimiter, **kwargs) -> None:
+        self.limiter = limiter
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        self.limiter.acquire()
+        t0 = time.monotonic()
+        try:
+            resp = super().send(request, **kwargs)
+        except requests.RequestException:
+            self.limiter.feedback(None, time.monotonic() - t0)
+            raise
+        self.limiter.feedback(
+            resp.status_code,
+            time.monotonic() - t0,
+            parse_retry_after(resp.headers.get("Retry-After")),
+        )
+        return resp
+
+
+RATE_LIMITER = RateLimiter()
+
+
 def make_session() -> requests.Session:
     session = requests.Session()
+    adapter = ThrottledAdapter(RATE_LIMITER)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
     session.headers.update(
         {
             "User-Agent": USER_AGENT,
@@ -96,27 +291,100 @@ def discover_category_urls(session: requests.Session) -> list[str]:
     return result
 
 
-def fetch_html(session: requests.Session, url: str) -> Optional[str]:
+def fetch_response(
+    session: requests.Session, url: str, headers: Optional[dict[str, str]] = None
+) -> Optional[requests.Response]:
+    """发出请求并返回响应（任意状态码），网络错误时返回 None。"""
     try:
-        resp = session.get(url, timeout=15)
-        resp.raise_for_status()
-        if resp.url != url:
-            logging.info("URL 重定向：%s -> %s", url, resp.url)
-        resp.encoding = resp.apparent_encoding
-        return resp.text
+        with _IN_FLIGHT:
+            resp = session.get(url, timeout=15, headers=headers)
     except Exception as exc:  # noqa: BLE001
         logging.warning("获取失败 %s：%s", url, exc)
         return None
+    if resp.url != url:
+        logging.info("URL 重定向：%s -> %s", url, resp.url)
+    return resp
+
+
+def _normalize_charset(name: str) -> Optional[str]:
+    try:
+        charset = codecs.lookup(name).name
+    except LookupError:
+        return None
+    # 声明为 gb2312/gbk 的中文页面常含超出字符集的字，统一按超集解码
+    return "gb18030" if charset in ("gb2312", "gbk") else charset
+
+
+def resolve_encoding(resp: requests.Response) -> str:
+    """依次取响应头、<meta> 声明的编码，都没有时才做统计检测，检测结果按主机缓存。"""
+    match = CONTENT_TYPE_CHARSET_RE.search(resp.headers.get("Content-Type", ""))
+    charset = _normalize_charset(match.group(1)) if match else None
+    if charset:
+        return charset
+    match = META_CHARSET_RE.search(resp.content[:META_SCAN_BYTES])
+    charset = _normalize_charset(match.group(1).decode("ascii", "ignore")) if match else None
+    if charset:
+        return charset
+    host = urlsplit(resp.url).netloc
+    if host not in _HOST_CHARSETS:
+        _HOST_CHARSETS[host] = _normalize_charset(resp.apparent_encoding or "") or "utf-8"
+        logging.info("未声明编码，检测 %s 为 %s", host, _HOST_CHARSETS[host])
+    return _HOST_CHARSETS[host]
+
+
+def _response_text(resp: requests.Response) -> str:
+    resp.encoding = resolve_encoding(resp)
+    return resp.text
+
+
+def _response_utf8(resp: requests.Response) -> bytes:
+    """返回 UTF-8 字节：页面本身是 UTF-8 时原样返回，不做解码再编码。"""
+    charset = resolve_encoding(resp)
+    if charset == "utf-8":
+        return resp.content
+    return resp.content.decode(charset, errors="replace").encode("utf-8")
+
+
+def fetch_html(session: requests.Session, url: str) -> Optional[str]:
+    resp = fetch_response(session, url)
+    if resp is None:
+        return None
+    if not resp.ok:
+        logging.warning("获取失败 %s：HTTP %s", url, resp.status_code)
+        return None
+    return _response_text(resp)
+
+
+def is_retryable(status: Optional[int]) -> bool:
+    """网络错误、429 和 5xx 值得重试，其余 4xx（如 404）重试也不会成功。"""
+    return status is None or status == 429 or status >= 500
 
 
-def fetch_with_retry(session: requests.Session, url: str) -> Optional[str]:
+def fetch_response_with_retry(
+    session: requests.Session, url: str, headers: Optional[dict[str, str]] = None
+) -> Optional[requests.Response]:
+    """带重试地请求页面，返回最后一次的响应（可能不是 2xx，如 304），始终网络错误时返回 None。"""
+    resp = None
     for attempt in range(1, MAX_RETRIES + 1):
-        html = fetch_html(session, url)
-        if html:
-            return html
-        sleep_time = (BACKOFF_BASE ** (attempt - 1)) + random.uniform(0, BACKOFF_JITTER)
-        time.sleep(sleep_time)
-    return None
+        resp = fetch_response(session, url, headers)
+        if resp is not None and resp.ok:
+            return resp
+        status = resp.status_code if resp is not None else None
+        logging.warning("获取失败 %s：%s（第 %s 次）", url, f"HTTP {status}" if status else "网络错误", attempt)
+        if not is_retryable(status) or attempt == MAX_RETRIES:
+            break
+        # 429/5xx 的等待（含 Retry-After）由限速器负责，这里只对网络错误做指数退避
+        if status is None:
+            time.sleep(BACKOFF_BASE ** (attempt - 1) + random.uniform(0, BACKOFF_JITTER))
+        else:
+            time.sleep(random.uniform(0, BACKOFF_JITTER))
+    return resp
+
+
+def fetch_with_retry(session: requests.Session, url: str) -> Optional[bytes]:
+    """获取页面并返回 UTF-8 编码的原始字节，失败返回 None。"""
+    resp = fetch_response_with_retry(session, url)
+    return _response_utf8(resp) if resp is not None and resp.ok else None
 
 
 def extract_recipe_links(html: str, base_url: str) -> set[str]:
@@ -193,51 +461,491 @@ def find_next_page(html: str, base_url: str) -> Optional[str]:
     return None
 
 
+class _Anchor(NamedTuple):
+    """分类页中的一个 <a>：href、rel 和 class 取值，以及与 BeautifulSoup Tag.string 相同含义的文本。"""
+
+    href: Optional[str]
+    rel: list[str]
+    classes: list[str]
+    string: Optional[str]
+    in_page_inner: bool
+
+
+def _lx_string(node) -> Optional[str]:
+    # 与 Tag.string 一致：只有唯一子节点时向下取，直到文本（或注释）节点
+    while True:
+        children = list(node.iter(include_text=True))
+        if len(children) != 1:
+            return None
+        node = children[0]
+        if node.tag in ("-text", "-comment"):
+            return node.text(deep=False)
+
+
+def _lx_anchors(html: str) -> Iterator[_Anchor]:
+    tree = LexborHTMLParser(html)
+    now_page = tree.css_first(".ui-page-inner a.now_page")
+    for a in tree.css("a"):
+        attrs = a.attributes
+        yield _Anchor(
+            attrs.get("href"),
+            (attrs.get("rel") or "").split(),
+            (attrs.get("class") or "").split(),
+            _lx_string(a),
+            now_page is not None and a.mem_id == now_page.mem_id,
+        )
+
+
+def _bs4_anchors(html: str) -> Iterator[_Anchor]:
+    soup = BeautifulSoup(html, "html.parser")
+    now_page = soup.select_one(".ui-page-inner a.now_page")
+    for a in soup.find_all("a"):
+        yield _Anchor(
+            a.get("href"),
+            a.get("rel") or [],
+            a.get("class") or [],
+            a.string,
+            a is now_page,
+        )
+
+
+def analyze_category_page(html: str, base_url: str) -> tuple[set[str], Optional[str]]:
+    """只解析一次分类页，一趟遍历所有 <a> 同时得到菜谱链接和下一页URL。
+
+    结果与 extract_recipe_links + find_next_page 一致：下一页依次取 rel="next"、
+    文本含"下"、class 含 next、分页组件中当前页之后的链接，最后回退到 /page/N/ 中
+    大于当前页的最小页码。安装 selectolax 时用其 C 解析器，否则用 BeautifulSoup。
+    """
+    anchors = _lx_anchors(html) if LexborHTMLParser is not None else _bs4_anchors(html)
+    base_host = urlsplit(BASE_HOST).netloc
+    path = urlsplit(base_url).path
+    cur_page = 1
+    if "/page/" in path:
+        try:
+            cur_page = int(path.rstrip("/").split("/page/")[-1])
+        except ValueError:
+            cur_page = 1
+    base_prefix = path.split("/page/")[0].rstrip("/")
+
+    links: set[str] = set()
+    # 各规则命中的第一个 <a>；与 soup.find 相同，命中但没有 href 时该规则作废
+    rel_next: Optional[_Anchor] = None
+    text_next: Optional[_Anchor] = None
+    class_next: Optional[_Anchor] = None
+    after_now: Optional[str] = None
+    seen_now = False
+    best_page: Optional[tuple[int, str]] = None
+    for a in anchors:
+        if rel_next is None and "next" in a.rel:
+            rel_next = a
+        if text_next is None and a.string and "下" in a.string:
+            text_next = a
+        if class_next is None and any("next" in c.lower() for c in a.classes):
+            class_next = a
+        if a.href is None:
+            if a.in_page_inner:
+                seen_now = True
+            continue
+        href = urljoin(base_url, a.href)
+        if RECIPE_LINK_RE.fullmatch(href):
+            links.add(href)
+        if seen_now and after_now is None:
+            after_now = href
+        if a.in_page_inner:
+            seen_now = True
+        m = CATEGORY_PAGE_RE.fullmatch(href)
+        if m and urlsplit(href).netloc == base_host:
+            p = int(m.group(1))
+            if p > cur_page and (not base_prefix or urlsplit(href).path.startswith(base_prefix)):
+                if best_page is None or p < best_page[0]:
+                    best_page = (p, href)
+
+    for candidate in (rel_next, text_next, class_next):
+        if candidate is not None and candidate.href is not None:
+            return links, urljoin(base_url, candidate.href)
+    if seen_now and after_now:
+        return links, after_now
+    if best_page:
+        return links, best_page[1]
+    logging.info("未找到下一页：%s", base_url)
+    return links, None
+
+
 def load_seen_ids() -> set[str]:
     if not SEEN_IDS_FILE.exists():
         return set()
     return {line.strip() for line in SEEN_IDS_FILE.read_text(encoding="utf-8").splitlines() if line.strip()}
 
 
+def recipe_id_of(url: str) -> str:
+    return url.rsplit("-", 1)[-1].split(".")[0]
+
+
+class ExtractSink:
+    """边抓边提取：在独立的进程池中解析详情页，结果追加写入 NDJSON，不阻塞网络I/O。
+
+    积压的任务数超过 workers * EXTRACT_BACKLOG 时 submit 阻塞，抓取线程随之放缓。
+    submit 可带 on_done 回调：提取失败时立即以 False 调用；成功时等记录随输出文件一起
+    刷新到磁盘后（每 EXTRACT_CONFIRM_EVERY 条或 close 时）再以 True 调用。
+    """
+
+    def __init__(
+        self,
+        output_file: Path,
+        workers: int = EXTRACT_WORKERS,
+        backend: str = EXTRACT_BACKEND,
+    ) -> None:
+        self.backend = backend
+        self.written = 0
+        self.errors = 0
+        self._writer = RecipeWriter(output_file, "ndjson", append=True)
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(workers * EXTRACT_BACKLOG)
+        # 已写入但尚未刷新到磁盘的记录的确认回调
+        self._unconfirmed: list[Callable[[bool], None]] = []
+        # 抓取线程已在运行，用 spawn 启动子进程，避免 fork 复制持有中的锁
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def submit(self, html: bytes, name: str, on_done: Optional[Callable[[bool], None]] = None) -> None:
+        self._slots.acquire()
+        future = self._executor.submit(parse_html_bytes, html, name, self.backend)
+        future.add_done_callback(lambda fut: self._done(fut, name, on_done))
+
+    def _done(self, future: Future, name: str, on_done: Optional[Callable[[bool], None]]) -> None:
+        try:
+            status, result = future.result()
+        except Exception as exc:  # noqa: BLE001
+            status, result = "error", str(exc)
+        confirmed: list[Callable[[bool], None]] = []
+        with self._lock:
+            if status == "ok":
+                self._writer.write(result)
+                self.written += 1
+                if on_done is not None:
+                    self._unconfirmed.append(on_done)
+                if len(self._unconfirmed) >= EXTRACT_CONFIRM_EVERY:
+                    confirmed = self._flush()
+            else:
+                self.errors += 1
+                logging.warning("提取失败 %s：%s", name, result or status)
+        self._slots.release()
+        if status != "ok" and on_done is not None:
+            on_done(False)
+        for callback in confirmed:
+            callback(True)
+
+    def _flush(self) -> list[Callable[[bool], None]]:
+        """把已写入的记录刷新到磁盘，返回可以确认的回调（调用方已持有锁）。"""
+        self._writer.flush()
+        confirmed, self._unconfirmed = self._unconfirmed, []
+        return confirmed
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            confirmed = self._flush()
+        for callback in confirmed:
+            callback(True)
+        self._writer.close()
+        logging.info("提取完成：写入 %s 条，失败 %s 条", self.written, self.errors)
+
+
 def save_recipe_html(
     session: requests.Session,
     url: str,
-    seen_ids: set[str],
-    next_index: list[int],
-    mutex: threading.Lock,
-) -> bool:
+    state: CrawlState,
+    sink: Optional[ExtractSink] = None,
+    on_confirm: Optional[Callable[[bool], None]] = None,
+) -> Optional[bool]:
+    """抓取并保存一个详情页，返回是否已保存。
+
+    只保留提取结果（有 sink、没有归档）时返回 None：是否保存要等提取记录刷新到磁盘后才能确定，
+    届时以结果调用 on_confirm。
+    """
     if not RECIPE_LINK_RE.fullmatch(url):
         return False
-    recipe_id = url.rsplit("-", 1)[-1].split(".")[0]
-    with mutex:
-        if recipe_id in seen_ids:
-            logging.info("跳过已抓取ID：%s", recipe_id)
-            return False
-        target = OUTPUT_DIR / f"{next_index[0]}.html"
-        next_index[0] += 1  # 先占用序号，避免并发写同名
-    html = fetch_with_retry(session, url)
+    recipe_id = recipe_id_of(url)
+    if state.is_seen(recipe_id):
+        logging.info("跳过已抓取ID：%s", recipe_id)
+        return False
+    resp = fetch_response_with_retry(session, url)
+    if resp is not None and resp.status_code in DEAD_STATUSES:
+        state.mark_dead(recipe_id, resp.status_code, url)
+        return False
+    if resp is not None and resp.ok and not RECIPE_LINK_RE.fullmatch(resp.url):
+        # 已删除的菜谱会被重定向到首页等非详情页
+        logging.info("ID %s 重定向到 %s，记为失效", recipe_id, resp.url)
+        state.mark_dead(recipe_id, resp.history[0].status_code if resp.history else resp.status_code, url)
+        return False
+    html = _response_utf8(resp) if resp is not None and resp.ok else None
     if not html:
+        state.mark_failed(url)
+        return False
+    if sink is not None and is_garbled_bytes(html):
+        # 边抓边提取时乱码页不落盘，记为失败，之后可重新抓取
+        logging.warning("检测为乱码，丢弃：%s", url)
+        state.mark_failed(url)
         return False
-    target.write_text(html, encoding="utf-8")
+    sink_only = sink is not None and ARCHIVE_PATH is None
+    # 抓取成功后再分配序号，失败的请求不会在编号中留下空洞；
+    # 只保留提取结果时没有文件可供重启时补齐序号，分配立即提交，避免同一文件名分给两个菜谱
+    target = OUTPUT_DIR / f"{state.allocate_index(durable=sink_only)}.html"
+    etag, last_modified, digest = resp.headers.get("ETag"), resp.headers.get("Last-Modified"), file_digest(html)
+    if sink_only:
+        # 原始HTML不落盘：提取记录写入磁盘后才记为已保存（没有文件映射），
+        # 提取失败或进程在此之前退出时该URL保持待抓取，之后会重新抓取
+        def _confirm(ok: bool) -> None:
+            if ok:
+                state.mark_saved(recipe_id, None, url)
+                state.set_validators(recipe_id, etag, last_modified, digest)
+            else:
+                state.release(recipe_id)
+                state.mark_failed(url)
+            if on_confirm is not None:
+                on_confirm(ok)
+
+        state.hold(recipe_id)
+        sink.submit(html, target.name, _confirm)
+        logging.info("已提交提取：%s (源ID %s)", target.name, recipe_id)
+        return None
+    if ARCHIVE_PATH is not None:
+        open_archive(ARCHIVE_PATH).append(target.name, html, recipe_id)
+    else:
+        target.write_bytes(html)
+    if sink is not None:
+        sink.submit(html, target.name)
     logging.info("保存成功：%s (源ID %s)", target.name, recipe_id)
-    with mutex:
-        seen_ids.add(recipe_id)
-        with SEEN_IDS_FILE.open("a", encoding="utf-8") as f:
-            f.write(f"{recipe_id}\n")
+    state.mark_saved(recipe_id, target.name, url)
+    state.set_validators(recipe_id, etag, last_modified, digest)
     return True
 
 
+def _stored_digest(file_name: str) -> Optional[str]:
+    """已保存页面的内容哈希（没有记录校验信息的旧数据用），文件不存在时返回 None。"""
+    if ARCHIVE_PATH is not None:
+        archive = open_archive(ARCHIVE_PATH)
+        return file_digest(archive.read(file_name)) if file_name in archive else None
+    path = OUTPUT_DIR / file_name
+    return file_digest(path.read_bytes()) if path.exists() else None
+
+
+def refresh_recipe_html(
+    session: requests.Session,
+    recipe_id: str,
+    file_name: str,
+    url: str,
+    state: CrawlState,
+    sink: Optional[ExtractSink] = None,
+) -> str:
+    """用条件请求刷新一个已保存的菜谱，返回 unchanged / changed / dead / failed。
+
+    带上次的 ETag/Last-Modified 发出请求，304 直接视为未变；200 时比较内容哈希，
+    只有内容确实变化才覆盖原文件（或归档中的同名文档），文件名保持不变。
+    """
+    known = state.validators(recipe_id)
+    etag, last_modified, digest = known or (None, None, None)
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    resp = fetch_response_with_retry(session, url, headers)
+    if resp is not None and resp.status_code == 304:
+        state.set_validators(recipe_id, etag, last_modified, digest)
+        return "unchanged"
+    if resp is not None and resp.status_code in DEAD_STATUSES:
+        logging.info("菜谱已删除：%s（HTTP %s）", url, resp.status_code)
+        state.mark_dead(recipe_id, resp.status_code)
+        return "dead"
+    if resp is None or not resp.ok or not RECIPE_LINK_RE.fullmatch(resp.url):
+        return "failed"
+    html = _response_utf8(resp)
+    new_digest = file_digest(html)
+    etag, last_modified = resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+    if new_digest == (digest or _stored_digest(file_name)):
+        state.set_validators(recipe_id, etag, last_modified, new_digest)
+        return "unchanged"
+    if is_garbled_bytes(html):
+        logging.warning("检测为乱码，保留旧页面：%s", url)
+        return "failed"
+    if ARCHIVE_PATH is not None:
+        open_archive(ARCHIVE_PATH).append(file_name, html, recipe_id)
+    else:
+        (OUTPUT_DIR / file_name).write_bytes(html)
+    if sink is not None:
+        sink.submit(html, file_name)
+    state.set_validators(recipe_id, etag, last_modified, new_digest)
+    logging.info("内容已变化，已更新：%s (源ID %s)", file_name, recipe_id)
+    return "changed"
+
+
+class CrawlStats:
+    """流水线各阶段的计数器，report() 输出累计数量、平均速率和当前队列深度。"""
+
+    STAGES = ("pages", "links", "queued", "duplicate", "saved", "dead", "failed")
+    LABELS = {
+        "pages": "分类页",
+        "links": "链接",
+        "queued": "入队",
+        "duplicate": "重复",
+        "saved": "保存",
+        "dead": "失效",
+        "failed": "失败",
+    }
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.counts = dict.fromkeys(self.STAGES, 0)
+        # 生产者因队列已满而阻塞的累计时间，反映背压
+        self.blocked_s = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, n: int = 1) -> None:
+        with self._lock:
+            self.counts[stage] += n
+
+    def add_blocked(self, seconds: float) -> None:
+        with self._lock:
+            self.blocked_s += seconds
+
+    def report(self, pending: int = 0) -> str:
+        elapsed = max(time.perf_counter() - self.started, 1e-6)
+        parts = [
+            f"{self.LABELS[stage]} {self.counts[stage]}"
+            + (f" ({self.counts[stage] / elapsed:.2f}/s)" if stage in ("pages", "saved") else "")
+            for stage in self.STAGES
+        ]
+        parts.append(f"队列 {pending}")
+        parts.append(f"背压等待 {self.blocked_s:.1f}s")
+        return " | ".join(parts)
+
+
+class FetchPool:
+    """长期存在的详情页抓取池：所有分页、所有分类共用同一组线程和同一个有界待抓取队列。
+
+    分类页只负责把链接放进队列，不等待本页详情抓完即可继续翻页；
+    队列满时 submit 阻塞，形成背压。已抓取或正在队列中/抓取中的ID不会重复入队；
+    入队的URL同时记入状态库，中断后可重新入队。
+    """
+
+    def __init__(
+        self,
+        state: CrawlState,
+        workers: int = MAX_WORKERS,
+        max_pending: int = MAX_PENDING,
+        stats: Optional[CrawlStats] = None,
+        sink: Optional[ExtractSink] = None,
+        claims: Optional[ClaimDir] = None,
+    ) -> None:
+        self.state = state
+        self.sink = sink
+        self.claims = claims
+        self.mutex = threading.Lock()
+        self.stats = stats or CrawlStats()
+        self._queued: set[str] = set()
+        self._queue: queue.Queue[Optional[str]] = queue.Queue(maxsize=max_pending)
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"fetch-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    @property
+    def saved(self) -> int:
+        return self.stats.counts["saved"]
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, url: str, category: str = "") -> bool:
+        recipe_id = recipe_id_of(url)
+        with self.mutex:
+            # 同一菜谱常出现在多个分类中，入队前去重，避免并发抓取同一ID
+            if self.state.is_dead(recipe_id):
+                self.stats.add("dead")
+                return False
+            if self.state.is_seen(recipe_id) or recipe_id in self._queued:
+                self.stats.add("duplicate")
+                return False
+            # 分片模式下已被其他分片认领的ID同样视为重复
+            if self.claims is not None and not self.claims.claim(recipe_id):
+                self.stats.add("duplicate")
+                return False
+            self._queued.add(recipe_id)
+        self.state.add_frontier(url, recipe_id, category)
+        t0 = time.perf_counter()
+        self._queue.put(url)
+        self.stats.add_blocked(time.perf_counter() - t0)
+        self.stats.add("queued")
+        return True
+
+    def _worker(self) -> None:
+        session = get_thread_session()
+        while True:
+            url = self._queue.get()
+            if url is None:
+                return
+            try:
+                ok = save_recipe_html(
+                    session, url, self.state, self.sink, on_confirm=lambda saved, url=url: self._finish(url, saved)
+                )
+            except Exception as exc:  # noqa: BLE001
+                logging.warning("保存失败 %s：%s", url, exc)
+                ok = False
+            finally:
+                # 处理完的ID由状态库的已保存/失效集合去重（等待提取确认的ID已 hold），
+                # 这里只保留在途的ID，内存不随枚举的ID数增长
+                with self.mutex:
+                    self._queued.discard(recipe_id_of(url))
+            # None 表示等待提取确认，届时由 on_confirm 计数
+            if ok is not None:
+                self._finish(url, ok)
+
+    def _finish(self, url: str, ok: bool) -> None:
+        """按最终结果计数；失败时放弃认领，其他分片（或本分片下次运行时）可以重新抓取"""
+        if ok:
+            self.stats.add("saved")
+        elif self.state.is_dead(recipe_id_of(url)):
+            self.stats.add("dead")
+        else:
+            self.stats.add("failed")
+            if self.claims is not None:
+                self.claims.release(recipe_id_of(url))
+
+    def close(self) -> None:
+        """等待队列中的链接全部处理完后结束工作线程。"""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def __enter__(self) -> FetchPool:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def describe_rate() -> str:
+    return f"限速 {RATE_LIMITER.rate:.2f} 次/秒（限流 {RATE_LIMITER.throttled} 次）"
+
+
+def _report_stats(pool: FetchPool, stop: threading.Event) -> None:
+    while not stop.wait(STATS_INTERVAL):
+        logging.info("吞吐：%s | %s", pool.stats.report(pool.pending), describe_rate())
+
+
 def crawl_category(
     session: requests.Session,
     start_url: str,
-    seen_ids: set[str],
-    next_index: list[int],
-    total_saved: list[int],
-    delay: float = 1.0,
+    pool: FetchPool,
     start_page: int = 1,
     end_page: Optional[int] = None,
 ) -> None:
-    mutex = threading.Lock()
     visited_pages: set[str] = set()
     # 归一化分类前缀（去掉末尾 /page/N）
     prefix = urlsplit(start_url).path.split("/page/")[0].rstrip("/")
@@ -247,6 +955,15 @@ def crawl_category(
     page_url: Optional[str] = (
         base_category_url if page_num == 1 else f"{base_category_url}page/{page_num}/"
     )
+    # 从状态库中记录的进度继续
+    progress = pool.state.page_progress(base_category_url)
+    if progress is not None:
+        last_page, next_url = progress
+        if next_url is None:
+            logging.info("分类已遍历完成，跳过：%s", base_category_url)
+            return
+        page_num, page_url = max(last_page + 1, page_num), next_url
+        logging.info("从第 %s 页继续：%s", page_num, base_category_url)
 
     while page_url and page_url not in visited_pages:
         visited_pages.add(page_url)
@@ -254,45 +971,108 @@ def crawl_category(
         html = fetch_html(session, page_url)
         if not html:
             break
-        recipe_links = extract_recipe_links(html, page_url)
-        if recipe_links:
-            with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-                futures = []
-                for link in sorted(recipe_links):
-                    futures.append(
-                        executor.submit(
-                            save_recipe_html,
-                            get_thread_session(),
-                            link,
-                            seen_ids,
-                            next_index,
-                            mutex,
-                        )
-                    )
-                for fut in futures:
-                    try:
-                        if fut.result():
-                            total_saved[0] += 1
-                    except Exception as exc:  # noqa: BLE001
-                        logging.warning("保存失败：%s", exc)
-        time.sleep(max(delay, 0.1))
+        pool.stats.add("pages")
+        if LISTING_DIR is not None:
+            LISTING_DIR.mkdir(parents=True, exist_ok=True)
+            (LISTING_DIR / f"{urlsplit(page_url).path.strip('/').replace('/', '_')}.html").write_text(
+                html, encoding="utf-8"
+            )
+        recipe_links, next_page = analyze_category_page(html, page_url)
+        pool.stats.add("links", len(recipe_links))
+        # 翻页节奏由限速器控制，不再固定等待
+        for link in sorted(recipe_links):
+            pool.submit(link, base_category_url)
         if sequential_mode:
-            page_num += 1
-            if end_page and page_num > end_page:
-                break
-            page_url = f"{base_category_url}page/{page_num}/"
-        else:
-        next_page = find_next_page(html, page_url)
-        if not next_page or next_page in visited_pages:
-            break
+            next_page = None if end_page and page_num + 1 > end_page else f"{base_category_url}page/{page_num + 1}/"
+        elif next_page in visited_pages:
+            next_page = None
+        # 本页链接均已入队（并记入状态库）后才记录进度
+        pool.state.mark_page(base_category_url, page_num, next_page)
+        page_num += 1
         page_url = next_page
-        time.sleep(max(delay, 0.1))
+
+
+def shard_path(path: Path, shard: tuple[int, int]) -> Path:
+    """分片专用的文件名，如 crawl_state.db -> crawl_state.shard-0-of-4.db"""
+    k, n = shard
+    return path.with_name(f"{path.stem}.shard-{k}-of-{n}{path.suffix}")
+
+
+def parse_shard(text: str) -> tuple[int, int]:
+    """解析 "k/n" 形式的分片编号（k 从 0 开始）。"""
+    k, _, n = text.partition("/")
+    shard = (int(k), int(n))
+    if not 0 <= shard[0] < shard[1]:
+        raise ValueError(f"分片编号应满足 0 <= k < n：{text}")
+    return shard
+
+
+def open_crawl_state(resume: bool = True) -> CrawlState:
+    """打开状态库：首次使用时导入旧版 seen_ids.txt，并让文件序号与已有文件对齐。
+
+    分片模式下打开本分片的状态库，并导入主状态库中已保存的ID。
+    """
+    if SHARD is None:
+        state = CrawlState(STATE_FILE)
+    else:
+        state = CrawlState(shard_path(STATE_FILE, SHARD), index_stride=SHARD[1], index_offset=SHARD[0])
+        if STATE_FILE.exists():
+            main_state = CrawlState(STATE_FILE)
+            imported = state.import_seen_ids(rid for rid, _, _ in main_state.saved_entries())
+            main_state.close()
+            logging.info("分片 %s/%s：从主状态库导入已抓取ID %s 个", SHARD[0], SHARD[1], imported)
+    if not len(state) and SEEN_IDS_FILE.exists():
+        logging.info("已导入旧版已抓取ID %s 个", state.import_seen_ids(load_seen_ids()))
+    if not resume:
+        state.reset_pages()
+    # 从已有文件中确定起始编号（兼容状态库之前的数据，以及崩溃前未提交的序号）
+    existing_nums = []
+    for p in OUTPUT_DIR.glob("*.html"):
+        if p.stem.isdigit():
+            existing_nums.append(int(p.stem))
+    if ARCHIVE_PATH is not None:
+        for name in open_archive(ARCHIVE_PATH).names():
+            stem = name.split(".")[0]
+            if stem.isdigit():
+                existing_nums.append(int(stem))
+    state.reserve_index(max(existing_nums) + 1 if existing_nums else 1)
+    return state
+
+
+def run_pipeline(state: CrawlState, produce: Callable[[FetchPool], None], use_claims: bool = True) -> int:
+    """启动抓取池（以及可选的提取进程池），先补抓上次未完成的详情页，再由 produce 持续入队，返回新增数量。
+
+    分片模式下默认通过 CLAIMS_DIR 认领ID；produce 产生的ID本身按分片不相交时传 use_claims=False。
+    """
+    stop = threading.Event()
+    sink = (
+        ExtractSink(EXTRACT_OUTPUT, EXTRACT_WORKERS, EXTRACT_BACKEND) if EXTRACT_OUTPUT is not None else None
+    )
+    claims = (
+        ClaimDir(CLAIMS_DIR, f"shard-{SHARD[0]}-of-{SHARD[1]}") if SHARD is not None and use_claims else None
+    )
+    with FetchPool(state, sink=sink, claims=claims) as pool:
+        reporter = threading.Thread(target=_report_stats, args=(pool, stop), daemon=True)
+        reporter.start()
+        pending = state.pending_urls()
+        if pending:
+            logging.info("恢复上次未完成或失败待重试的详情页 %s 个", len(pending))
+        for url in pending:
+            pool.submit(url)
+        produce(pool)
+    stop.set()
+    if sink is not None:
+        sink.close()
+    state.close()
+    logging.info("吞吐：%s | %s", pool.stats.report(), describe_rate())
+    return pool.saved
 
 
 def crawl_all(
     categories: Iterable[str],
     start_page: int = 1,
     end_page: Optional[int] = None,
+    resume: bool = True,
 ) -> int:
     session = make_session()
     # 如未显式传入，则自动发现分类
@@ -300,42 +1080,259 @@ def crawl_all(
         categories = discover_category_urls(session)
     else:
         categories = list(categories)
-    seen_ids: set[str] = load_seen_ids()
-    total_saved = [0]
-    # 从已有文件中确定起始编号
-    existing_nums = []
-    for p in OUTPUT_DIR.glob("*.html"):
-        if p.stem.isdigit():
-            existing_nums.append(int(p.stem))
-    start_idx = max(existing_nums) + 1 if existing_nums else 1
-    next_index = [start_idx]
-    for idx, url in enumerate(categories, 1):
+    if SHARD is not None:
+        categories = [url for i, url in enumerate(categories) if i % SHARD[1] == SHARD[0]]
+        logging.info("分片 %s/%s 负责 %s 个分类", SHARD[0], SHARD[1], len(categories))
+    state = open_crawl_state(resume)
+
+    def _crawl(idx: int, url: str, pool: FetchPool) -> None:
         logging.info("=== 分类 %s/%s：%s ===", idx, len(categories), url)
-        crawl_category(
-            session,
-            url,
-            seen_ids,
-            next_index,
-            total_saved,
-            start_page=start_page,
-            end_page=end_page,
-        )
-    return total_saved[0]
+        try:
+            crawl_category(
+                get_thread_session(),
+                url,
+                pool,
+                start_page=start_page,
+                end_page=end_page,
+            )
+        except Exception as exc:  # noqa: BLE001
+            logging.warning("分类遍历失败 %s：%s", url, exc)
+
+    # 流水线：若干生产者并行遍历分类页，把详情链接放入有界队列，抓取池持续消费
+    def _produce(pool: FetchPool) -> None:
+        with ThreadPoolExecutor(max_workers=LISTING_WORKERS, thread_name_prefix="listing") as producers:
+            for idx, url in enumerate(categories, 1):
+                producers.submit(_crawl, idx, url, pool)
+
+    return run_pipeline(state, _produce)
+
+
+def page_recipe_id(html: bytes) -> Optional[str]:
+    """从已保存的详情页中读出菜谱自身的ID，找不到时返回 None。"""
+    for pattern in PAGE_RECIPE_ID_RES:
+        match = pattern.search(html)
+        if match:
+            return match.group(1).decode("ascii")
+    return None
+
+
+def reconcile_saved_files(state: CrawlState) -> list[str]:
+    """为没有文件映射的已保存ID（旧版 seen_ids.txt 导入）找回文件：读取尚未映射的已保存页面中的菜谱ID。
+
+    映射写入状态库，之后无需重复扫描；返回仍然找不到文件的ID。
+    """
+    unmapped = {rid for rid in state.unmapped_ids() if not state.is_dead(rid)}
+    if not unmapped:
+        return []
+    mapped = state.mapped_files()
+    archive = open_archive(ARCHIVE_PATH) if ARCHIVE_PATH is not None else None
+    found = 0
+    if archive is not None:
+        # 归档索引中记录了菜谱ID
+        for recipe_id in sorted(unmapped):
+            name = archive.name_for_id(recipe_id)
+            if name is not None and name not in mapped:
+                state.set_file(recipe_id, name)
+                unmapped.discard(recipe_id)
+                found += 1
+    candidates = [] if archive is None else [(name, archive.read) for name in archive.names()]
+    candidates += [(p.name, lambda name: (OUTPUT_DIR / name).read_bytes()) for p in OUTPUT_DIR.glob("*.html")]
+    for name, read in candidates:
+        if not unmapped:
+            break
+        if name in mapped:
+            continue
+        recipe_id = page_recipe_id(read(name))
+        if recipe_id in unmapped:
+            state.set_file(recipe_id, name)
+            mapped.add(name)
+            unmapped.discard(recipe_id)
+            found += 1
+    state.flush()
+    logging.info("已为旧版已抓取ID找回文件 %s 个，仍无文件 %s 个", found, len(unmapped))
+    return sorted(unmapped, key=lambda rid: (len(rid), rid))
+
+
+def refresh_all(changed_file: Path) -> dict[str, int]:
+    """用条件请求刷新所有已保存的菜谱，内容变化的 "菜谱ID\t文件名" 逐行写入 changed_file。
+
+    变化的页面原地覆盖，文件修改时间随之改变，extract_recipe 的增量缓存（--cache）
+    因此只会重新解析这些文件；指定 EXTRACT_OUTPUT 时变化的页面同时直接提取。
+    旧版导入的ID先按页面内容找回文件；仍找不到文件、无法刷新的ID写入 <changed_file>.unmapped.txt。
+    边抓边提取且未指定 --archive 时保存的ID没有原始HTML，不参与刷新（只计数），需要刷新时应同时保留归档。
+    """
+    state = open_crawl_state()
+    unmapped = reconcile_saved_files(state)
+    extract_only = len(state.extract_only_ids())
+    if extract_only:
+        logging.info("%s 个已保存ID只保留了提取结果（没有原始HTML），不参与刷新", extract_only)
+    entries = [entry for entry in state.saved_entries() if not state.is_dead(entry[0])]
+    logging.info("开始刷新 %s 个已保存菜谱", len(entries))
+    if unmapped:
+        unmapped_file = changed_file.with_name(f"{changed_file.stem}.unmapped.txt")
+        unmapped_file.parent.mkdir(parents=True, exist_ok=True)
+        unmapped_file.write_text("".join(f"{rid}\n" for rid in unmapped), encoding="utf-8")
+        logging.warning("%s 个已保存ID没有对应文件，无法刷新，列表 -> %s", len(unmapped), unmapped_file)
+    sink = (
+        ExtractSink(EXTRACT_OUTPUT, EXTRACT_WORKERS, EXTRACT_BACKEND) if EXTRACT_OUTPUT is not None else None
+    )
+    counts = dict.fromkeys(("unchanged", "changed", "dead", "failed"), 0)
+    counts["unmapped"] = len(unmapped)
+    counts["extract_only"] = extract_only
+
+    def _refresh(entry: tuple[str, str, Optional[str]]) -> str:
+        recipe_id, file_name, url = entry
+        try:
+            return refresh_recipe_html(
+                get_thread_session(), recipe_id, file_name, url or f"{BASE_HOST}/recipe-{recipe_id}.html", state, sink
+            )
+        except Exception as exc:  # noqa: BLE001
+            logging.warning("刷新失败 %s：%s", recipe_id, exc)
+            return "failed"
+
+    changed_file.parent.mkdir(parents=True, exist_ok=True)
+    with changed_file.open("w", encoding="utf-8") as out, ThreadPoolExecutor(
+        max_workers=MAX_WORKERS, thread_name_prefix="refresh"
+    ) as executor:
+        for done, (entry, result) in enumerate(zip(entries, executor.map(_refresh, entries)), 1):
+            counts[result] += 1
+            if result == "changed":
+                out.write(f"{entry[0]}\t{entry[1]}\n")
+            if done % REFRESH_LOG_EVERY == 0:
+                logging.info("刷新进度 %s/%s：%s | %s", done, len(entries), counts, describe_rate())
+    if sink is not None:
+        sink.close()
+    state.close()
+    logging.info("刷新完成：%s，变化列表 -> %s", counts, changed_file)
+    return counts
+
+
+def parse_id_ranges(text: str) -> list[tuple[int, int]]:
+    """解析 "1-50000,80000-90000,123" 形式的ID区间（闭区间）。"""
+    ranges = []
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        low, _, high = part.partition("-")
+        start, end = int(low), int(high or low)
+        if start > end:
+            raise ValueError(f"ID区间起点大于终点：{part}")
+        ranges.append((start, end))
+    return ranges
+
+
+def crawl_id_range(ranges: Iterable[tuple[int, int]], resume: bool = True) -> int:
+    """不经分类页，按ID区间直接抓取详情页。
+
+    已保存和已知失效（404/410/被重定向）的ID直接跳过；请求速率由限速器控制，
+    队列满时枚举暂停。每个区间的进度记入状态库，中断后从上次入队的ID之后继续。
+    """
+    state = open_crawl_state(resume)
+
+    def _produce(pool: FetchPool) -> None:
+        for start, end in ranges:
+            key = f"{ID_RANGE_PREFIX}{start}-{end}"
+            progress = state.page_progress(key)
+            if progress is not None and progress[1] is None:
+                logging.info("ID区间已遍历完成，跳过：%s-%s", start, end)
+                continue
+            first = progress[0] + 1 if progress is not None else start
+            # 分片模式下只遍历本分片的ID
+            step = SHARD[1] if SHARD is not None else 1
+            logging.info("=== ID区间 %s-%s（从 %s 开始）===", start, end, first)
+            for recipe_id in range(first, end + 1):
+                if SHARD is not None and recipe_id % SHARD[1] != SHARD[0]:
+                    continue
+                pool.stats.add("links")
+                pool.submit(f"{BASE_HOST}/recipe-{recipe_id}.html", key)
+                if recipe_id % ID_PROGRESS_EVERY < step or recipe_id + step > end:
+                    next_url = f"{BASE_HOST}/recipe-{recipe_id + 1}.html" if recipe_id < end else None
+                    state.mark_page(key, recipe_id, next_url)
+
+    # 各分片只遍历 ≡ k (mod n) 的ID，天然不相交，不创建认领文件
+    return run_pipeline(state, _produce, use_claims=False)
+
+
+def run_local_shards(processes: int, argv: list[str]) -> None:
+    """在本机以子进程方式启动 processes 个分片，其余命令行参数原样传给每个分片；结束后把各分片状态库合并进主状态库。"""
+    rest = []
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+            continue
+        if arg in ("--processes", "-p"):
+            skip = True
+            continue
+        if arg.startswith("--processes="):
+            continue
+        rest.append(arg)
+    children = [
+        subprocess.Popen([sys.executable, str(Path(__file__).resolve()), "--shard", f"{k}/{processes}", *rest])
+        for k in range(processes)
+    ]
+    codes = [child.wait() for child in children]
+    # 异常退出的分片也合并已完成的部分，未完成的URL留在其分片状态库中，重新运行该分片即可继续
+    with CrawlState(STATE_FILE) as state:
+        for k in range(processes):
+            shard_db = shard_path(STATE_FILE, (k, processes))
+            if shard_db.exists():
+                logging.info("已合并分片状态库 %s，新增已保存ID %s 个", shard_db, state.merge_from(shard_db))
+    failed = [k for k, code in enumerate(codes) if code != 0]
+    if failed:
+        raise SystemExit(f"分片 {failed} 异常退出")
 
 
 def main() -> None:
+    global ARCHIVE_PATH, EXTRACT_OUTPUT, EXTRACT_WORKERS, EXTRACT_BACKEND, SHARD
+    import argparse
+
+    parser = argparse.ArgumentParser(description="爬取美食天下菜谱详情页")
+    parser.add_argument("--fresh", action="store_true", help="忽略分页进度，从每个分类（或ID区间）的起点重新遍历（已抓取ID仍会跳过）")
+    parser.add_argument("--refresh", action="store_true", help="用条件请求（ETag/Last-Modified）刷新已保存的菜谱，只重写内容变化的页面（只保留了提取结果的菜谱不刷新）")
+    parser.add_argument("--changed", help="刷新模式下内容变化的ID列表输出文件（默认: 输出目录/changed_ids.txt）")
+    parser.add_argument("--ids", help="按ID区间直接抓取详情页，不经分类页，如 1-500000,600000-650000")
+    parser.add_argument("--shard", help="以分片模式运行 n 个分片中的第 k 个（k/n，k 从 0 开始），可在多台共享输出目录的机器上分别运行")
+    parser.add_argument("--processes", "-p", type=int, default=1, help="在本机启动该数量的分片进程并等待全部结束")
+    parser.add_argument("--archive", help="详情页追加写入该语料归档（.pack），而不是逐个保存 N.html")
+    parser.add_argument("--extract", help="边抓边提取，菜谱记录追加写入该 NDJSON 文件；原始HTML仅在指定 --archive 时保留")
+    parser.add_argument("--extract-workers", type=int, default=EXTRACT_WORKERS, help=f"提取进程数（默认: {EXTRACT_WORKERS}）")
+    parser.add_argument("--backend", "-b", choices=PARSER_BACKENDS, default=EXTRACT_BACKEND, help="提取使用的HTML解析后端")
+    args = parser.parse_args()
+    if args.processes > 1:
+        if args.shard or args.refresh:
+            parser.error("--processes 不能与 --shard 或 --refresh 同时使用")
+        run_local_shards(args.processes, sys.argv[1:])
+        return
+    if args.shard:
+        if args.refresh:
+            parser.error("刷新模式不支持分片")
+        SHARD = parse_shard(args.shard)
+    if args.archive:
+        ARCHIVE_PATH = Path(args.archive) if SHARD is None else shard_path(Path(args.archive), SHARD)
+    if args.extract:
+        EXTRACT_OUTPUT = Path(args.extract) if SHARD is None else shard_path(Path(args.extract), SHARD)
+        EXTRACT_WORKERS, EXTRACT_BACKEND = args.extract_workers, args.backend
     logging.basicConfig(
         level=logging.INFO,
         format="%(asctime)s [%(levelname)s] %(message)s",
         datefmt="%H:%M:%S",
     )
     logging.info("开始抓取，输出目录：%s", OUTPUT_DIR.resolve())
-    # 抓取多个分类，每个分类抓取前100页
-    saved = crawl_all(
-        TARGET_CATEGORY_URLS,
-        start_page=FORCE_START_PAGE or 1,
-        end_page=FORCE_END_PAGE,
-    )
+    if args.refresh:
+        refresh_all(Path(args.changed) if args.changed else OUTPUT_DIR / "changed_ids.txt")
+        return
+    if args.ids:
+        saved = crawl_id_range(parse_id_ranges(args.ids), resume=not args.fresh)
+    else:
+        # 抓取多个分类，每个分类抓取前100页
+        saved = crawl_all(
+            TARGET_CATEGORY_URLS,
+            start_page=FORCE_START_PAGE or 1,
+            end_page=FORCE_END_PAGE,
+            resume=not args.fresh,
+        )
     logging.info("全部完成，本次新增 %s 条", saved)
 
 
@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+为前端构建分片的菜谱数据包
+
+输出目录（默认 public/recipes，由 Vite 原样发布）中包含：
+- manifest.json：精简的摘要索引（id、名称、描述、封面、全部原始分类、耗时、口味、难度、食材）和分片文件列表，
+  列表页只需加载它；每条摘要记录所在分片的序号
+- recipes-<哈希>.json：详情分片，{id: 完整菜谱记录}，文件名带内容哈希，可长期缓存
+- search-<哈希>.json：搜索倒排索引（见 search_index），文件名写入 manifest 的 search 字段，开始搜索时才加载
+- generations.json：最近几次构建的 manifest 引用的文件列表；清理旧文件时保留其中全部文件，
+  仍持有上一版 manifest 的页面可以继续按需加载分片
+
+分片方式：
+- size：按输入顺序每 shard_size 条一个分片
+- category：按主要分类分组，每组内再按 shard_size 切分
+
+id 为 recipe_<序号>，与 recipeDataLoader 直接导入 recipes_parsed.json 时的编号一致，
+已保存在今日菜单中的菜谱不受影响。
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from extract_recipe import parse_quantity
+from recipe_stream import iter_recipes
+from search_index import SearchIndexBuilder
+
+MANIFEST_NAME = "manifest.json"
+GENERATIONS_NAME = "generations.json"
+# 清理时保留最近几次构建（含本次）引用的文件
+KEEP_GENERATIONS = 2
+SHARD_PREFIX = "recipes-"
+SEARCH_PREFIX = "search-"
+SHARD_MODES = ("size", "category")
+SHARD_SIZE = 500
+BUNDLE_VERSION = 1
+# 与 recipeDataLoader.ts 中的 MAIN_CATEGORIES 保持一致
+MAIN_CATEGORIES = ("热菜", "凉菜", "汤羹", "主食", "小吃", "西餐", "烘焙", "饮品", "泡酱腌菜")
+OTHER_CATEGORY = "其它"
+INGREDIENT_FIELDS = ("main_ingredients", "auxiliary_ingredients", "seasonings")
+
+
+def main_category(recipe: dict) -> str:
+    """菜谱的第一个主要分类，没有时归为"其它"，用于按分类分片"""
+    for category in recipe.get("categories") or []:
+        if category in MAIN_CATEGORIES:
+            return category
+    return OTHER_CATEGORY
+
+
+def _summary_ingredient(ing: dict) -> list:
+    """[名称, 数量, 规范单位]；旧版提取结果没有 quantity/unit_id 时按原始 amount/unit 换算"""
+    if "quantity" in ing:
+        return [ing["name"], ing["quantity"], ing.get("unit_id") or ing.get("unit", "")]
+    _, _, quantity, unit_id = parse_quantity(f"{ing.get('amount', '')}{ing.get('unit', '')}")
+    return [ing["name"], quantity, unit_id or ing.get("unit", "")]
+
+
+def recipe_summary(recipe_id: str, recipe: dict, shard: int) -> dict:
+    """
+    列表页用的摘要；食材为 [名称, 数量, 规范单位] 三元组，
+    列表页的搜索（菜名、描述、全部分类、食材）和库存检查只需要这些字段
+    """
+    ingredients = [
+        _summary_ingredient(ing)
+        for field in INGREDIENT_FIELDS
+        for ing in recipe.get(field) or []
+    ]
+    covers = recipe.get("cover_images") or []
+    return {
+        "id": recipe_id,
+        "name": recipe.get("name", ""),
+        "description": recipe.get("description", ""),
+        "cover": covers[0] if covers else "",
+        "categories": recipe.get("categories") or [],
+        "time": recipe.get("time", ""),
+        "flavor": recipe.get("flavor", ""),
+        "difficulty": recipe.get("difficulty", ""),
+        "ingredients": ingredients,
+        "shard": shard,
+    }
+
+
+def _dumps(data) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _write_hashed(output_dir: Path, prefix: str, data: bytes) -> str:
+    """以内容哈希命名写入文件，返回文件名；内容相同的文件名也相同，重复构建时无需重写"""
+    name = f"{prefix}{hashlib.sha1(data).hexdigest()[:12]}.json"
+    path = output_dir / name
+    if not path.exists():
+        tmp_path = path.with_name(name + ".tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+    return name
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+def _load_generations(output_dir: Path) -> List[List[str]]:
+    """最近几次构建引用的文件列表（旧到新）；没有记录时取现有 manifest 的引用"""
+    path = output_dir / GENERATIONS_NAME
+    if path.exists():
+        return json.loads(path.read_text(encoding="utf-8"))
+    manifest_path = output_dir / MANIFEST_NAME
+    if manifest_path.exists():
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        return [[*manifest["shards"], *([manifest["search"]] if manifest.get("search") else [])]]
+    return []
+
+
+class _ShardWriter:
+    """把凑满的分片写成带内容哈希的文件，记录分片序号对应的文件名"""
+
+    def __init__(self, output_dir: Path):
+        self.output_dir = output_dir
+        self.files: List[str] = []
+        self.total_bytes = 0
+
+    def write(self, records: Dict[str, dict]) -> int:
+        data = _dumps(records)
+        self.files.append(_write_hashed(self.output_dir, SHARD_PREFIX, data))
+        self.total_bytes += len(data)
+        return len(self.files) - 1
+
+
+def build_bundle(
+    input_file: Union[str, Path],
+    output_dir: Union[str, Path] = "public/recipes",
+    shard_by: str = "size",
+    shard_size: int = SHARD_SIZE,
+    prune: bool = True,
+    keep_generations: int = KEEP_GENERATIONS,
+) -> dict:
+    """
+    逐条读取菜谱文件，写出详情分片和 manifest.json，返回 manifest
+    每个分组只缓存未凑满的一个分片，内存占用与文件大小无关（摘要索引除外）
+    manifest 最后写入，构建中断时前端仍使用旧的数据包；
+    prune 时删除最近 keep_generations 次构建（含本次）都不再引用的旧分片和搜索索引
+    """
+    if shard_by not in SHARD_MODES:
+        raise ValueError(f"未知的分片方式: {shard_by}")
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    shards = _ShardWriter(output_dir)
+    search = SearchIndexBuilder()
+    summaries: List[dict] = []
+    # 分组 -> (缓存中的详情, 对应摘要在 summaries 中的位置)
+    buffers: Dict[str, tuple] = {}
+
+    def _flush(group: str) -> None:
+        records, positions = buffers.pop(group)
+        shard = shards.write(records)
+        for pos in positions:
+            summaries[pos]["shard"] = shard
+
+    for index, recipe in enumerate(iter_recipes(input_file)):
+        recipe_id = f"recipe_{index}"
+        group = main_category(recipe) if shard_by == "category" else ""
+        records, positions = buffers.setdefault(group, ({}, []))
+        records[recipe_id] = recipe
+        positions.append(len(summaries))
+        summaries.append(recipe_summary(recipe_id, recipe, -1))
+        search.add(index, recipe)
+        if len(records) >= shard_size:
+            _flush(group)
+    for group in list(buffers):
+        _flush(group)
+    search_data = _dumps(search.to_dict())
+    search_file = _write_hashed(output_dir, SEARCH_PREFIX, search_data)
+
+    manifest = {
+        "version": BUNDLE_VERSION,
+        "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "shard_by": shard_by,
+        "shards": shards.files,
+        "search": search_file,
+        "recipes": summaries,
+    }
+    generations = _load_generations(output_dir)
+    current = [*shards.files, search_file]
+    if not generations or generations[-1] != current:
+        generations.append(current)
+    generations = generations[-max(keep_generations, 1):]
+    manifest_path = output_dir / MANIFEST_NAME
+    _write_atomic(manifest_path, _dumps(manifest))
+    _write_atomic(output_dir / GENERATIONS_NAME, _dumps(generations))
+
+    removed = 0
+    if prune:
+        keep = {name for files in generations for name in files}
+        for old in [*output_dir.glob(f"{SHARD_PREFIX}*.json"), *output_dir.glob(f"{SEARCH_PREFIX}*.json")]:
+            if old.name not in keep:
+                old.unlink()
+                removed += 1
+    print(
+        f"✓ {len(summaries)} 条菜谱 -> {len(shards.files)} 个分片（{shards.total_bytes / 1e6:.1f} MB），"
+        f"索引 {manifest_path.stat().st_size / 1e6:.2f} MB，搜索索引 {len(search_data) / 1e6:.2f} MB -> {output_dir}"
+    )
+    if removed:
+        print(f"已删除 {removed} 个旧文件")
+    return manifest
+
+
+def load_detail(output_dir: Union[str, Path], recipe_id: str) -> Optional[dict]:
+    """按 manifest 查找并读取单条菜谱的完整记录（供校验和调试）"""
+    output_dir = Path(output_dir)
+    manifest = json.loads((output_dir / MANIFEST_NAME).read_text(encoding="utf-8"))
+    for summary in manifest["recipes"]:
+        if summary["id"] == recipe_id:
+            shard = json.loads((output_dir / manifest["shards"][summary["shard"]]).read_text(encoding="utf-8"))
+            return shard.get(recipe_id)
+    return None
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="为前端构建分片的菜谱数据包（摘要索引 + 按需加载的详情分片）")
+    parser.add_argument("input", nargs="?", default="recipes_parsed.json", help="菜谱文件（JSON数组或NDJSON，默认: recipes_parsed.json）")
+    parser.add_argument("--output", "-o", default="public/recipes", help="输出目录（默认: public/recipes）")
+    parser.add_argument("--by", choices=SHARD_MODES, default="size", help="分片方式（默认: size）")
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE, help=f"每个分片的菜谱数（默认: {SHARD_SIZE}）")
+    parser.add_argument("--keep-old", action="store_true", help="保留不再被引用的旧分片")
+    parser.add_argument(
+        "--keep-generations", type=int, default=KEEP_GENERATIONS,
+        help=f"清理时保留最近几次构建引用的文件（默认: {KEEP_GENERATIONS}，即本次和上一次）",
+    )
+    parser.add_argument("--show", metavar="ID", help="构建后输出指定菜谱的完整记录")
+    args = parser.parse_args()
+
+    build_bundle(args.input, args.output, args.by, args.shard_size, prune=not args.keep_old, keep_generations=args.keep_generations)
+    if args.show:
+        print(json.dumps(load_detail(args.output, args.show), ensure_ascii=False, indent=2))
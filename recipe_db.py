@@ -0,0 +1,425 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+把提取结果导出为规范化的 SQLite 数据库，便于分析和临时查询
+
+表结构：
+- recipes：每个菜谱一行，source_file 唯一；time_minutes 为耗时换算的分钟数（无法换算时为 NULL）
+- recipe_categories：菜谱 -> 分类
+- ingredients：食材，role 为 main / auxiliary / seasoning，norm_name 为规范化后的食材名
+- steps、images：步骤和封面图片，按 position 排序
+- recipes_fts：FTS5 全文索引（名称、描述、步骤、小窍门），rowid 即 recipes.id
+
+SQLite 没有适合中文的内置分词器，写入 FTS 前先把每段中文切成重叠的二元字组，并在段尾补上最后一个单字
+（英文和数字按词）。分段在去掉空白之前进行，空白和标点都是段的边界，各步骤分别切分，词元不会跨词或跨步骤。查询时多字的中文段切成二元字组作为短语查询，与子串匹配等价；
+单字查询用前缀查询 "字"*，匹配以该字开头的二元字组或段尾单字，即任何位置出现该字的文本。
+
+导出按 source_file 增量 upsert：记录内容哈希未变时跳过，变化时重写该菜谱的全部子表行。
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import time
+import unicodedata
+from pathlib import Path
+from typing import Iterable, List, Optional, Union
+
+from recipe_stream import iter_recipes
+from search_index import normalize_ingredient_name
+
+SCHEMA_VERSION = "3"
+INGREDIENT_ROLES = (
+    ("main_ingredients", "main"),
+    ("auxiliary_ingredients", "auxiliary"),
+    ("seasonings", "seasoning"),
+)
+COMMIT_EVERY = 1000
+
+# 网站的耗时选项 -> 分钟数；"数小时"、"数天" 取偏大的估计，避免被"X分钟以内"的查询误选中
+TIME_MINUTES = {
+    "十分钟": 10,
+    "廿分钟": 20,
+    "半小时": 30,
+    "三刻钟": 45,
+    "一小时": 60,
+    "数小时": 180,
+    "一天": 1440,
+    "数天": 4320,
+}
+_TIME_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(分钟|分|小时|天)")
+_TIME_UNITS = {"分钟": 1, "分": 1, "小时": 60, "天": 1440}
+
+# CJK 字符连续段，或英文/数字词
+_TOKEN_RE = re.compile(r"[㐀-鿿豈-﫿]+|[0-9a-z]+")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS recipes (
+    id INTEGER PRIMARY KEY,
+    source_file TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    description TEXT,
+    flavor TEXT,
+    technique TEXT,
+    time TEXT,
+    time_minutes INTEGER,
+    difficulty TEXT,
+    tips TEXT,
+    tools TEXT,
+    content_hash TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_recipes_name ON recipes (name);
+CREATE INDEX IF NOT EXISTS idx_recipes_time ON recipes (time_minutes);
+CREATE TABLE IF NOT EXISTS recipe_categories (
+    recipe_id INTEGER NOT NULL REFERENCES recipes (id) ON DELETE CASCADE,
+    category TEXT NOT NULL,
+    PRIMARY KEY (recipe_id, category)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_categories_category ON recipe_categories (category, recipe_id);
+CREATE TABLE IF NOT EXISTS ingredients (
+    recipe_id INTEGER NOT NULL REFERENCES recipes (id) ON DELETE CASCADE,
+    role TEXT NOT NULL CHECK (role IN ('main', 'auxiliary', 'seasoning')),
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    norm_name TEXT NOT NULL,
+    amount TEXT,
+    unit TEXT,
+    quantity REAL,
+    unit_id TEXT,
+    PRIMARY KEY (recipe_id, role, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_ingredients_norm_name ON ingredients (norm_name, recipe_id);
+CREATE TABLE IF NOT EXISTS steps (
+    recipe_id INTEGER NOT NULL REFERENCES recipes (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    step_no TEXT,
+    description TEXT,
+    PRIMARY KEY (recipe_id, position)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS images (
+    recipe_id INTEGER NOT NULL REFERENCES recipes (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    PRIMARY KEY (recipe_id, position)
+) WITHOUT ROWID;
+CREATE VIRTUAL TABLE IF NOT EXISTS recipes_fts USING fts5 (name, description, steps, tips, tokenize = 'unicode61');
+"""
+
+
+def parse_time_minutes(text: str) -> Optional[int]:
+    """把耗时文本换算为分钟数：网站的固定选项查表，其余按 "N分钟/小时/天" 换算"""
+    if not text:
+        return None
+    text = text.strip()
+    if text in TIME_MINUTES:
+        return TIME_MINUTES[text]
+    match = _TIME_RE.search(text)
+    if match:
+        return round(float(match.group(1)) * _TIME_UNITS[match.group(2)])
+    return None
+
+
+def _runs(text: str) -> List[str]:
+    """全角转半角、转小写后切出中文段和英文/数字词；空白保留为边界，相邻的英文词不会连成一个"""
+    return _TOKEN_RE.findall(unicodedata.normalize("NFKC", text or "").lower())
+
+
+def bigram_tokens(text: str) -> List[str]:
+    """
+    写入 FTS 的词元：中文切成重叠的二元字组，每段末尾再补最后一个单字
+    （这样每个字都是某个词元的首字，单字查询可以用前缀匹配）；英文和数字按词
+    """
+    tokens = []
+    for run in _runs(text):
+        if run.isascii() or len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+            tokens.append(run[-1])
+    return tokens
+
+
+def fts_query(text: str) -> str:
+    """
+    把查询文本转为 FTS5 表达式，各段之间为 AND：
+    多字的中文段切成二元字组作为短语，单字用前缀查询，英文和数字按词
+    """
+    terms = []
+    for run in _runs(text):
+        if run.isascii():
+            terms.append(f'"{run}"')
+        elif len(run) == 1:
+            terms.append(f'"{run}"*')
+        else:
+            terms.append('"' + " ".join(run[i:i + 2] for i in range(len(run) - 1)) + '"')
+    return " AND ".join(terms)
+
+
+def _content_hash(recipe: dict) -> str:
+    return hashlib.sha1(json.dumps(recipe, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class RecipeDatabase:
+    """菜谱数据库；upsert 按 source_file 增量写入，close 时提交"""
+
+    def __init__(self, db_file: Union[str, Path]):
+        self.db_file = Path(db_file)
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_file))
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.executescript(SCHEMA)
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+        if row is not None and row[0] != SCHEMA_VERSION:
+            # 分词规则变化，按表中已有数据重建全文索引
+            self._rebuild_fts()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)", (SCHEMA_VERSION,)
+        )
+        self.conn.commit()
+        self._pending = 0
+
+    def _fts_row(self, recipe_id: int, name: str, description: str, steps: Iterable[str], tips: str) -> None:
+        self.conn.execute(
+            "INSERT INTO recipes_fts (rowid, name, description, steps, tips) VALUES (?, ?, ?, ?, ?)",
+            (
+                recipe_id,
+                " ".join(bigram_tokens(name)),
+                " ".join(bigram_tokens(description)),
+                " ".join(token for step in steps for token in bigram_tokens(step)),
+                " ".join(bigram_tokens(tips)),
+            ),
+        )
+
+    def _rebuild_fts(self) -> None:
+        self.conn.execute("DELETE FROM recipes_fts")
+        rows = self.conn.execute("SELECT id, name, description, tips FROM recipes").fetchall()
+        for recipe_id, name, description, tips in rows:
+            steps = [
+                text for (text,) in self.conn.execute(
+                    "SELECT description FROM steps WHERE recipe_id = ? ORDER BY position", (recipe_id,)
+                )
+            ]
+            self._fts_row(recipe_id, name or "", description or "", steps, tips or "")
+
+    def _delete_children(self, recipe_id: int) -> None:
+        for table in ("recipe_categories", "ingredients", "steps", "images"):
+            self.conn.execute(f"DELETE FROM {table} WHERE recipe_id = ?", (recipe_id,))
+        self.conn.execute("DELETE FROM recipes_fts WHERE rowid = ?", (recipe_id,))
+
+    def upsert(self, recipe: dict) -> str:
+        """写入一个菜谱，返回 "inserted" / "updated" / "unchanged" """
+        source_file = recipe.get("source_file") or ""
+        if not source_file:
+            raise ValueError(f"菜谱缺少 source_file: {recipe.get('name', '未知')}")
+        digest = _content_hash(recipe)
+        row = self.conn.execute(
+            "SELECT id, content_hash FROM recipes WHERE source_file = ?", (source_file,)
+        ).fetchone()
+        if row is not None and row[1] == digest:
+            return "unchanged"
+
+        values = (
+            recipe.get("name", ""),
+            recipe.get("description", ""),
+            recipe.get("flavor", ""),
+            recipe.get("technique", ""),
+            recipe.get("time", ""),
+            parse_time_minutes(recipe.get("time", "")),
+            recipe.get("difficulty", ""),
+            recipe.get("tips", ""),
+            recipe.get("tools", ""),
+            digest,
+            time.time(),
+        )
+        if row is None:
+            recipe_id = self.conn.execute(
+                "INSERT INTO recipes (name, description, flavor, technique, time, time_minutes, difficulty, "
+                "tips, tools, content_hash, updated_at, source_file) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (*values, source_file),
+            ).lastrowid
+            status = "inserted"
+        else:
+            recipe_id = row[0]
+            self.conn.execute(
+                "UPDATE recipes SET name = ?, description = ?, flavor = ?, technique = ?, time = ?, "
+                "time_minutes = ?, difficulty = ?, tips = ?, tools = ?, content_hash = ?, updated_at = ? "
+                "WHERE id = ?",
+                (*values, recipe_id),
+            )
+            self._delete_children(recipe_id)
+            status = "updated"
+
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO recipe_categories (recipe_id, category) VALUES (?, ?)",
+            [(recipe_id, category) for category in recipe.get("categories") or []],
+        )
+        self.conn.executemany(
+            "INSERT INTO ingredients (recipe_id, role, position, name, norm_name, amount, unit, quantity, unit_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    recipe_id, role, position, ing.get("name", ""), normalize_ingredient_name(ing.get("name", "")),
+                    ing.get("amount", ""), ing.get("unit", ""), ing.get("quantity"), ing.get("unit_id", ""),
+                )
+                for field, role in INGREDIENT_ROLES
+                for position, ing in enumerate(recipe.get(field) or [])
+            ],
+        )
+        steps = recipe.get("steps") or []
+        self.conn.executemany(
+            "INSERT INTO steps (recipe_id, position, step_no, description) VALUES (?, ?, ?, ?)",
+            [(recipe_id, position, step.get("step", ""), step.get("description", "")) for position, step in enumerate(steps)],
+        )
+        self.conn.executemany(
+            "INSERT INTO images (recipe_id, position, url) VALUES (?, ?, ?)",
+            [(recipe_id, position, url) for position, url in enumerate(recipe.get("cover_images") or [])],
+        )
+        self._fts_row(
+            recipe_id,
+            recipe.get("name", ""),
+            recipe.get("description", ""),
+            (step.get("description", "") for step in steps),
+            recipe.get("tips", ""),
+        )
+        self._pending += 1
+        if self._pending >= COMMIT_EVERY:
+            self.conn.commit()
+            self._pending = 0
+        return status
+
+    def prune(self, keep_sources: Iterable[str]) -> int:
+        """删除 source_file 不在 keep_sources 中的菜谱，返回删除数量"""
+        keep = set(keep_sources)
+        stale = [
+            recipe_id
+            for recipe_id, source_file in self.conn.execute("SELECT id, source_file FROM recipes")
+            if source_file not in keep
+        ]
+        for recipe_id in stale:
+            self.conn.execute("DELETE FROM recipes_fts WHERE rowid = ?", (recipe_id,))
+            # 子表通过外键级联删除
+            self.conn.execute("DELETE FROM recipes WHERE id = ?", (recipe_id,))
+        return len(stale)
+
+    def search(
+        self,
+        text: Optional[str] = None,
+        category: Optional[str] = None,
+        ingredient: Optional[str] = None,
+        max_minutes: Optional[int] = None,
+        limit: int = 50,
+    ) -> List[dict]:
+        """
+        组合查询：全文（名称/描述/步骤/小窍门）、分类（全等）、食材（规范化后全等）、耗时上限，条件之间为 AND
+        有全文条件时按 bm25 相关度排序，否则按 id 排序
+        """
+        joins, where, params = [], [], []
+        order = "r.id"
+        if text:
+            match = fts_query(text)
+            if match:
+                joins.append("JOIN recipes_fts f ON f.rowid = r.id")
+                where.append("recipes_fts MATCH ?")
+                params.append(match)
+                order = "bm25(recipes_fts)"
+        if category:
+            where.append("r.id IN (SELECT recipe_id FROM recipe_categories WHERE category = ?)")
+            params.append(category)
+        if ingredient:
+            where.append("r.id IN (SELECT recipe_id FROM ingredients WHERE norm_name = ?)")
+            params.append(normalize_ingredient_name(ingredient))
+        if max_minutes is not None:
+            where.append("r.time_minutes <= ?")
+            params.append(max_minutes)
+        sql = (
+            "SELECT r.id, r.source_file, r.name, r.time, r.time_minutes, r.difficulty FROM recipes r "
+            + " ".join(joins)
+            + (" WHERE " + " AND ".join(where) if where else "")
+            + f" ORDER BY {order} LIMIT ?"
+        )
+        columns = ("id", "source_file", "name", "time", "time_minutes", "difficulty")
+        return [dict(zip(columns, row)) for row in self.conn.execute(sql, (*params, limit))]
+
+    def counts(self) -> dict:
+        return {
+            table: self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("recipes", "recipe_categories", "ingredients", "steps", "images")
+        }
+
+    def optimize(self) -> None:
+        """合并 FTS 索引段并更新查询规划器统计信息"""
+        self.conn.execute("INSERT INTO recipes_fts (recipes_fts) VALUES ('optimize')")
+        self.conn.execute("ANALYZE")
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
+
+    def __enter__(self) -> "RecipeDatabase":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def export_recipes(input_file: Union[str, Path], db_file: Union[str, Path], prune: bool = False) -> dict:
+    """把菜谱文件（JSON数组或NDJSON）逐条 upsert 进数据库，返回各状态的数量"""
+    stats = {"inserted": 0, "updated": 0, "unchanged": 0, "skipped": 0, "pruned": 0}
+    sources = []
+    started = time.perf_counter()
+    with RecipeDatabase(db_file) as db:
+        for recipe in iter_recipes(input_file):
+            if not recipe.get("source_file"):
+                stats["skipped"] += 1
+                continue
+            sources.append(recipe["source_file"])
+            stats[db.upsert(recipe)] += 1
+        if prune:
+            stats["pruned"] = db.prune(sources)
+        if stats["inserted"] or stats["updated"] or stats["pruned"]:
+            db.optimize()
+        counts = db.counts()
+    print(
+        f"✓ 新增 {stats['inserted']}，更新 {stats['updated']}，未变化 {stats['unchanged']}，"
+        f"删除 {stats['pruned']}（耗时 {time.perf_counter() - started:.2f} 秒）-> {db_file}"
+    )
+    if stats["skipped"]:
+        print(f"✗ 跳过缺少 source_file 的记录 {stats['skipped']} 条")
+    print(json.dumps(counts, ensure_ascii=False))
+    return stats
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="菜谱数据导出为 SQLite（含中文全文索引）并查询")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_export = sub.add_parser("export", help="导出（按 source_file 增量更新）")
+    p_export.add_argument("input", help="菜谱文件（JSON数组或NDJSON）")
+    p_export.add_argument("db_file", help="SQLite 数据库文件")
+    p_export.add_argument("--prune", action="store_true", help="删除输入中已不存在的菜谱")
+    p_query = sub.add_parser("query", help="组合查询")
+    p_query.add_argument("db_file")
+    p_query.add_argument("--text", "-t", help="全文检索（名称、描述、步骤、小窍门）")
+    p_query.add_argument("--category", "-c", help="分类，如 凉菜")
+    p_query.add_argument("--ingredient", "-i", help="食材，如 黄瓜")
+    p_query.add_argument("--max-minutes", "-m", type=int, help="耗时上限（分钟）")
+    p_query.add_argument("--limit", "-n", type=int, default=20, help="最多返回条数（默认: 20）")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_recipes(args.input, args.db_file, args.prune)
+    else:
+        with RecipeDatabase(args.db_file) as db:
+            t0 = time.perf_counter()
+            rows = db.search(args.text, args.category, args.ingredient, args.max_minutes, args.limit)
+            elapsed_ms = (time.perf_counter() - t0) * 1000
+        for row in rows:
+            print(f"{row['id']}\t{row['name']}\t{row['time']}\t{row['source_file']}")
+        print(f"共 {len(rows)} 条（{elapsed_ms:.2f} ms）")
@@ -0,0 +1,288 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+菜谱数据后处理流水线
+
+把多个清洗步骤串成一条流水线，逐条流式读取一次输入、写出一次输出：
+- 过滤阶段（Filter）：谓词返回假值时丢弃该菜谱
+- 变换阶段（Transform）：返回新的菜谱记录，返回 None 时同样丢弃
+每个阶段单独统计输入、丢弃和修改的条数，可保存为JSON。
+
+内置阶段见 STAGES，自定义阶段用模块级函数构造 Filter/Transform 即可；
+workers > 1 时按批交给进程池处理，输出顺序与单进程一致（阶段函数需要可被 pickle）。
+"""
+
+import json
+import os
+import re
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from recipe_stream import RecipeWriter, detect_format, iter_recipes
+
+INGREDIENT_FIELDS = ("main_ingredients", "auxiliary_ingredients", "seasonings")
+DEFAULT_STAGES = ("normalize", "empty_ingredients", "missing_steps")
+BATCH_SIZE = 500
+
+_SPACE_RE = re.compile(r"\s+")
+# 描述首尾的中英文引号
+_QUOTES = "“”\"'「」"
+
+
+class Filter(NamedTuple):
+    """过滤阶段：predicate(recipe) 为假时丢弃"""
+    name: str
+    predicate: Callable[[dict], bool]
+
+
+class Transform(NamedTuple):
+    """变换阶段：func(recipe) 返回处理后的记录，返回 None 时丢弃"""
+    name: str
+    func: Callable[[dict], Optional[dict]]
+
+
+Stage = Union[Filter, Transform]
+
+
+def has_ingredients(recipe: dict) -> bool:
+    """检查是否有任何食材"""
+    return any(recipe.get(field) for field in INGREDIENT_FIELDS)
+
+
+def has_steps(recipe: dict) -> bool:
+    """检查是否至少有一个有文字的步骤"""
+    return any(step.get("description") for step in recipe.get("steps") or [])
+
+
+def has_images(recipe: dict) -> bool:
+    """检查是否有封面图片"""
+    return bool(recipe.get("cover_images"))
+
+
+def _clean_text(value: str) -> str:
+    return _SPACE_RE.sub(" ", value).strip()
+
+
+def _unique(items: Iterable) -> list:
+    """去重并保持原有顺序"""
+    return list(dict.fromkeys(item for item in items if item))
+
+
+def normalize_recipe(recipe: dict) -> Optional[dict]:
+    """
+    字段规范化：
+    - 名称和各文本字段合并连续空白、去掉首尾空白，描述去掉首尾引号
+    - 分类和封面图片去重，丢弃名称为空的食材
+    名称为空的菜谱无法展示，直接丢弃
+    """
+    recipe = dict(recipe)
+    for key, value in recipe.items():
+        if isinstance(value, str):
+            recipe[key] = _clean_text(value)
+    if not recipe.get("name"):
+        return None
+    if recipe.get("description"):
+        recipe["description"] = recipe["description"].strip(_QUOTES).strip()
+    for field in ("categories", "cover_images"):
+        if field in recipe:
+            recipe[field] = _unique(_clean_text(item) for item in recipe[field])
+    for field in INGREDIENT_FIELDS:
+        if field in recipe:
+            ingredients = []
+            for ing in recipe[field]:
+                name = _clean_text(ing.get("name", ""))
+                if name:
+                    ingredients.append({**ing, "name": name})
+            recipe[field] = ingredients
+    return recipe
+
+
+# 内置阶段，名称即统计中的键
+STAGES: Dict[str, Stage] = {
+    "normalize": Transform("normalize", normalize_recipe),
+    "empty_ingredients": Filter("empty_ingredients", has_ingredients),
+    "missing_steps": Filter("missing_steps", has_steps),
+    "no_images": Filter("no_images", has_images),
+}
+
+
+def apply_stages(recipe: dict, stages: Sequence[Stage]) -> Tuple[Optional[dict], Optional[str], List[str]]:
+    """依次执行各阶段，返回 (结果记录, 丢弃它的阶段名, 修改过它的变换阶段名列表)"""
+    modified = []
+    for stage in stages:
+        if isinstance(stage, Filter):
+            if not stage.predicate(recipe):
+                return None, stage.name, modified
+            continue
+        result = stage.func(recipe)
+        if result is None:
+            return None, stage.name, modified
+        if result != recipe:
+            modified.append(stage.name)
+        recipe = result
+    return recipe, None, modified
+
+
+class PipelineStats:
+    """各阶段的输入、丢弃、修改计数"""
+
+    def __init__(self, stages: Sequence[Stage]):
+        self.stage_names = [stage.name for stage in stages]
+        self.total = 0
+        self.written = 0
+        self.dropped: Counter = Counter()
+        self.modified: Counter = Counter()
+
+    def merge(self, other: "PipelineStats") -> None:
+        self.total += other.total
+        self.written += other.written
+        self.dropped.update(other.dropped)
+        self.modified.update(other.modified)
+
+    def to_dict(self) -> dict:
+        stages = []
+        remaining = self.total
+        for name in self.stage_names:
+            stages.append({
+                "stage": name,
+                "input": remaining,
+                "dropped": self.dropped[name],
+                "modified": self.modified[name],
+            })
+            remaining -= self.dropped[name]
+        return {"total": self.total, "written": self.written, "stages": stages}
+
+
+def run_batch(
+    records: List[dict], stages: Sequence[Stage], log_drops: bool = False
+) -> Tuple[List[dict], PipelineStats, List[str]]:
+    """处理一批记录，返回 (保留的记录, 本批统计, 丢弃日志)；多进程模式下在子进程中执行"""
+    stats = PipelineStats(stages)
+    kept = []
+    drops = []
+    for recipe in records:
+        stats.total += 1
+        result, dropped_by, modified = apply_stages(recipe, stages)
+        stats.modified.update(modified)
+        if result is None:
+            stats.dropped[dropped_by] += 1
+            if log_drops:
+                drops.append(
+                    f"删除菜谱 [{dropped_by}]: {recipe.get('name') or '未知'} (来源: {recipe.get('source_file', '未知')})"
+                )
+            continue
+        kept.append(result)
+    stats.written = len(kept)
+    return kept, stats, drops
+
+
+def _batches(records: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    it = iter(records)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def iter_batches(
+    records: Iterable[dict],
+    stages: Sequence[Stage],
+    workers: int = 1,
+    batch_size: int = BATCH_SIZE,
+    log_drops: bool = False,
+) -> Iterator[Tuple[List[dict], PipelineStats, List[str]]]:
+    """
+    按输入顺序逐批产出 run_batch 的结果
+    workers > 1 时使用进程池，仅保持有限个批次在途，内存占用有上界
+    """
+    batches = _batches(records, batch_size)
+    if workers <= 1:
+        for batch in batches:
+            yield run_batch(batch, stages, log_drops)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque(executor.submit(run_batch, batch, stages, log_drops) for batch in islice(batches, workers * 2))
+        while pending:
+            task = pending.popleft()
+            # 取出一个结果前补充一个新批次，保持窗口大小
+            for batch in islice(batches, 1):
+                pending.append(executor.submit(run_batch, batch, stages, log_drops))
+            yield task.result()
+
+
+def run_pipeline(
+    input_file: Union[str, Path],
+    output_file: Optional[Union[str, Path]] = None,
+    stages: Sequence[Stage] = tuple(STAGES[name] for name in DEFAULT_STAGES),
+    workers: int = 1,
+    batch_size: int = BATCH_SIZE,
+    stats_file: Optional[Union[str, Path]] = None,
+    verbose: bool = False,
+) -> PipelineStats:
+    """
+    对菜谱文件执行一遍流水线（逐条流式处理，内存占用与文件大小无关）
+    output_file 默认覆盖输入文件，格式按扩展名判断；verbose 时逐条打印被丢弃的菜谱
+    """
+    if output_file is None:
+        output_file = input_file
+    output_file = Path(output_file)
+    # 先写入临时文件，支持原地覆盖输入文件
+    tmp_file = output_file.with_name(output_file.name + ".tmp")
+    stats = PipelineStats(stages)
+
+    print(f"正在读取文件: {input_file}")
+    print(f"处理阶段: {' -> '.join(stats.stage_names)}")
+    started = time.perf_counter()
+    with RecipeWriter(tmp_file, detect_format(output_file)) as writer:
+        for kept, batch_stats, drops in iter_batches(iter_recipes(input_file), stages, workers, batch_size, verbose):
+            for line in drops:
+                print(line)
+            for recipe in kept:
+                writer.write(recipe)
+            stats.merge(batch_stats)
+    os.replace(tmp_file, output_file)
+    elapsed = time.perf_counter() - started
+
+    report = stats.to_dict()
+    print(f"原始菜谱数量: {report['total']}")
+    for item in report["stages"]:
+        print(f"  {item['stage']:<20} 输入 {item['input']:>8}  丢弃 {item['dropped']:>8}  修改 {item['modified']:>8}")
+    print(f"保留的菜谱数量: {report['written']}（耗时 {elapsed:.2f} 秒）")
+    if stats_file:
+        report["elapsed_s"] = round(elapsed, 3)
+        Path(stats_file).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"✓ 统计已保存到: {stats_file}")
+    print(f"✓ 完成 -> {output_file}")
+    return stats
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="菜谱数据后处理流水线（多个清洗步骤一次完成）")
+    parser.add_argument("input", nargs="?", default="recipes_parsed.json", help="输入文件（默认: recipes_parsed.json）")
+    parser.add_argument("--output", "-o", help="输出文件（默认覆盖输入文件）")
+    parser.add_argument(
+        "--stages", "-s", default=",".join(DEFAULT_STAGES),
+        help=f"逗号分隔的阶段，按顺序执行（可选: {', '.join(STAGES)}；默认: {','.join(DEFAULT_STAGES)}）",
+    )
+    parser.add_argument("--workers", "-w", type=int, default=1, help="并行进程数（默认: 1）")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help=f"每批记录数（默认: {BATCH_SIZE}）")
+    parser.add_argument("--stats", help="将各阶段统计保存为JSON文件")
+    parser.add_argument("--verbose", "-v", action="store_true", help="逐条打印被丢弃的菜谱")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.stages.split(",") if name.strip()]
+    unknown = [name for name in names if name not in STAGES]
+    if unknown:
+        parser.error(f"未知的阶段: {', '.join(unknown)}")
+    run_pipeline(
+        args.input, args.output, [STAGES[name] for name in names],
+        workers=args.workers, batch_size=args.batch_size, stats_file=args.stats, verbose=args.verbose,
+    )
@@ -0,0 +1,392 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+本地菜谱查询服务
+
+启动时把提取结果（JSON数组或NDJSON）读入内存并建立索引（倒排表见 search_index），
+提供分页列表、搜索、分类筛选、详情和按现有食材推荐的接口：
+
+- GET /api/recipes?category=&ingredient=&max_minutes=&page=&page_size=   分页列表（摘要）
+- GET /api/search?q=&category=&page=&page_size=                          按菜名/食材/分类/口味搜索
+- GET /api/recipes/<id>                                                  详情（完整记录）
+- GET /api/categories                                                    分类及菜谱数
+- GET /api/pantry?have=鸡蛋,番茄&max_missing=&page=&page_size=            按缺少的食材数排序推荐
+
+响应按 "路径+规范化后的查询参数" 放入 LRU 缓存，带 ETag（If-None-Match 命中返回 304），
+客户端支持时 gzip 压缩；数据在服务运行期间不变，缓存无需失效。
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple, Union
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from recipe_bundle import recipe_summary
+from recipe_db import parse_time_minutes
+from recipe_stream import iter_recipes
+from search_index import SearchIndexBuilder, normalize_ingredient_name, normalize_term
+
+DEFAULT_PORT = 8765
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+CACHE_SIZE = 2048
+# 小于该大小的响应不压缩
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 5
+
+
+class QueryError(ValueError):
+    """请求参数错误，返回 400"""
+
+
+class RecipeIndex:
+    """内存中的菜谱数据和索引；菜谱序号即输入中的位置，id 为 recipe_<序号>"""
+
+    def __init__(self, input_file: Union[str, Path]):
+        started = time.perf_counter()
+        builder = SearchIndexBuilder()
+        self.recipes: List[dict] = []
+        self.summaries: List[dict] = []
+        self.minutes: List[Optional[int]] = []
+        for ordinal, recipe in enumerate(iter_recipes(input_file)):
+            self.recipes.append(recipe)
+            summary = recipe_summary(f"recipe_{ordinal}", recipe, 0)
+            del summary["shard"]
+            self.summaries.append(summary)
+            self.minutes.append(parse_time_minutes(recipe.get("time", "")))
+            builder.add(ordinal, recipe)
+        self.names = builder.names
+        self.ingredients = builder.ingredients
+        self.categories = builder.categories
+        self.flavors = builder.flavors
+        # 每个菜谱的规范化食材集合，用于现有食材匹配
+        self.ingredient_sets: List[Set[str]] = [
+            {normalize_ingredient_name(name) for name, _, _ in summary["ingredients"]} - {""}
+            for summary in self.summaries
+        ]
+        # 用输入内容的摘要作为数据版本，参与 ETag 计算
+        self.version = hashlib.sha1(
+            "".join(s["id"] + s["name"] for s in self.summaries).encode("utf-8")
+        ).hexdigest()[:12]
+        self.load_seconds = time.perf_counter() - started
+
+    def __len__(self) -> int:
+        return len(self.recipes)
+
+    def ordinal_of(self, recipe_id: str) -> Optional[int]:
+        # isdigit 也接受 "²"、"١" 等字符，int() 会报错或把它们当作普通数字，只认 ASCII 数字
+        if not recipe_id.startswith("recipe_") or not (recipe_id[7:].isascii() and recipe_id[7:].isdecimal()):
+            return None
+        ordinal = int(recipe_id[7:])
+        return ordinal if ordinal < len(self.recipes) else None
+
+    def _term_matches(self, postings: Dict[str, List[int]], word: str) -> Set[int]:
+        """词表中包含 word 的词条对应的菜谱（子串匹配，扫描词表而非全部菜谱）"""
+        result: Set[int] = set()
+        for term, ordinals in postings.items():
+            if word in term:
+                result.update(ordinals)
+        return result
+
+    def _name_matches(self, word: str) -> Set[int]:
+        """菜名包含 word 的菜谱：二元字组倒排表求交集后逐条确认"""
+        grams = [word] if len(word) == 1 else [word[i:i + 2] for i in range(len(word) - 1)]
+        postings = sorted((self.names.get(gram, []) for gram in grams), key=len)
+        result = set(postings[0])
+        for ordinals in postings[1:]:
+            if not result:
+                break
+            result.intersection_update(ordinals)
+        return {i for i in result if word in normalize_term(self.summaries[i]["name"])}
+
+    def filter(
+        self,
+        ordinals: Optional[List[int]] = None,
+        category: Optional[str] = None,
+        ingredient: Optional[str] = None,
+        max_minutes: Optional[int] = None,
+    ) -> List[int]:
+        """在 ordinals（默认全部）中按分类（全等）、食材（子串）、耗时上限过滤，保持原有顺序"""
+        allowed: Optional[Set[int]] = None
+        if category:
+            allowed = set(self.categories.get(normalize_term(category), ()))
+        if ingredient:
+            found = self._term_matches(self.ingredients, normalize_ingredient_name(ingredient))
+            allowed = found if allowed is None else allowed & found
+        if ordinals is None:
+            ordinals = sorted(allowed) if allowed is not None else range(len(self.recipes))
+        elif allowed is not None:
+            ordinals = [i for i in ordinals if i in allowed]
+        if max_minutes is not None:
+            ordinals = [i for i in ordinals if self.minutes[i] is not None and self.minutes[i] <= max_minutes]
+        return list(ordinals)
+
+    def search(self, query: str) -> List[int]:
+        """
+        按相关度返回菜谱序号：整个查询词出现在菜名中的最优先（开头匹配更高），
+        其次按各查询词命中菜名、食材、分类、口味的加权和；相同分数按序号排序
+        """
+        words = [normalize_term(w) for w in query.split()]
+        words = [w for w in words if w]
+        whole = normalize_term(query)
+        if not words:
+            return []
+        scores: Dict[int, float] = {}
+
+        def _add(ordinals, weight):
+            for i in ordinals:
+                scores[i] = scores.get(i, 0) + weight
+
+        for word in words:
+            _add(self._name_matches(word), 10)
+            _add(self._term_matches(self.ingredients, word), 3)
+            _add(self._term_matches(self.categories, word), 2)
+            _add(self._term_matches(self.flavors, word), 1)
+        for i in self._name_matches(whole):
+            name = normalize_term(self.summaries[i]["name"])
+            scores[i] = scores.get(i, 0) + (100 if name == whole else 50 if name.startswith(whole) else 20)
+        return sorted(scores, key=lambda i: (-scores[i], i))
+
+    def pantry(self, have: List[str], max_missing: Optional[int] = None) -> List[Tuple[int, int, int]]:
+        """
+        按现有食材推荐：返回 (序号, 缺少的食材数, 命中的食材数)，
+        按缺少数升序、命中数降序排序；只考虑至少命中一种现有食材的菜谱
+        """
+        have_terms = {normalize_ingredient_name(name) for name in have} - {""}
+        candidates: Set[int] = set()
+        for term in have_terms:
+            candidates.update(self.ingredients.get(term, ()))
+        ranked = []
+        for i in candidates:
+            needed = self.ingredient_sets[i]
+            matched = len(needed & have_terms)
+            missing = len(needed) - matched
+            if max_missing is None or missing <= max_missing:
+                ranked.append((i, missing, matched))
+        ranked.sort(key=lambda item: (item[1], -item[2], item[0]))
+        return ranked
+
+
+class ResponseCache:
+    """线程安全的 LRU 响应缓存，值为 (ETag, JSON字节, gzip字节)"""
+
+    def __init__(self, max_entries: int = CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, bytes, Optional[bytes]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Tuple[str, bytes, Optional[bytes]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, entry: Tuple[str, bytes, Optional[bytes]]) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+def _int_param(params: Dict[str, str], name: str, default: Optional[int], low: int = 0, high: Optional[int] = None) -> Optional[int]:
+    value = params.get(name)
+    if value in (None, ""):
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise QueryError(f"参数 {name} 应为整数: {value}")
+    if number < low or (high is not None and number > high):
+        raise QueryError(f"参数 {name} 超出范围: {value}")
+    return number
+
+
+class RecipeService:
+    """路由与业务逻辑，与 HTTP 处理分开，便于在基准脚本中直接调用"""
+
+    def __init__(self, index: RecipeIndex, cache_size: int = CACHE_SIZE):
+        self.index = index
+        self.cache = ResponseCache(cache_size)
+
+    def _page(self, ordinals: List[int], params: Dict[str, str], extra: Optional[List[dict]] = None) -> dict:
+        page = _int_param(params, "page", 1, low=1)
+        page_size = _int_param(params, "page_size", PAGE_SIZE, low=1, high=MAX_PAGE_SIZE)
+        start = (page - 1) * page_size
+        items = []
+        for pos in range(start, min(start + page_size, len(ordinals))):
+            item = self.index.summaries[ordinals[pos]]
+            if extra is not None:
+                item = {**item, **extra[pos]}
+            items.append(item)
+        return {"total": len(ordinals), "page": page, "page_size": page_size, "items": items}
+
+    def handle(self, path: str, params: Dict[str, str]) -> Tuple[int, dict]:
+        """返回 (状态码, 响应对象)"""
+        index = self.index
+        if path == "/api/recipes":
+            ordinals = index.filter(
+                category=params.get("category"),
+                ingredient=params.get("ingredient"),
+                max_minutes=_int_param(params, "max_minutes", None),
+            )
+            return HTTPStatus.OK, self._page(ordinals, params)
+        if path.startswith("/api/recipes/"):
+            ordinal = index.ordinal_of(path[len("/api/recipes/"):])
+            if ordinal is None:
+                return HTTPStatus.NOT_FOUND, {"error": "菜谱不存在"}
+            return HTTPStatus.OK, {"id": f"recipe_{ordinal}", **index.recipes[ordinal]}
+        if path == "/api/search":
+            query = params.get("q", "").strip()
+            if not query:
+                raise QueryError("缺少参数 q")
+            ordinals = index.filter(
+                index.search(query),
+                category=params.get("category"),
+                max_minutes=_int_param(params, "max_minutes", None),
+            )
+            return HTTPStatus.OK, self._page(ordinals, params)
+        if path == "/api/categories":
+            counts = sorted(((term, len(ordinals)) for term, ordinals in index.categories.items()), key=lambda x: -x[1])
+            return HTTPStatus.OK, {"categories": [{"name": name, "count": count} for name, count in counts]}
+        if path == "/api/pantry":
+            have = [name for name in params.get("have", "").replace("，", ",").split(",") if name.strip()]
+            if not have:
+                raise QueryError("缺少参数 have（逗号分隔的食材名）")
+            ranked = index.pantry(have, _int_param(params, "max_missing", None))
+            if params.get("category"):
+                allowed = set(index.filter(category=params["category"]))
+                ranked = [item for item in ranked if item[0] in allowed]
+            extra = [{"missing": missing, "matched": matched} for _, missing, matched in ranked]
+            return HTTPStatus.OK, self._page([i for i, _, _ in ranked], params, extra)
+        if path == "/api/stats":
+            return HTTPStatus.OK, {
+                "recipes": len(index),
+                "version": index.version,
+                "load_seconds": round(index.load_seconds, 3),
+                "cache": self.cache.stats(),
+            }
+        return HTTPStatus.NOT_FOUND, {"error": f"未知的接口: {path}"}
+
+    def respond(self, target: str) -> Tuple[int, str, bytes, Optional[bytes]]:
+        """
+        处理请求目标（路径+查询串），返回 (状态码, ETag, JSON字节, gzip字节)
+        成功的响应按规范化的请求缓存；/api/stats 不缓存
+        """
+        parts = urlsplit(target)
+        path = parts.path.rstrip("/") or "/"
+        params = dict(parse_qsl(parts.query))
+        # 重新编码参数，值中含 & 或 = 时不会与其他参数组合撞键
+        key = path + "?" + urlencode(sorted(params.items()))
+        cacheable = path != "/api/stats"
+        if cacheable:
+            entry = self.cache.get(key)
+            if entry is not None:
+                return (HTTPStatus.OK, *entry)
+        try:
+            status, payload = self.handle(path, params)
+        except QueryError as e:
+            status, payload = HTTPStatus.BAD_REQUEST, {"error": str(e)}
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        etag = f'"{self.index.version}-{hashlib.sha1(body).hexdigest()[:16]}"'
+        gzipped = gzip.compress(body, GZIP_LEVEL) if len(body) >= GZIP_MIN_BYTES else None
+        if cacheable and status == HTTPStatus.OK:
+            self.cache.put(key, (etag, body, gzipped))
+        return status, etag, body, gzipped
+
+
+class RecipeRequestHandler(BaseHTTPRequestHandler):
+    # 支持长连接，压测和前端并发请求时不必每次重新建连
+    protocol_version = "HTTP/1.1"
+    # 头部和正文分两次写出，关闭 Nagle 算法，避免与客户端的延迟确认叠加出约 40ms 的固定延迟
+    disable_nagle_algorithm = True
+    service: RecipeService = None
+    quiet = False
+
+    def do_GET(self) -> None:
+        target = self.path
+        try:
+            # http.server 按 latin-1 解码请求行，未做百分号编码的中文需还原为 UTF-8
+            target = target.encode("latin-1").decode("utf-8")
+        except UnicodeError:
+            pass
+        status, etag, body, gzipped = self.service.respond(target)
+        if status == HTTPStatus.OK and etag in self.headers.get("If-None-Match", ""):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        use_gzip = gzipped is not None and "gzip" in self.headers.get("Accept-Encoding", "")
+        payload = gzipped if use_gzip else body
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("Access-Control-Allow-Origin", "*")
+        if status == HTTPStatus.OK:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        if gzipped is not None:
+            self.send_header("Vary", "Accept-Encoding")
+        if use_gzip:
+            self.send_header("Content-Encoding", "gzip")
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format: str, *args) -> None:
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+def make_server(
+    index: RecipeIndex, host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+    cache_size: int = CACHE_SIZE, quiet: bool = False,
+) -> ThreadingHTTPServer:
+    """创建（未启动的）服务；port 为 0 时由系统分配端口"""
+    handler = type(
+        "BoundRecipeRequestHandler", (RecipeRequestHandler,),
+        {"service": RecipeService(index, cache_size), "quiet": quiet},
+    )
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="本地菜谱查询服务")
+    parser.add_argument("input", nargs="?", default="recipes_parsed.json", help="菜谱文件（JSON数组或NDJSON，默认: recipes_parsed.json）")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址（默认: 127.0.0.1）")
+    parser.add_argument("--port", "-p", type=int, default=DEFAULT_PORT, help=f"端口（默认: {DEFAULT_PORT}）")
+    parser.add_argument("--cache-size", type=int, default=CACHE_SIZE, help=f"LRU 响应缓存条数（默认: {CACHE_SIZE}）")
+    parser.add_argument("--quiet", "-q", action="store_true", help="不输出访问日志")
+    args = parser.parse_args()
+
+    recipe_index = RecipeIndex(args.input)
+    print(f"✓ 已加载 {len(recipe_index)} 条菜谱（{recipe_index.load_seconds:.2f} 秒）")
+    httpd = make_server(recipe_index, args.host, args.port, args.cache_size, args.quiet)
+    print(f"服务已启动: http://{args.host}:{httpd.server_address[1]}/api/recipes")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
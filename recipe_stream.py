@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+菜谱数据的流式读写
+
+支持两种格式：
+- json：indent=2 的JSON数组（extract_recipe 的默认输出，供前端直接导入）
+- ndjson：每行一条紧凑JSON记录，便于追加和逐条处理
+
+iter_recipes 可按常量内存逐条读取两种格式，RecipeWriter 逐条写出，
+下游脚本无需一次性 json.load 整个文件。
+"""
+
+import json
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Union
+
+OUTPUT_FORMATS = ("json", "ndjson")
+NDJSON_SUFFIXES = (".ndjson", ".jsonl")
+# 读写缓冲区大小
+BUFFER_SIZE = 1 << 20
+_READ_CHUNK = 1 << 16
+
+
+def detect_format(path: Union[str, Path]) -> str:
+    """根据扩展名判断格式：.ndjson/.jsonl 为 ndjson，其余为 json"""
+    return "ndjson" if Path(path).suffix.lower() in NDJSON_SUFFIXES else "json"
+
+
+class RecipeWriter:
+    """
+    逐条写出菜谱记录，json 格式的输出与一次性 json.dump(indent=2) 的数组逐条拼接结果一致
+    append=True 时在已有文件末尾继续追加，仅 ndjson 格式支持
+    """
+
+    def __init__(self, output_file: Union[str, Path], fmt: Optional[str] = None, append: bool = False):
+        self.output_file = Path(output_file)
+        self.fmt = fmt or detect_format(self.output_file)
+        if self.fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"未知的输出格式: {self.fmt}")
+        if append and self.fmt != "ndjson":
+            raise ValueError("只有 ndjson 格式支持追加写入")
+        self.count = 0
+        self._out = open(self.output_file, "a" if append else "w", encoding="utf-8", buffering=BUFFER_SIZE)
+        if self.fmt == "json":
+            self._out.write("[\n")
+
+    def write(self, recipe: dict) -> None:
+        if self.fmt == "ndjson":
+            self._out.write(json.dumps(recipe, ensure_ascii=False, separators=(",", ":")))
+            self._out.write("\n")
+        else:
+            if self.count:
+                self._out.write(",\n")
+            json.dump(recipe, self._out, ensure_ascii=False, indent=2)
+        self.count += 1
+
+    def flush(self) -> None:
+        self._out.flush()
+
+    def close(self) -> None:
+        if self._out.closed:
+            return
+        if self.fmt == "json":
+            self._out.write("\n]\n")
+        self._out.close()
+
+    def __enter__(self) -> "RecipeWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _iter_ndjson(f) -> Iterator[dict]:
+    for line in f:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def _iter_json_array(f, buf: str) -> Iterator[dict]:
+    """增量解析JSON数组：每次只在缓冲区中保留尚未解析完的一条记录"""
+    decoder = json.JSONDecoder()
+    pos = buf.index("[") + 1
+    eof = False
+    while True:
+        # 跳过空白和分隔符
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            chunk = f.read(_READ_CHUNK)
+            buf, pos, eof = buf[pos:] + chunk, 0, not chunk
+        if pos >= len(buf) or buf[pos] == "]":
+            return
+        try:
+            record, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # 记录跨越了缓冲区边界，读入更多内容后重试
+            chunk = f.read(_READ_CHUNK)
+            buf, pos, eof = buf[pos:] + chunk, 0, not chunk
+            continue
+        yield record
+        pos = end
+
+
+def iter_recipes(input_file: Union[str, Path]) -> Iterator[dict]:
+    """逐条读取菜谱记录，自动识别JSON数组或NDJSON格式"""
+    with open(input_file, "r", encoding="utf-8", buffering=BUFFER_SIZE) as f:
+        buf = ""
+        while not buf.strip():
+            chunk = f.read(_READ_CHUNK)
+            if not chunk:
+                return
+            buf += chunk
+        if buf.lstrip().startswith("["):
+            yield from _iter_json_array(f, buf)
+        else:
+            for record in _iter_ndjson((buf + f.readline()).splitlines()):
+                yield record
+            yield from _iter_ndjson(f)
+
+
+def write_recipes(recipes: Iterable[dict], output_file: Union[str, Path], fmt: Optional[str] = None) -> int:
+    """把记录逐条写入文件，返回写入数量"""
+    with RecipeWriter(output_file, fmt) as writer:
+        for recipe in recipes:
+            writer.write(recipe)
+    return writer.count
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="菜谱数据格式转换（JSON数组 <-> NDJSON）")
+    parser.add_argument("input", help="输入文件（JSON数组或NDJSON）")
+    parser.add_argument("output", help="输出文件")
+    parser.add_argument("--format", "-F", choices=OUTPUT_FORMATS, help="输出格式（默认按扩展名判断）")
+    args = parser.parse_args()
+
+    count = write_recipes(iter_recipes(args.input), args.output, args.format)
+    print(f"✓ 已转换 {count} 条数据 -> {args.output}")
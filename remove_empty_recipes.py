@@ -2,59 +2,19 @@
 # -*- coding: utf-8 -*-
 """
 删除所需食材为空的菜谱
+
+等同于只包含 empty_ingredients 阶段的 recipe_pipeline，
+需要同时做其他清洗时直接使用 recipe_pipeline.py，一次读写完成全部阶段。
 """
 
-import json
-from pathlib import Path
+# has_ingredients 保留在本模块的导入路径下，兼容原有调用
+from recipe_pipeline import STAGES, has_ingredients, run_pipeline
+
 
 def remove_empty_recipes(input_file, output_file=None):
-    """删除食材为空的菜谱"""
-    
-    if output_file is None:
-        output_file = input_file
-    
-    print(f"正在读取文件: {input_file}")
-    
-    # 读取JSON文件
-    with open(input_file, 'r', encoding='utf-8') as f:
-        recipes = json.load(f)
-    
-    print(f"原始菜谱数量: {len(recipes)}")
-    
-    # 过滤掉食材为空的菜谱
-    filtered_recipes = []
-    removed_count = 0
-    
-    for recipe in recipes:
-        # 检查是否有任何食材
-        main_ingredients = recipe.get('main_ingredients', [])
-        auxiliary_ingredients = recipe.get('auxiliary_ingredients', [])
-        seasonings = recipe.get('seasonings', [])
-        
-        # 检查是否所有食材数组都为空
-        has_ingredients = (
-            (main_ingredients and len(main_ingredients) > 0) or
-            (auxiliary_ingredients and len(auxiliary_ingredients) > 0) or
-            (seasonings and len(seasonings) > 0)
-        )
-        
-        if has_ingredients:
-            filtered_recipes.append(recipe)
-        else:
-            removed_count += 1
-            print(f"删除菜谱: {recipe.get('name', '未知')} (来源: {recipe.get('source_file', '未知')})")
-    
-    print(f"\n删除的菜谱数量: {removed_count}")
-    print(f"保留的菜谱数量: {len(filtered_recipes)}")
-    
-    # 保存过滤后的数据
-    print(f"\n正在保存到: {output_file}")
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(filtered_recipes, f, ensure_ascii=False, indent=2)
-    
-    print("✓ 完成！")
+    """删除食材为空的菜谱（逐条流式处理，内存占用与文件大小无关）"""
+    return run_pipeline(input_file, output_file, [STAGES["empty_ingredients"]], verbose=True)
 
 if __name__ == '__main__':
     input_file = 'recipes_parsed.json'
     remove_empty_recipes(input_file)
-
@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+前端搜索用的倒排索引
+
+由 recipe_bundle 在构建数据包时一并生成（search-<哈希>.json，文件名写入 manifest 的 search 字段），
+前端按查询词直接取倒排表得到候选菜谱，只对候选打分，不再逐条扫描全部菜谱和食材：
+- names：菜名的单字和二元字组 -> 菜谱序号列表
+- ingredients：规范化的食材名 -> 菜谱序号列表
+- ingredient_names：原始食材名（只做 normalize_term，保留括号注释和标点）-> 菜谱序号列表
+- categories / flavors / techniques：分类、口味、工艺 -> 菜谱序号列表
+- ingredient_dict：规范化食材名 -> 出现过的原始写法（按出现次数排序）
+倒排表长度即文档频率（df），doc_count 为菜谱总数，供前端按 idf 加权。
+菜谱序号即 manifest 中 recipes 的下标（id 为 recipe_<序号>）。
+
+描述不建倒排表（体积与描述总长相当），前端对描述仍逐条做一次子串检查后并入候选；
+候选集合应覆盖前端 searchAndSortRecipes 逐条匹配的全部结果（见 scan）。
+"""
+
+import json
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Union
+
+from recipe_stream import iter_recipes
+
+SEARCH_INDEX_VERSION = 2
+NGRAM_SIZES = (1, 2)
+INGREDIENT_FIELDS = ("main_ingredients", "auxiliary_ingredients", "seasonings")
+# 每个规范化食材名最多保留的原始写法数
+MAX_VARIANTS = 5
+
+# 食材名中的括号注释，如 "鸡蛋（大）"、"面粉(中筋)"
+_BRACKET_RE = re.compile(r"[(（\[【][^)）\]】]*[)）\]】]")
+_SPACE_RE = re.compile(r"\s+")
+_TRIM_CHARS = ".,;:、，。；：!！?？~～-—_/\\|*"
+
+
+def normalize_term(text: str) -> str:
+    """全角转半角、转小写、去掉空白，查询词和索引词使用同一规则"""
+    return _SPACE_RE.sub("", unicodedata.normalize("NFKC", text).lower())
+
+
+def normalize_ingredient_name(name: str) -> str:
+    """规范化食材名：在 normalize_term 的基础上去掉括号注释和首尾标点"""
+    return normalize_term(_BRACKET_RE.sub("", unicodedata.normalize("NFKC", name))).strip(_TRIM_CHARS)
+
+
+def name_ngrams(name: str) -> Set[str]:
+    """菜名的单字和二元字组"""
+    text = normalize_term(name)
+    return {text[i:i + n] for n in NGRAM_SIZES for i in range(len(text) - n + 1)}
+
+
+class SearchIndexBuilder:
+    """按菜谱序号递增的顺序逐条 add，倒排表天然有序"""
+
+    def __init__(self):
+        self.doc_count = 0
+        self.names: Dict[str, List[int]] = defaultdict(list)
+        self.ingredients: Dict[str, List[int]] = defaultdict(list)
+        self.categories: Dict[str, List[int]] = defaultdict(list)
+        self.flavors: Dict[str, List[int]] = defaultdict(list)
+        self.techniques: Dict[str, List[int]] = defaultdict(list)
+        self.ingredient_names: Dict[str, List[int]] = defaultdict(list)
+        self.variants: Dict[str, Counter] = defaultdict(Counter)
+
+    def add(self, ordinal: int, recipe: dict) -> None:
+        self.doc_count = max(self.doc_count, ordinal + 1)
+        for gram in name_ngrams(recipe.get("name", "")):
+            self.names[gram].append(ordinal)
+
+        ingredient_terms = set()
+        raw_terms = set()
+        for field in INGREDIENT_FIELDS:
+            for ing in recipe.get(field) or []:
+                raw = ing.get("name", "")
+                raw_terms.add(normalize_term(raw))
+                term = normalize_ingredient_name(raw)
+                if term:
+                    ingredient_terms.add(term)
+                    self.variants[term][raw] += 1
+        for term in ingredient_terms:
+            self.ingredients[term].append(ordinal)
+        for term in raw_terms - {""}:
+            self.ingredient_names[term].append(ordinal)
+
+        for term in {normalize_term(c) for c in recipe.get("categories") or []} - {""}:
+            self.categories[term].append(ordinal)
+        flavor = normalize_term(recipe.get("flavor", ""))
+        if flavor:
+            self.flavors[flavor].append(ordinal)
+        technique = normalize_term(recipe.get("technique", ""))
+        if technique:
+            self.techniques[technique].append(ordinal)
+
+    def to_dict(self) -> dict:
+        return {
+            "version": SEARCH_INDEX_VERSION,
+            "doc_count": self.doc_count,
+            "ngram_sizes": list(NGRAM_SIZES),
+            "names": dict(self.names),
+            "ingredients": dict(self.ingredients),
+            "ingredient_names": dict(self.ingredient_names),
+            "categories": dict(self.categories),
+            "flavors": dict(self.flavors),
+            "techniques": dict(self.techniques),
+            "ingredient_dict": {
+                term: [raw for raw, _ in counts.most_common(MAX_VARIANTS)]
+                for term, counts in sorted(self.variants.items())
+            },
+        }
+
+
+def build_search_index(recipes: Iterable[dict]) -> dict:
+    """对菜谱序列（序号即位置）构建索引"""
+    builder = SearchIndexBuilder()
+    for ordinal, recipe in enumerate(recipes):
+        builder.add(ordinal, recipe)
+    return builder.to_dict()
+
+
+def lookup(index: dict, query: str, descriptions: Optional[List[str]] = None, fuzzy: bool = True) -> Set[int]:
+    """
+    按与前端 findCandidates 相同的规则取候选菜谱序号（用于校验索引和调试）：
+    对各查询词及整个查询，菜名包含其全部二元字组，或食材（规范化名或原始名）、分类、口味、工艺中包含它；
+    fuzzy 时再加上可能与查询相似（编辑距离相似度 > 0.5）的菜名；
+    提供 descriptions（按序号排列的描述）时并入描述包含整个查询的菜谱
+    """
+    candidates: Set[int] = set()
+    words = [w for w in (normalize_term(w) for w in query.split()) if w]
+    whole = normalize_term(query)
+    for word in words + [whole] if whole and whole not in words else words:
+        grams = [word] if len(word) == 1 else [word[i:i + 2] for i in range(len(word) - 1)]
+        postings = [set(index["names"].get(gram, ())) for gram in grams]
+        candidates |= set.intersection(*postings)
+        for field in ("ingredients", "ingredient_names", "categories", "flavors", "techniques"):
+            for term, ordinals in index[field].items():
+                if word in term:
+                    candidates.update(ordinals)
+    if fuzzy and whole:
+        candidates |= _fuzzy_name_candidates(index, query)
+    if descriptions is not None:
+        lower_query = query.lower().strip()
+        candidates.update(i for i, text in enumerate(descriptions) if lower_query and lower_query in (text or "").lower())
+    return candidates
+
+
+def _fuzzy_name_candidates(index: dict, query: str) -> Set[int]:
+    """
+    相似度 > 0.5 要求对齐的相同字符数 m 超过查询长度的一半；m 不超过查询中出现在菜名里的字符数 W
+    加上查询中的空白数 s，因此只需取 2W + s > 查询字符数 的菜名
+    """
+    lower_query = query.lower().strip()
+    whole = normalize_term(query)
+    spaces = sum(1 for ch in lower_query if ch.isspace())
+    weights = Counter(whole)
+    counts: Dict[int, int] = defaultdict(int)
+    for ch, weight in weights.items():
+        for ordinal in index["names"].get(ch, ()):
+            counts[ordinal] += weight
+    return {ordinal for ordinal, count in counts.items() if 2 * count + spaces > len(whole)}
+
+
+def similarity(a: str, b: str) -> float:
+    """与前端 calculateSimilarity 相同：1 - 编辑距离 / 较长串长度（有一方为空时返回另一方长度）"""
+    if not a:
+        return len(b)
+    if not b:
+        return len(a)
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(prev[j - 1] if ca == cb else min(prev[j - 1], cur[j - 1], prev[j]) + 1)
+        prev = cur
+    return 1 - prev[-1] / max(len(a), len(b))
+
+
+def scan(recipes: List[dict], query: str) -> Set[int]:
+    """
+    逐条扫描的参照实现，与前端 searchAndSortRecipes（全部分类）的匹配条件相同：
+    菜名包含整个查询或任一查询词、或与查询相似；原始分类、原始食材名包含整个查询或任一查询词；
+    描述、工艺、口味包含整个查询。lookup（带 descriptions）的结果应覆盖它
+    """
+    lower_query = query.lower().strip()
+    if not lower_query:
+        return set()
+    words = lower_query.split()
+
+    def _has(text: str) -> bool:
+        text = text.lower()
+        return lower_query in text or any(w in text for w in words)
+
+    result = set()
+    for i, r in enumerate(recipes):
+        name = r.get("name", "").lower()
+        if (
+            _has(name)
+            or similarity(name, lower_query) > 0.5
+            or any(_has(c) for c in r.get("categories") or [])
+            or lower_query in (r.get("description") or "").lower()
+            or any(_has(ing.get("name", "")) for f in INGREDIENT_FIELDS for ing in r.get(f) or [])
+            or lower_query in (r.get("technique") or "").lower()
+            or lower_query in (r.get("flavor") or "").lower()
+        ):
+            result.add(i)
+    return result
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="构建或查询菜谱搜索倒排索引")
+    parser.add_argument("input", nargs="?", default="recipes_parsed.json", help="菜谱文件（默认: recipes_parsed.json）")
+    parser.add_argument("--output", "-o", help="将索引保存为JSON文件")
+    parser.add_argument("--query", "-q", help="构建后查询，并与逐条扫描的结果对比")
+    args = parser.parse_args()
+
+    recipes = list(iter_recipes(args.input))
+    started = time.perf_counter()
+    index = build_search_index(recipes)
+    print(
+        f"✓ {index['doc_count']} 条菜谱：菜名字组 {len(index['names'])} 个，食材 {len(index['ingredients'])} 个，"
+        f"分类 {len(index['categories'])} 个（{time.perf_counter() - started:.2f} 秒）"
+    )
+    if args.output:
+        Path(args.output).write_text(json.dumps(index, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        print(f"✓ 索引已保存到: {args.output}")
+    if args.query:
+        t0 = time.perf_counter()
+        found = lookup(index, args.query, [r.get("description", "") for r in recipes])
+        indexed_ms = (time.perf_counter() - t0) * 1000
+        t0 = time.perf_counter()
+        scanned = scan(recipes, args.query)
+        scan_ms = (time.perf_counter() - t0) * 1000
+        print(f"索引查询 {len(found)} 条（{indexed_ms:.2f} ms），逐条扫描 {len(scanned)} 条（{scan_ms:.2f} ms）")
+        print(f"{'✓' if scanned <= found else '✗'} 索引候选覆盖全部扫描结果")
@@ -3,7 +3,7 @@ import { useParams, useNavigate } from 'react-router-dom';
 import { storage } from '../utils/storage';
 import { checkRecipeAvailability } from '../utils/helpers';
 import { Recipe, Ingredient, TodayMenuItem } from '../types';
-import { loadRecipesFromJSON } from '../utils/recipeDataLoader';
+import { loadRecipeDetail } from '../utils/recipeDataLoader';
 import RecipeImage from '../components/RecipeImage';
 
 export default function RecipeDetail() {
@@ -17,15 +17,14 @@ export default function RecipeDetail() {
   useEffect(() => {
     const loadData = async () => {
       try {
-        // 从 JSON 文件加载菜谱数据
-        const recipesData = loadRecipesFromJSON();
-        const [ingredientsData, menuData] = await Promise.all([
+        // 只加载该菜谱所在的详情分片
+        const [foundRecipe, ingredientsData, menuData] = await Promise.all([
+          id ? loadRecipeDetail(id) : Promise.resolve(null),
           Promise.resolve(storage.getIngredients()),
           Promise.resolve(storage.getTodayMenu()),
         ]);
         
-        const foundRecipe = recipesData.find(r => r.id === id);
-        setRecipe(foundRecipe || null);
+        setRecipe(foundRecipe);
         setIngredients(ingredientsData);
         setTodayMenu(menuData);
       } catch (error) {
@@ -5,7 +5,8 @@ import { storage } from '../utils/storage';
 import { checkRecipeAvailability } from '../utils/helpers';
 import { getRecommendedRecipes, sortRecipesByAvailability } from '../utils/searchHelpers';
 import { RecipeCategory, Recipe, Ingredient, TodayMenuItem } from '../types';
-import { loadRecipesFromJSON } from '../utils/recipeDataLoader';
+import { loadRecipeIndex } from '../utils/recipeDataLoader';
+import { SearchIndex, loadSearchIndex } from '../utils/searchIndex';
 import RecipeImage from '../components/RecipeImage';
 
 export default function RecipeHome() {
@@ -17,6 +18,7 @@ export default function RecipeHome() {
   const [searchQuery, setSearchQuery] = useState('');
   const [selectedCategory, setSelectedCategory] = useState<RecipeCategory>('全部');
   const [showAllRecipes, setShowAllRecipes] = useState(false); // 是否显示所有菜谱
+  const [searchIndex, setSearchIndex] = useState<SearchIndex | null>(null); // 搜索倒排索引，首次搜索时加载
 
   const categories: RecipeCategory[] = ['全部', '热菜', '凉菜', '汤羹', '主食', '小吃', '西餐', '烘焙', '饮品', '泡酱腌菜', '其它'];
 
@@ -25,13 +27,22 @@ export default function RecipeHome() {
     setShowAllRecipes(false);
   }, [searchQuery, selectedCategory]);
 
+  // 首次输入搜索词时加载搜索索引（没有索引时退回逐条匹配）
+  useEffect(() => {
+    if (searchQuery.trim() && !searchIndex) {
+      loadSearchIndex().then(index => {
+        if (index) setSearchIndex(index);
+      });
+    }
+  }, [searchQuery, searchIndex]);
+
   // 加载数据
   useEffect(() => {
     const loadData = async () => {
       try {
-        // 从 JSON 文件加载菜谱数据
-        const recipesData = loadRecipesFromJSON();
-        const [ingredientsData, menuData] = await Promise.all([
+        // 只加载菜谱摘要索引，详情在进入详情页时按需加载
+        const [recipesData, ingredientsData, menuData] = await Promise.all([
+          loadRecipeIndex(),
           Promise.resolve(storage.getIngredients()),
           Promise.resolve(storage.getTodayMenu()),
         ]);
@@ -83,6 +94,10 @@ export default function RecipeHome() {
     
     // 如果有搜索词，使用智能搜索
     if (searchQuery.trim()) {
+      if (searchIndex) {
+        // 索引中的序号对应完整列表的下标，传入完整列表，由搜索函数按分类过滤
+        return getRecommendedRecipes(recipes, searchQuery, selectedCategory, ingredients, showAllRecipes, searchIndex);
+      }
       return getRecommendedRecipes(filteredRecipes, searchQuery, '全部', ingredients, showAllRecipes);
     }
     
@@ -95,7 +110,7 @@ export default function RecipeHome() {
       recommendations: [],
       hasMore: sortedResult.hasMore,
     };
-  }, [recipes, selectedCategory, searchQuery, ingredients, showAllRecipes]);
+  }, [recipes, selectedCategory, searchQuery, ingredients, showAllRecipes, searchIndex]);
 
   // 决定显示哪些菜谱
   const displayRecipes = searchResults.hasExactMatch 
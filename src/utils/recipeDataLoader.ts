@@ -1,13 +1,24 @@
-import recipesData from '../../recipes_parsed.json';
 import { Recipe, RecipeIngredient, CookingStep } from '../types';
 
+// JSON 中的食材：amount/unit 为原始拆分结果，quantity/unit_id 为提取时已换算好的数值和规范单位
+// （适量等不定量的 quantity 为 null，unit_id 为 "适量"）；旧版提取结果没有 quantity/unit_id
+export interface ParsedIngredient {
+  name: string;
+  amount: string;
+  unit: string;
+  quantity?: number | null;
+  unit_id?: string;
+}
+
+const VAGUE_AMOUNTS = new Set(['适量', '少许', '适当', '若干']);
+
 // JSON 数据格式类型
 export interface ParsedRecipeData {
   name: string;
   description: string;
-  main_ingredients: Array<{ name: string; amount: string; unit: string }>;
-  auxiliary_ingredients: Array<{ name: string; amount: string; unit: string }>;
-  seasonings: Array<{ name: string; amount: string; unit: string }>;
+  main_ingredients: ParsedIngredient[];
+  auxiliary_ingredients: ParsedIngredient[];
+  seasonings: ParsedIngredient[];
   flavor: string;
   technique: string;
   time: string;
@@ -20,75 +31,106 @@ export interface ParsedRecipeData {
   source_file: string;
 }
 
+// 列表页用的菜谱摘要（由 recipe_bundle.py 生成，食材为 [名称, 数量, 规范单位]）
+export interface RecipeSummary {
+  id: string;
+  name: string;
+  description: string;
+  cover: string;
+  categories: string[];
+  time: string;
+  flavor: string;
+  difficulty: string;
+  ingredients: Array<[string, number | null, string]>;
+  shard: number;
+}
+
+// 分片数据包的 manifest：摘要索引 + 详情分片文件列表（文件名带内容哈希）
+export interface RecipeManifest {
+  version: number;
+  generated_at: string;
+  shard_by: string;
+  shards: string[];
+  search?: string; // 搜索倒排索引文件（见 searchIndex.ts）
+  recipes: RecipeSummary[];
+}
+
+// 数据包目录，对应 public/recipes
+export const BUNDLE_BASE = `${import.meta.env.BASE_URL}recipes/`;
+
 // 9个主要分类
 export const MAIN_CATEGORIES = ['热菜', '凉菜', '汤羹', '主食', '小吃', '西餐', '烘焙', '饮品', '泡酱腌菜'] as const;
 export type MainCategory = typeof MAIN_CATEGORIES[number] | '其它';
 
-// 将 JSON 数据转换为 Recipe 类型
-function convertToRecipe(data: ParsedRecipeData, index: number): Recipe {
-  // 合并所有食材
-  const allIngredients: RecipeIngredient[] = [
-    ...data.main_ingredients.map(ing => ({
-      ingredientId: `ing_${index}_${ing.name}`,
-      ingredientName: ing.name,
-      quantity: ing.amount === '适量' || ing.amount === '少许' || ing.amount === '适当' || ing.amount === '若干' ? 0 : parseFloat(ing.amount) || 0,
-      unit: ing.unit || (ing.amount === '适量' || ing.amount === '少许' || ing.amount === '适当' || ing.amount === '若干' ? '适量' : ing.amount),
-    })),
-    ...data.auxiliary_ingredients.map(ing => ({
-      ingredientId: `ing_${index}_${ing.name}`,
-      ingredientName: ing.name,
-      quantity: ing.amount === '适量' || ing.amount === '少许' || ing.amount === '适当' || ing.amount === '若干' ? 0 : parseFloat(ing.amount) || 0,
-      unit: ing.unit || (ing.amount === '适量' || ing.amount === '少许' || ing.amount === '适当' || ing.amount === '若干' ? '适量' : ing.amount),
-    })),
-    ...data.seasonings.map(ing => ({
-      ingredientId: `ing_${index}_${ing.name}`,
-      ingredientName: ing.name,
-      quantity: ing.amount === '适量' || ing.amount === '少许' || ing.amount === '适当' || ing.amount === '若干' ? 0 : parseFloat(ing.amount) || 0,
-      unit: ing.unit || (ing.amount === '适量' || ing.amount === '少许' || ing.amount === '适当' || ing.amount === '若干' ? '适量' : ing.amount),
-    })),
-  ];
-
-  // 转换步骤
-  const steps: CookingStep[] = data.steps.map(step => ({
-    step: parseInt(step.step) || 0,
-    description: step.description,
-  }));
-
-  // 匹配分类：检查 categories 中是否包含主要分类（中文全等匹配）
-  const matchedCategories: string[] = [];
+// 匹配分类：检查 categories 中是否包含主要分类（中文全等匹配）
+function matchCategories(categories: string[]): string[] {
   const mainCategorySet = new Set(MAIN_CATEGORIES);
   
   // 检查是否有匹配的主要分类
-  const matchedMainCategories = data.categories.filter(cat => mainCategorySet.has(cat as any));
+  const matchedMainCategories = categories.filter(cat => mainCategorySet.has(cat as any));
   
   if (matchedMainCategories.length > 0) {
     // 如果匹配到主要分类，添加所有匹配的主要分类（允许出现在多个分类页）
-    matchedCategories.push(...matchedMainCategories);
-  } else {
-    // 如果没有匹配到主要分类，归为"其它"
-    matchedCategories.push('其它');
+    return matchedMainCategories;
   }
+  // 如果没有匹配到主要分类，归为"其它"
+  return ['其它'];
+}
 
-  // 从 time 字段提取分钟数（用于 cookTime）
+// 从 time 字段提取分钟数（用于 cookTime）
+function parseCookTime(time: string): number {
   let cookTime = 0;
-  if (data.time) {
-    const timeMatch = data.time.match(/(\d+)/);
+  if (time) {
+    const timeMatch = time.match(/(\d+)/);
     if (timeMatch) {
       cookTime = parseInt(timeMatch[1]);
       // 如果是"三刻钟"这样的，转换为45分钟
-      if (data.time.includes('刻钟')) {
+      if (time.includes('刻钟')) {
         cookTime = cookTime * 15;
       }
     }
   }
+  return cookTime;
+}
+
+// 食材数量和单位：优先用提取时换算好的 quantity/unit_id，旧版数据按原始 amount/unit 解析
+function ingredientAmount(ing: ParsedIngredient): { quantity: number; unit: string } {
+  if (ing.quantity !== undefined) {
+    return { quantity: ing.quantity ?? 0, unit: ing.unit_id || ing.unit };
+  }
+  const vague = VAGUE_AMOUNTS.has(ing.amount);
+  return {
+    quantity: vague ? 0 : parseFloat(ing.amount) || 0,
+    unit: ing.unit || (vague ? '适量' : ing.amount),
+  };
+}
+
+// 将 JSON 数据转换为 Recipe 类型
+function convertToRecipe(data: ParsedRecipeData, index: number): Recipe {
+  // 合并所有食材
+  const allIngredients: RecipeIngredient[] = [
+    ...data.main_ingredients,
+    ...data.auxiliary_ingredients,
+    ...data.seasonings,
+  ].map(ing => ({
+    ingredientId: `ing_${index}_${ing.name}`,
+    ingredientName: ing.name,
+    ...ingredientAmount(ing),
+  }));
+
+  // 转换步骤
+  const steps: CookingStep[] = data.steps.map(step => ({
+    step: parseInt(step.step) || 0,
+    description: step.description,
+  }));
 
   return {
     id: `recipe_${index}`,
     name: data.name,
-    category: matchedCategories as any[],
+    category: matchCategories(data.categories) as any[],
     image: data.cover_images[0] || undefined,
     description: data.description,
-    cookTime,
+    cookTime: parseCookTime(data.time),
     servings: 2, // 默认值
     ingredients: allIngredients,
     steps,
@@ -109,11 +151,102 @@ function convertToRecipe(data: ParsedRecipeData, index: number): Recipe {
   } as Recipe & { _originalData?: any };
 }
 
-// 加载所有菜谱数据
-export function loadRecipesFromJSON(): Recipe[] {
-  const recipes = (recipesData as ParsedRecipeData[]).map((data, index) => 
-    convertToRecipe(data, index)
-  );
-  return recipes;
+// 将摘要转换为 Recipe 类型（不含步骤和完整食材明细，列表页展示、搜索和库存检查够用）
+function convertSummaryToRecipe(summary: RecipeSummary): Recipe {
+  const index = summary.id.replace('recipe_', '');
+  return {
+    id: summary.id,
+    name: summary.name,
+    category: matchCategories(summary.categories) as any[],
+    image: summary.cover || undefined,
+    description: summary.description || '',
+    cookTime: parseCookTime(summary.time),
+    servings: 2, // 默认值
+    ingredients: summary.ingredients.map(([name, quantity, unit]) => ({
+      ingredientId: `ing_${index}_${name}`,
+      ingredientName: name,
+      quantity: quantity ?? 0,
+      unit,
+    })),
+    steps: [],
+    taste: summary.flavor || undefined,
+    time: summary.time || undefined,
+    difficulty: summary.difficulty || undefined,
+    // 搜索按全部原始分类匹配，封面取自 cover_images，与完整数据保持一致
+    _originalData: {
+      categories: summary.categories,
+      cover_images: summary.cover ? [summary.cover] : [],
+    },
+  } as Recipe & { _originalData?: any };
+}
+
+// manifest 和已加载的分片按文件名缓存，同一会话内只请求一次
+let manifestPromise: Promise<RecipeManifest | null> | null = null;
+const shardCache = new Map<string, Promise<Record<string, ParsedRecipeData>>>();
+
+export async function fetchJSON<T>(url: string): Promise<T> {
+  const response = await fetch(url);
+  if (!response.ok) {
+    throw new Error(`${response.status} ${url}`);
+  }
+  return response.json() as Promise<T>;
+}
+
+// 加载 manifest；数据包尚未构建时返回 null，改用完整的 recipes_parsed.json
+export function loadManifest(): Promise<RecipeManifest | null> {
+  if (!manifestPromise) {
+    // manifest 文件名固定，每次都向服务器确认是否有更新
+    manifestPromise = fetch(`${BUNDLE_BASE}manifest.json`, { cache: 'no-cache' })
+      .then(response => (response.ok ? (response.json() as Promise<RecipeManifest>) : null))
+      .catch(() => null);
+  }
+  return manifestPromise;
+}
+
+function loadShard(file: string): Promise<Record<string, ParsedRecipeData>> {
+  let shard = shardCache.get(file);
+  if (!shard) {
+    shard = fetchJSON<Record<string, ParsedRecipeData>>(`${BUNDLE_BASE}${file}`);
+    // 请求失败时不缓存，允许重试
+    shard.catch(() => shardCache.delete(file));
+    shardCache.set(file, shard);
+  }
+  return shard;
+}
+
+// 回退：按需导入完整数据（单独打包，只在没有数据包时加载）
+async function loadAllParsedData(): Promise<ParsedRecipeData[]> {
+  const { default: recipesData } = await import('../../recipes_parsed.json');
+  return recipesData as ParsedRecipeData[];
+}
+
+// 加载列表页数据：只加载 manifest 中的摘要索引
+export async function loadRecipeIndex(): Promise<Recipe[]> {
+  const manifest = await loadManifest();
+  if (manifest) {
+    return manifest.recipes.map(convertSummaryToRecipe);
+  }
+  const recipesData = await loadAllParsedData();
+  return recipesData.map((data, index) => convertToRecipe(data, index));
 }
 
+// 加载单个菜谱的完整数据：只请求它所在的分片
+export async function loadRecipeDetail(id: string): Promise<Recipe | null> {
+  const index = parseInt(id.replace('recipe_', ''));
+  if (Number.isNaN(index)) {
+    return null;
+  }
+  const manifest = await loadManifest();
+  if (manifest) {
+    const summary = manifest.recipes[index]?.id === id
+      ? manifest.recipes[index]
+      : manifest.recipes.find(r => r.id === id);
+    if (!summary) {
+      return null;
+    }
+    const shard = await loadShard(manifest.shards[summary.shard]);
+    return shard[id] ? convertToRecipe(shard[id], index) : null;
+  }
+  const recipesData = await loadAllParsedData();
+  return recipesData[index] ? convertToRecipe(recipesData[index], index) : null;
+}
@@ -1,5 +1,15 @@
 import { Recipe, RecipeCategory, Ingredient } from '../types';
 import { checkRecipeAvailability } from './helpers';
+import {
+  SearchIndex,
+  countMatches,
+  descriptionCandidates,
+  findCandidates,
+  hasCategoryTerm,
+  ingredientCandidates,
+  ingredientIdf,
+  resolveRecipes,
+} from './searchIndex';
 
 /**
  * 计算字符串相似度（编辑距离）
@@ -41,8 +51,9 @@ function calculateSimilarity(str1: string, str2: string): number {
 
 /**
  * 计算搜索相关性分数
+ * 提供搜索索引时，食材匹配按查询词的逆文档频率额外加分（少见食材的命中更有区分度）
  */
-export function calculateRelevanceScore(recipe: Recipe, query: string): number {
+export function calculateRelevanceScore(recipe: Recipe, query: string, index?: SearchIndex | null): number {
   if (!query || query.trim() === '') return 0;
   
   const lowerQuery = query.toLowerCase().trim();
@@ -134,6 +145,14 @@ export function calculateRelevanceScore(recipe: Recipe, query: string): number {
     if (allWordsMatched) {
       score += 500;
     }
+
+    if (index) {
+      queryWords.forEach(word => {
+        if (recipe.ingredients.some(ing => ing.ingredientName.toLowerCase().includes(word))) {
+          score += Math.round(100 * ingredientIdf(index, word));
+        }
+      });
+    }
   }
   
   // 6. 标签匹配
@@ -191,13 +210,26 @@ function getAllCategories(recipes: Recipe[]): Set<string> {
 
 /**
  * 判断搜索类型：菜名、分类、食材
+ * 提供搜索索引时直接按索引判断分类，并用全部菜谱的命中数代替前100个菜谱的抽样
  */
-export function getSearchType(query: string, recipes: Recipe[]): 'name' | 'category' | 'ingredient' {
+export function getSearchType(
+  query: string,
+  recipes: Recipe[],
+  index?: SearchIndex | null
+): 'name' | 'category' | 'ingredient' {
   if (!query || query.trim() === '') return 'name';
   
   const lowerQuery = query.toLowerCase().trim();
   const queryWords = lowerQuery.split(/\s+/).filter(w => w.length > 0);
   
+  if (index) {
+    if (queryWords.some(word => hasCategoryTerm(index, word))) {
+      return 'category';
+    }
+    const counts = countMatches(index, query);
+    return counts.ingredient > counts.name * 1.5 ? 'ingredient' : 'name';
+  }
+  
   // 获取所有已存在的分类
   const allCategories = getAllCategories(recipes);
   
@@ -242,11 +274,13 @@ export function getSearchType(query: string, recipes: Recipe[]): 'name' | 'categ
 
 /**
  * 智能搜索和排序菜谱
+ * 提供搜索索引时只对索引给出的候选菜谱做匹配和打分
  */
 export function searchAndSortRecipes(
   recipes: Recipe[],
   query: string,
-  selectedCategory: RecipeCategory
+  selectedCategory: RecipeCategory,
+  index?: SearchIndex | null
 ): { results: Recipe[]; searchType: string } {
   if (!query || query.trim() === '') {
     // 没有搜索词时，只按分类筛选
@@ -265,10 +299,17 @@ export function searchAndSortRecipes(
   const queryWords = lowerQuery.split(/\s+/).filter(w => w.length > 0);
   
   // 判断搜索类型
-  const searchType = getSearchType(query, recipes);
+  const searchType = getSearchType(query, recipes, index);
   
   // 筛选和评分
-  const scoredRecipes = recipes
+  // 有索引时只对候选打分：索引覆盖菜名、食材、分类、口味、工艺，描述逐条检查后并入
+  let candidates = recipes;
+  if (index) {
+    const ordinals = findCandidates(index, query);
+    descriptionCandidates(recipes, query).forEach(ordinal => ordinals.add(ordinal));
+    candidates = resolveRecipes(recipes, ordinals);
+  }
+  const scoredRecipes = candidates
     .map(recipe => {
       // 先进行基本筛选
       const categoryMatch = selectedCategory === '全部' || 
@@ -318,7 +359,7 @@ export function searchAndSortRecipes(
       }
       
       // 计算相关性分数
-      let score = calculateRelevanceScore(recipe, query);
+      let score = calculateRelevanceScore(recipe, query, index);
       
       // 根据搜索类型调整权重
       if (searchType === 'category' && categoryMatchText) {
@@ -430,13 +471,15 @@ export function sortRecipesByAvailability(
 
 /**
  * 智能推荐菜谱（当没有完全匹配时）
+ * index 为构建时生成的搜索索引，提供时只处理命中的候选菜谱
  */
 export function getRecommendedRecipes(
   recipes: Recipe[],
   query: string,
   selectedCategory: RecipeCategory,
   ingredients: Ingredient[],
-  showAll: boolean = false
+  showAll: boolean = false,
+  index?: SearchIndex | null
 ): {
   exactMatches: Recipe[];
   recommendations: Recipe[];
@@ -468,11 +511,11 @@ export function getRecommendedRecipes(
   const queryWords = lowerQuery.split(/\s+/).filter(w => w.length > 0);
   
   // 判断搜索类型
-  const searchType = getSearchType(query, recipes);
+  const searchType = getSearchType(query, recipes, index);
   
   // 对于菜名搜索和分类搜索，使用通用搜索逻辑
   if (searchType === 'name' || searchType === 'category') {
-    const searchResult = searchAndSortRecipes(recipes, query, selectedCategory);
+    const searchResult = searchAndSortRecipes(recipes, query, selectedCategory, index);
     
     // 区分完全匹配和近似匹配
     const exactMatches: Recipe[] = [];
@@ -513,9 +556,16 @@ export function getRecommendedRecipes(
   }
 
   // 食材搜索模式：检查是否有包含所有食材的菜谱
+  // 有索引时只取食材命中任一查询词的菜谱（不命中的菜谱匹配数为 0，不会出现在结果中）
+  let ingredientPool = recipes;
+  if (index) {
+    const ordinals = new Set<number>();
+    queryWords.forEach(word => ingredientCandidates(index, word).forEach(ordinal => ordinals.add(ordinal)));
+    ingredientPool = resolveRecipes(recipes, ordinals);
+  }
   const categoryFiltered = selectedCategory === '全部'
-    ? recipes
-    : recipes.filter(recipe => 
+    ? ingredientPool
+    : ingredientPool.filter(recipe => 
         recipe.category && recipe.category.includes(selectedCategory as RecipeCategory)
       );
 
@@ -529,7 +579,7 @@ export function getRecommendedRecipes(
     const sortedExactMatches = exactMatches
       .map(recipe => ({
         recipe,
-        score: calculateRelevanceScore(recipe, query),
+        score: calculateRelevanceScore(recipe, query, index),
       }))
       .sort((a, b) => b.score - a.score)
       .map(item => item.recipe);
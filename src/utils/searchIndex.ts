@@ -0,0 +1,207 @@
+import { Recipe } from '../types';
+import { BUNDLE_BASE, fetchJSON, loadManifest } from './recipeDataLoader';
+
+// 构建时生成的搜索倒排索引（search_index.py），倒排表中是菜谱序号（recipe_<序号>）
+export interface SearchIndex {
+  version: number;
+  doc_count: number;
+  ngram_sizes: number[];
+  names: Record<string, number[]>;        // 菜名单字/二元字组 -> 菜谱序号
+  ingredients: Record<string, number[]>;  // 规范化食材名 -> 菜谱序号
+  ingredient_names: Record<string, number[]>; // 原始食材名（保留括号注释） -> 菜谱序号
+  categories: Record<string, number[]>;   // 分类 -> 菜谱序号
+  flavors: Record<string, number[]>;      // 口味 -> 菜谱序号
+  techniques: Record<string, number[]>;   // 工艺 -> 菜谱序号
+  ingredient_dict: Record<string, string[]>; // 规范化食材名 -> 原始写法
+}
+
+type TermField = 'ingredients' | 'ingredient_names' | 'categories' | 'flavors' | 'techniques';
+const TERM_FIELDS: TermField[] = ['ingredients', 'ingredient_names', 'categories', 'flavors', 'techniques'];
+
+let searchIndexPromise: Promise<SearchIndex | null> | null = null;
+// 各词表的词条列表，子串匹配时只扫描词表（规模与不同词条数相关，与菜谱数无关）
+const vocabularyCache = new WeakMap<SearchIndex, Record<TermField, string[]>>();
+// 菜谱数组 -> id 索引，传入的数组不是按序号排列时使用
+const recipeByIdCache = new WeakMap<Recipe[], Map<string, Recipe>>();
+
+/**
+ * 加载搜索索引；数据包未构建或没有索引时返回 null（搜索退回逐条扫描）
+ */
+export function loadSearchIndex(): Promise<SearchIndex | null> {
+  if (!searchIndexPromise) {
+    searchIndexPromise = loadManifest()
+      .then(manifest => (manifest?.search ? fetchJSON<SearchIndex>(`${BUNDLE_BASE}${manifest.search}`) : null))
+      .catch(() => null);
+  }
+  return searchIndexPromise;
+}
+
+/**
+ * 与 search_index.normalize_term 相同：全角转半角、转小写、去掉空白
+ */
+export function normalizeTerm(text: string): string {
+  return text.normalize('NFKC').toLowerCase().replace(/\s+/g, '');
+}
+
+function queryTerms(query: string): string[] {
+  return query.split(/\s+/).map(normalizeTerm).filter(w => w.length > 0);
+}
+
+function vocabulary(index: SearchIndex, field: TermField): string[] {
+  let vocab = vocabularyCache.get(index);
+  if (!vocab) {
+    vocab = {
+      ingredients: Object.keys(index.ingredients),
+      ingredient_names: Object.keys(index.ingredient_names),
+      categories: Object.keys(index.categories),
+      flavors: Object.keys(index.flavors),
+      techniques: Object.keys(index.techniques),
+    };
+    vocabularyCache.set(index, vocab);
+  }
+  return vocab[field];
+}
+
+/**
+ * 菜名包含 word 的候选：取 word 全部二元字组（单字时取单字）倒排表的交集
+ */
+function nameCandidates(index: SearchIndex, word: string): number[] {
+  const grams = word.length === 1
+    ? [word]
+    : Array.from({ length: word.length - 1 }, (_, i) => word.slice(i, i + 2));
+  const postings = grams.map(gram => index.names[gram] || []);
+  postings.sort((a, b) => a.length - b.length);
+  // 从最短的倒排表开始求交集
+  let result = postings[0];
+  for (const list of postings.slice(1)) {
+    if (result.length === 0) break;
+    const set = new Set(list);
+    result = result.filter(ordinal => set.has(ordinal));
+  }
+  return result;
+}
+
+/**
+ * 词表中包含 word 的词条（食材、分类、口味均按子串匹配，与原有 includes 语义一致）
+ */
+export function matchingTerms(index: SearchIndex, field: TermField, word: string): string[] {
+  return vocabulary(index, field).filter(term => term.includes(word));
+}
+
+function termCandidates(index: SearchIndex, field: TermField, word: string): Set<number> {
+  const result = new Set<number>();
+  for (const term of matchingTerms(index, field, word)) {
+    index[field][term].forEach(ordinal => result.add(ordinal));
+  }
+  return result;
+}
+
+/**
+ * 食材中包含 word 的菜谱序号（规范化名或保留括号注释的原始名，与按原始食材名 includes 一致）
+ */
+export function ingredientCandidates(index: SearchIndex, word: string): Set<number> {
+  const term = normalizeTerm(word);
+  const result = termCandidates(index, 'ingredients', term);
+  termCandidates(index, 'ingredient_names', term).forEach(ordinal => result.add(ordinal));
+  return result;
+}
+
+/**
+ * 描述中包含整个查询的菜谱序号。描述不建倒排表（体积与描述总长相当），逐条只做一次 includes，
+ * 并入候选后与无索引时的 descMatch 一致
+ */
+export function descriptionCandidates(recipes: Recipe[], query: string): number[] {
+  const lowerQuery = query.toLowerCase().trim();
+  if (!lowerQuery) return [];
+  const result: number[] = [];
+  recipes.forEach(recipe => {
+    if (recipe.description?.toLowerCase().includes(lowerQuery)) {
+      result.push(Number(recipe.id.slice('recipe_'.length)));
+    }
+  });
+  return result;
+}
+
+/**
+ * 按菜名、食材（规范化名和原始名）、分类、口味、工艺取候选菜谱序号（各查询词及整个查询的并集），
+ * fuzzy 时再加上可能与查询相似的菜名：编辑距离相似度 > 0.5 要求对齐的相同字符数超过查询长度的一半，
+ * 而它不超过查询中出现在菜名里的字符数 W 加上查询中的空白数 s，因此取 2W + s > 查询字符数 的菜名
+ */
+export function findCandidates(index: SearchIndex, query: string, fuzzy: boolean = true): Set<number> {
+  const result = new Set<number>();
+  const words = queryTerms(query);
+  const whole = normalizeTerm(query);
+  for (const word of whole && !words.includes(whole) ? [...words, whole] : words) {
+    nameCandidates(index, word).forEach(ordinal => result.add(ordinal));
+    for (const field of TERM_FIELDS) {
+      termCandidates(index, field, word).forEach(ordinal => result.add(ordinal));
+    }
+  }
+  if (fuzzy && whole) {
+    const chars = Array.from(whole);
+    const spaces = (query.trim().match(/\s/g) || []).length;
+    const weights = new Map<string, number>();
+    chars.forEach(ch => weights.set(ch, (weights.get(ch) || 0) + 1));
+    const counts = new Map<number, number>();
+    weights.forEach((weight, ch) => {
+      (index.names[ch] || []).forEach(ordinal => counts.set(ordinal, (counts.get(ordinal) || 0) + weight));
+    });
+    counts.forEach((count, ordinal) => {
+      if (2 * count + spaces > chars.length) result.add(ordinal);
+    });
+  }
+  return result;
+}
+
+/**
+ * 菜名/食材命中的菜谱数（用于判断搜索类型）
+ */
+export function countMatches(index: SearchIndex, query: string): { name: number; ingredient: number } {
+  const names = new Set<number>();
+  const ingredients = new Set<number>();
+  queryTerms(query).forEach(word => {
+    nameCandidates(index, word).forEach(ordinal => names.add(ordinal));
+    ingredientCandidates(index, word).forEach(ordinal => ingredients.add(ordinal));
+  });
+  return { name: names.size, ingredient: ingredients.size };
+}
+
+/**
+ * 是否存在与查询词互相包含的分类
+ */
+export function hasCategoryTerm(index: SearchIndex, word: string): boolean {
+  const term = normalizeTerm(word);
+  return vocabulary(index, 'categories').some(cat => cat.includes(term) || term.includes(cat));
+}
+
+/**
+ * 食材词的逆文档频率 log(1 + N / df)，越少见的食材权重越高；没有命中时为 0
+ */
+export function ingredientIdf(index: SearchIndex, word: string): number {
+  const df = ingredientCandidates(index, word).size;
+  return df > 0 ? Math.log(1 + index.doc_count / df) : 0;
+}
+
+/**
+ * 把菜谱序号映射回菜谱对象，保持序号升序；recipes 按序号排列时直接按下标取，否则按 id 查找
+ */
+export function resolveRecipes(recipes: Recipe[], ordinals: Iterable<number>): Recipe[] {
+  const result: Recipe[] = [];
+  let byId: Map<string, Recipe> | undefined;
+  for (const ordinal of Array.from(ordinals).sort((a, b) => a - b)) {
+    const id = `recipe_${ordinal}`;
+    let recipe: Recipe | undefined = recipes[ordinal];
+    if (recipe?.id !== id) {
+      if (!byId) {
+        byId = recipeByIdCache.get(recipes);
+        if (!byId) {
+          byId = new Map(recipes.map(r => [r.id, r] as [string, Recipe]));
+          recipeByIdCache.set(recipes, byId);
+        }
+      }
+      recipe = byId.get(id);
+    }
+    if (recipe) result.push(recipe);
+  }
+  return result;
+}
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""测试公共配置：把仓库根目录加入模块搜索路径，测试直接导入根目录下的脚本模块"""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def make_recipe(name: str, ingredients=("鸡蛋", "番茄"), categories=("热菜", "家常菜"), **fields) -> dict:
+    """构造一条与提取结果格式相同的菜谱记录"""
+    recipe = {
+        "name": name,
+        "description": f"{name}的做法",
+        "main_ingredients": [
+            {"name": ing, "amount": "200", "unit": "克", "quantity": 200.0, "unit_id": "克"} for ing in ingredients
+        ],
+        "auxiliary_ingredients": [],
+        "seasonings": [{"name": "盐", "amount": "适量", "unit": "", "quantity": None, "unit_id": "适量"}],
+        "flavor": "咸鲜",
+        "technique": "炒",
+        "time": "十分钟",
+        "difficulty": "简单",
+        "categories": list(categories),
+        "cover_images": [f"https://img.example.com/{name}.jpg"],
+        "steps": [{"step": "1", "description": f"把{'、'.join(ingredients)}下锅"}],
+        "tips": "",
+        "tools": "",
+        "source_file": f"{name}.html",
+    }
+    recipe.update(fields)
+    return recipe
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""语料归档：追加、删除、压缩整理，以及并行提取时的乱码隔离"""
+
+import shutil
+
+import pytest
+
+from conftest import ROOT
+from corpus_archive import _OPEN_ARCHIVES, CorpusArchive, pack_directory
+from extract_recipe import process_directory
+from recipe_stream import iter_recipes
+
+FIXTURES = ROOT / "bench_fixtures"
+GARBLED = "乱码".encode("utf-8") + "�".encode("utf-8") * 10
+
+
+@pytest.fixture
+def archive_path(tmp_path):
+    path = tmp_path / "corpus.pack"
+    yield path
+    # 清理本进程缓存的已打开归档
+    archive = _OPEN_ARCHIVES.get(str(path.resolve()))
+    if archive is not None:
+        archive.close()
+
+
+def _index_lines(archive):
+    return archive.index_path.read_text(encoding="utf-8").splitlines()
+
+
+def test_append_delete_compact_roundtrip(archive_path):
+    archive = CorpusArchive(archive_path)
+    archive.append("1.html", b"<html>a</html>", recipe_id="1")
+    archive.append("2.html", "<html>红烧肉</html>".encode("utf-8"), recipe_id="2")
+    archive.append("1.html", b"<html>b</html>", recipe_id="1")
+    archive.delete("2.html")
+    assert archive.names() == ["1.html"]
+    assert archive.read_by_id("1") == b"<html>b</html>"
+    archive.close()
+
+    reopened = CorpusArchive(archive_path)
+    assert reopened.names() == ["1.html"]
+    assert reopened.name_for_id("2") is None
+    assert reopened.compact() > 0
+    assert reopened.read("1.html") == b"<html>b</html>"
+    assert len(_index_lines(reopened)) == 1
+    reopened.close()
+
+
+def test_parallel_extract_quarantines_from_parent(tmp_path, archive_path):
+    html_dir = tmp_path / "html"
+    shutil.copytree(FIXTURES, html_dir)
+    for i in range(6):
+        (html_dir / f"bad{i}.html").write_bytes(GARBLED)
+    pack_directory(html_dir, archive_path)
+    good = len(list(FIXTURES.glob("*.htm*")))
+
+    output = tmp_path / "out.ndjson"
+    quarantine = tmp_path / "quarantine"
+    written = process_directory(archive_path, output, workers=3, quarantine_dir=quarantine)
+    assert written == good
+    assert len(list(iter_recipes(output))) == good
+    assert sorted(p.name for p in quarantine.iterdir()) == [f"bad{i}.html" for i in range(6)]
+
+    # 索引中每一行都完整，重新加载后只剩正常文档
+    reloaded = CorpusArchive(archive_path)
+    lines = _index_lines(reloaded)
+    assert all(len(line.split("\t")) == 6 for line in lines)
+    assert len(lines) == good + 6 * 2
+    assert len(reloaded) == good
+    assert not any(name.startswith("bad") for name in reloaded.names())
+    reloaded.close()
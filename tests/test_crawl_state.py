@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""爬虫状态库：去重、序号分配、失败重试和分片合并"""
+
+import pytest
+
+from crawl_state import MAX_ATTEMPTS, ClaimDir, CrawlState
+
+
+@pytest.fixture
+def state(tmp_path):
+    state = CrawlState(tmp_path / "state.db")
+    yield state
+    state.close()
+
+
+def _url(recipe_id):
+    return f"https://example.com/recipe-{recipe_id}.html"
+
+
+def test_seen_survives_reopen(tmp_path):
+    with CrawlState(tmp_path / "state.db") as state:
+        state.add_frontier(_url(1), "1")
+        state.mark_saved("1", "7.html", _url(1))
+        assert state.import_seen_ids(["1", "2"]) == 1
+    with CrawlState(tmp_path / "state.db") as state:
+        assert state.is_seen("1") and state.is_seen("2")
+        assert state.file_for_id("1") == "7.html"
+        assert state.pending_urls() == []
+
+
+def test_failed_urls_are_retried_until_attempts_run_out(state):
+    state.add_frontier(_url(2), "2")
+    state.mark_saved("2", "1.html", _url(2))
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        # 每次运行重新入队，失败次数累计而不清零
+        state.add_frontier(_url(1), "1")
+        assert state.pending_urls() == [_url(1)]
+        state.mark_failed(_url(1))
+        assert state.pending_urls() == ([_url(1)] if attempt < MAX_ATTEMPTS else [])
+
+
+def test_index_allocation_is_disjoint_across_shards(tmp_path):
+    shards = [CrawlState(tmp_path / f"s{k}.db", index_stride=3, index_offset=k) for k in range(3)]
+    for shard in shards:
+        shard.reserve_index(10)
+    allocated = [shard.allocate_index() for _ in range(5) for shard in shards]
+    assert len(set(allocated)) == len(allocated)
+    assert all(index >= 10 for index in allocated)
+    for shard in shards:
+        shard.close()
+
+
+def test_merge_from_shard(tmp_path):
+    with CrawlState(tmp_path / "shard.db", index_stride=2, index_offset=1) as shard:
+        shard.mark_saved("5", f"{shard.allocate_index()}.html", _url(5))
+        shard.mark_dead("6", 404)
+        shard.set_validators("5", '"etag"', None, "abc")
+    with CrawlState(tmp_path / "main.db") as main:
+        main.mark_saved("4", "1.html", _url(4))
+        assert main.merge_from(tmp_path / "shard.db") == 1
+        assert main.file_for_id("5") == "1.html"
+        assert main.is_dead("6")
+        assert main.validators("5") == ('"etag"', None, "abc")
+        assert main.allocate_index() == 3
+
+
+def test_merge_prefers_real_file_mapping(tmp_path):
+    with CrawlState(tmp_path / "main.db") as main:
+        main.mark_saved("7", "7.html", _url(7))
+        main.import_seen_ids(["8"])
+    with CrawlState(tmp_path / "shard.db", index_stride=2, index_offset=1) as shard:
+        # 分片启动时从主库导入的ID没有文件映射
+        shard.import_seen_ids(["7", "8"])
+        shard.mark_saved("8", "9.html", _url(8))
+    with CrawlState(tmp_path / "main.db") as main:
+        assert main.merge_from(tmp_path / "shard.db") == 0
+        assert main.file_for_id("7") == "7.html"
+        assert main.file_for_id("8") == "9.html"
+        assert main.unmapped_ids() == []
+
+
+def test_claims_are_exclusive_and_releasable(tmp_path):
+    a = ClaimDir(tmp_path / "claims", "shard-0-of-2")
+    b = ClaimDir(tmp_path / "claims", "shard-1-of-2")
+    assert a.claim("123")
+    assert a.claim("123")  # 自己的认领可重复确认
+    assert not b.claim("123")
+    # 认领文件写入即有完整内容，不留临时文件
+    files = list((tmp_path / "claims").rglob("*"))
+    assert [p.name for p in files if p.is_file()] == ["123"]
+    assert (tmp_path / "claims" / "0" / "123").read_text(encoding="utf-8") == "shard-0-of-2"
+    b.release("123")  # 不能释放别人的认领
+    assert not b.claim("123")
+    a.release("123")
+    assert b.claim("123")
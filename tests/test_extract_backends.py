@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""各解析后端在基准样本上的提取结果必须与 bs4 后端完全一致"""
+
+import pytest
+
+from conftest import ROOT
+from extract_recipe import PARSER_BACKENDS, extract_recipe_from_html, load_html
+
+FIXTURES = sorted((ROOT / "bench_fixtures").glob("*.htm*"))
+
+
+@pytest.fixture(scope="module")
+def expected():
+    """bs4 后端的结果作为基准"""
+    return {path.name: extract_recipe_from_html(load_html(path), "bs4") for path in FIXTURES}
+
+
+def test_fixtures_present():
+    assert FIXTURES
+
+
+@pytest.mark.parametrize("backend", [b for b in PARSER_BACKENDS if b != "bs4"])
+@pytest.mark.parametrize("html_path", FIXTURES, ids=lambda p: p.name)
+def test_backend_matches_bs4(backend, html_path, expected):
+    if backend == "selectolax":
+        pytest.importorskip("selectolax")
+    actual = extract_recipe_from_html(load_html(html_path), backend)
+    assert actual == expected[html_path.name]
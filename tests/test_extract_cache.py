@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""提取结果缓存：命中规则、中途提交、未命中时只读一次文件，以及带缓存提取时的乱码隔离"""
+
+import os
+import shutil
+import sqlite3
+from collections import Counter
+from pathlib import Path
+
+import extract_cache
+from conftest import ROOT
+from extract_cache import ExtractionCache
+from extract_recipe import process_directory
+
+FIXTURES = ROOT / "bench_fixtures"
+
+
+def _count(db_file):
+    """用另一个连接读取已提交的条目数"""
+    conn = sqlite3.connect(str(db_file))
+    try:
+        return conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_hit_after_reopen_and_content_change(tmp_path):
+    html = tmp_path / "1.html"
+    html.write_text("<html>红烧肉</html>", encoding="utf-8")
+    db_file = tmp_path / "cache.sqlite"
+    cache = ExtractionCache(db_file, "1")
+    assert cache.get(html) is None
+    cache.put(html, {"name": "红烧肉"})
+    cache.close()
+
+    cache = ExtractionCache(db_file, "1")
+    assert cache.get(html) == {"name": "红烧肉"}
+    # 只改修改时间，内容哈希一致仍命中
+    os.utime(html, ns=(1, 1))
+    assert cache.get(html) == {"name": "红烧肉"}
+    html.write_text("<html>糖醋排骨</html>", encoding="utf-8")
+    assert cache.get(html) is None
+    cache.close()
+
+    # 提取器版本变化时缓存作废
+    cache = ExtractionCache(db_file, "2")
+    assert _count(db_file) == 0
+    cache.close()
+
+
+def test_commits_every_batch_without_close(tmp_path, monkeypatch):
+    monkeypatch.setattr(extract_cache, "COMMIT_EVERY", 3)
+    db_file = tmp_path / "cache.sqlite"
+    cache = ExtractionCache(db_file, "1")
+    for i in range(7):
+        html = tmp_path / f"{i}.html"
+        html.write_text(str(i), encoding="utf-8")
+        cache.put(html, {"name": str(i)})
+    # 未调用 close 时（如运行被中断），已提交的批次对其他连接可见
+    assert _count(db_file) == 6
+    cache.close()
+    assert _count(db_file) == 7
+
+
+def test_process_directory_with_cache_and_garbled_file(tmp_path):
+    input_dir = tmp_path / "html"
+    input_dir.mkdir()
+    for name in ("1.html", "9914.html"):
+        shutil.copy(FIXTURES / name, input_dir / name)
+    (input_dir / "bad.html").write_bytes("乱码".encode("utf-8") + "�".encode("utf-8") * 10)
+    db_file = tmp_path / "cache.sqlite"
+    output = tmp_path / "out.ndjson"
+
+    # 乱码文件在解析中被移走，结束时清理缓存不能再访问它
+    assert process_directory(input_dir, output, cache_file=db_file) == 2
+    assert not (input_dir / "bad.html").exists()
+    assert _count(db_file) == 2
+    first = output.read_bytes()
+
+    assert process_directory(input_dir, output, cache_file=db_file) == 2
+    assert output.read_bytes() == first
+
+
+def test_cache_miss_reads_each_file_once(tmp_path, monkeypatch):
+    input_dir = tmp_path / "html"
+    input_dir.mkdir()
+    for path in sorted(FIXTURES.glob("*.html")):
+        shutil.copy(path, input_dir / path.name)
+    reads = Counter()
+    read_bytes = Path.read_bytes
+
+    def _counting_read_bytes(self):
+        reads[self.name] += 1
+        return read_bytes(self)
+
+    monkeypatch.setattr(Path, "read_bytes", _counting_read_bytes)
+    db_file = tmp_path / "cache.sqlite"
+    written = process_directory(input_dir, tmp_path / "out.ndjson", cache_file=db_file)
+    assert written == len(reads) and set(reads.values()) == {1}
+
+    reads.clear()
+    assert process_directory(input_dir, tmp_path / "out.ndjson", cache_file=db_file) == written
+    assert not reads
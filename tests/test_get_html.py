@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""爬虫流程：边抓边提取的保存确认、序号分配、认领和分片状态合并（不发出真实网络请求）"""
+
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+import get_html
+from conftest import ROOT
+from crawl_state import ClaimDir, CrawlState
+from recipe_stream import iter_recipes
+
+FIXTURE = ROOT / "bench_fixtures" / "1.html"
+
+
+def _url(recipe_id):
+    return f"{get_html.BASE_HOST}/recipe-{recipe_id}.html"
+
+
+def _response(url, content, status=200, headers=None):
+    return SimpleNamespace(
+        status_code=status,
+        ok=200 <= status < 400,
+        url=url,
+        content=content,
+        history=[],
+        headers={"Content-Type": "text/html; charset=utf-8", **(headers or {})},
+    )
+
+
+@pytest.fixture
+def crawl_env(tmp_path, monkeypatch):
+    """把输出目录指向临时目录，网络请求改为从 pages 中取响应"""
+    pages = {}
+    monkeypatch.setattr(get_html, "OUTPUT_DIR", tmp_path)
+    monkeypatch.setattr(get_html, "ARCHIVE_PATH", None)
+    monkeypatch.setattr(get_html, "fetch_response_with_retry", lambda session, url, headers=None: pages.get(url))
+    env = SimpleNamespace(pages=pages, state=CrawlState(tmp_path / "state.db"), tmp_path=tmp_path)
+    yield env
+    if env.state is not None:
+        env.state.close()
+
+
+def _saved_row(state, recipe_id):
+    return state.conn.execute("SELECT file FROM seen WHERE recipe_id = ?", (recipe_id,)).fetchone()
+
+
+def test_sink_marks_saved_only_after_record_is_flushed(crawl_env, monkeypatch):
+    monkeypatch.setattr(get_html, "EXTRACT_CONFIRM_EVERY", 1000)
+    state = crawl_env.state
+    crawl_env.pages[_url(1)] = _response(_url(1), FIXTURE.read_bytes(), headers={"ETag": '"v1"'})
+    output = crawl_env.tmp_path / "out.ndjson"
+    sink = get_html.ExtractSink(output, workers=1)
+
+    state.add_frontier(_url(1), "1")
+    confirmed = []
+    assert get_html.save_recipe_html(None, _url(1), state, sink, on_confirm=confirmed.append) is None
+    # 本次运行内已去重，但记录尚未刷新到磁盘，状态库中仍未保存，也没有写出HTML文件
+    assert state.is_seen("1")
+    assert _saved_row(state, "1") is None
+    assert not list(crawl_env.tmp_path.glob("*.html"))
+    assert confirmed == []
+    # 序号不对应落盘文件，分配已立即提交，崩溃重启后不会再分出 1.html
+    conn = sqlite3.connect(str(crawl_env.tmp_path / "state.db"))
+    assert conn.execute("SELECT value FROM meta WHERE key = 'next_index'").fetchone() == ("2",)
+    conn.close()
+
+    sink.close()
+    assert confirmed == [True]
+    assert _saved_row(state, "1") == (None,)
+    assert state.validators("1")[0] == '"v1"'
+    assert state.pending_urls() == []
+    assert [r["source_file"] for r in iter_recipes(output)] == ["1.html"]
+
+
+def test_sink_failure_leaves_url_for_retry(crawl_env):
+    results = []
+    sink = get_html.ExtractSink(crawl_env.tmp_path / "out.ndjson", workers=1)
+    # 空白页在提取进程中判为乱码
+    sink.submit(b"", "x.html", results.append)
+    sink.submit(FIXTURE.read_bytes(), "1.html", results.append)
+    sink.close()
+    assert sorted(results) == [False, True]
+    assert sink.written == 1 and sink.errors == 1
+
+
+def test_fetch_pool_counts_sink_saves_after_confirmation(crawl_env):
+    state = crawl_env.state
+    crawl_env.pages[_url(6)] = _response(_url(6), FIXTURE.read_bytes())
+    # 通过抓取时的乱码预检，但在提取进程中判为乱码
+    crawl_env.pages[_url(7)] = _response(_url(7), b"<html>" + "\ufffd".encode("utf-8") * 1000 + b"</html>")
+    claims = ClaimDir(crawl_env.tmp_path / "claims", "shard-0-of-2")
+    sink = get_html.ExtractSink(crawl_env.tmp_path / "out.ndjson", workers=1)
+    with get_html.FetchPool(state, workers=2, sink=sink, claims=claims) as pool:
+        pool.submit(_url(6))
+        pool.submit(_url(7))
+    sink.close()
+    assert pool.stats.counts["saved"] == 1 and pool.stats.counts["failed"] == 1
+    assert state.is_seen("6") and not state.is_seen("7")
+    assert state.pending_urls() == [_url(7)]
+    # 提取失败的ID放弃认领
+    assert ClaimDir(crawl_env.tmp_path / "claims", "shard-1-of-2").claim("7")
+
+
+def test_without_sink_saves_file_immediately(crawl_env):
+    state = crawl_env.state
+    crawl_env.pages[_url(2)] = _response(_url(2), FIXTURE.read_bytes())
+    assert get_html.save_recipe_html(None, _url(2), state)
+    file_name = state.file_for_id("2")
+    assert (crawl_env.tmp_path / file_name).read_bytes() == FIXTURE.read_bytes()
+
+
+def test_fetch_pool_forgets_finished_ids(crawl_env):
+    state = crawl_env.state
+    for recipe_id in range(1, 41):
+        # 偶数ID失效，奇数ID正常
+        status = 404 if recipe_id % 2 == 0 else 200
+        crawl_env.pages[_url(recipe_id)] = _response(_url(recipe_id), FIXTURE.read_bytes(), status)
+    with get_html.FetchPool(state, workers=4, max_pending=8) as pool:
+        for recipe_id in range(1, 41):
+            pool.submit(_url(recipe_id))
+    assert pool._queued == set()
+    assert pool.saved == 20
+    assert all(state.is_dead(str(i)) for i in range(2, 41, 2))
+    # 处理完的ID再次出现时由状态库去重
+    with get_html.FetchPool(state, workers=1) as pool:
+        assert not pool.submit(_url(1))
+        assert not pool.submit(_url(2))
+
+
+def test_refresh_maps_legacy_ids_to_saved_pages(crawl_env, monkeypatch):
+    state = crawl_env.state
+    ids = {}
+    for path in sorted((ROOT / "bench_fixtures").glob("*.html")):
+        (crawl_env.tmp_path / path.name).write_bytes(path.read_bytes())
+        ids[get_html.page_recipe_id(path.read_bytes())] = path.name
+    # 旧版 seen_ids.txt 只有ID，没有文件映射；其中一个ID的文件已不存在
+    state.import_seen_ids([*ids, "999999999"])
+    # 边抓边提取保存的ID没有原始HTML，不算作旧版无文件的ID
+    state.mark_saved("888888888", None, _url(888888888))
+    state.close()
+    crawl_env.state = None
+    for recipe_id in ids:
+        crawl_env.pages[_url(recipe_id)] = _response(_url(recipe_id), b"", status=304)
+    monkeypatch.setattr(get_html, "STATE_FILE", crawl_env.tmp_path / "state.db")
+    monkeypatch.setattr(get_html, "SHARD", None)
+
+    changed = crawl_env.tmp_path / "changed.txt"
+    counts = get_html.refresh_all(changed)
+    assert counts["unchanged"] == len(ids)
+    assert counts["unmapped"] == 1 and counts["extract_only"] == 1
+    assert (crawl_env.tmp_path / "changed.unmapped.txt").read_text(encoding="utf-8") == "999999999\n"
+    crawl_env.state = CrawlState(crawl_env.tmp_path / "state.db")
+    assert {rid: crawl_env.state.file_for_id(rid) for rid in ids} == ids
+
+
+def test_failed_fetch_releases_claim(crawl_env):
+    claims_dir = crawl_env.tmp_path / "claims"
+    claims = ClaimDir(claims_dir, "shard-0-of-2")
+    crawl_env.pages[_url(3)] = _response(_url(3), FIXTURE.read_bytes())
+    # _url(4) 没有响应，视为网络错误
+    with get_html.FetchPool(crawl_env.state, workers=2, claims=claims) as pool:
+        pool.submit(_url(3))
+        pool.submit(_url(4))
+    other = ClaimDir(claims_dir, "shard-1-of-2")
+    assert not other.claim("3")
+    assert other.claim("4")
+
+
+def test_id_range_shard_creates_no_claims(crawl_env, monkeypatch):
+    monkeypatch.setattr(get_html, "STATE_FILE", crawl_env.tmp_path / "state.db")
+    monkeypatch.setattr(get_html, "CLAIMS_DIR", crawl_env.tmp_path / "claims")
+    monkeypatch.setattr(get_html, "SHARD", (1, 2))
+    monkeypatch.setattr(get_html, "EXTRACT_OUTPUT", None)
+    crawl_env.state.close()
+    crawl_env.state = None
+    crawl_env.pages[_url(5)] = _response(_url(5), FIXTURE.read_bytes())
+    assert get_html.crawl_id_range([(1, 10)]) == 1
+    assert not (crawl_env.tmp_path / "claims").exists()
+
+
+def test_local_shards_merge_state_when_done(crawl_env, monkeypatch):
+    state_file = crawl_env.tmp_path / "state.db"
+    monkeypatch.setattr(get_html, "STATE_FILE", state_file)
+    crawl_env.state.mark_saved("10", "1.html", _url(10))
+    crawl_env.state.close()
+    crawl_env.state = None
+
+    def _fake_popen(cmd):
+        # 子进程以 --shard k/n 运行，这里直接写出它的分片状态库
+        k, n = get_html.parse_shard(cmd[cmd.index("--shard") + 1])
+        with CrawlState(get_html.shard_path(state_file, (k, n)), index_stride=n, index_offset=k) as shard:
+            shard.import_seen_ids(["10"])
+            shard.mark_saved(str(20 + k), f"{shard.allocate_index()}.html", _url(20 + k))
+        return SimpleNamespace(wait=lambda: 0)
+
+    monkeypatch.setattr(get_html.subprocess, "Popen", _fake_popen)
+    get_html.run_local_shards(2, ["--processes", "2", "--ids", "1-100"])
+    crawl_env.state = CrawlState(state_file)
+    assert crawl_env.state.file_for_id("10") == "1.html"
+    assert crawl_env.state.is_seen("20") and crawl_env.state.is_seen("21")
+    assert crawl_env.state.unmapped_ids() == []
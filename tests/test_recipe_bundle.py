@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""分片数据包：详情往返、按分类分片、摘要字段和旧分片清理（保留上一版 manifest 引用的文件）"""
+
+import json
+
+import pytest
+
+from conftest import make_recipe
+from recipe_bundle import (
+    GENERATIONS_NAME, MANIFEST_NAME, SEARCH_PREFIX, SHARD_PREFIX, build_bundle, load_detail, main_category,
+)
+
+CATEGORIES = (("热菜", "家常菜"), ("凉菜",), ("汤羹", "营养"), ("早餐",))
+
+
+def _write(path, recipes):
+    path.write_text("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in recipes), encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def recipes():
+    return [make_recipe(f"菜谱{i}", categories=CATEGORIES[i % len(CATEGORIES)]) for i in range(23)]
+
+
+@pytest.mark.parametrize("shard_by", ["size", "category"])
+def test_details_roundtrip(tmp_path, recipes, shard_by):
+    input_file = _write(tmp_path / "recipes.ndjson", recipes)
+    manifest = build_bundle(input_file, tmp_path / "bundle", shard_by, shard_size=5)
+    assert [s["id"] for s in manifest["recipes"]] == [f"recipe_{i}" for i in range(len(recipes))]
+    for i, recipe in enumerate(recipes):
+        assert load_detail(tmp_path / "bundle", f"recipe_{i}") == recipe
+    if shard_by == "category":
+        # 同一分片内的菜谱主要分类相同
+        for shard in manifest["shards"]:
+            records = json.loads((tmp_path / "bundle" / shard).read_text(encoding="utf-8"))
+            assert len(records) <= 5
+            assert len({main_category(r) for r in records.values()}) == 1
+    else:
+        assert len(manifest["shards"]) == 5
+
+
+def test_summary_keeps_list_page_fields(tmp_path, recipes):
+    legacy = make_recipe("旧版菜谱")
+    for ing in legacy["main_ingredients"] + legacy["seasonings"]:
+        del ing["quantity"], ing["unit_id"]
+    input_file = _write(tmp_path / "recipes.ndjson", [recipes[0], legacy])
+    summaries = build_bundle(input_file, tmp_path / "bundle")["recipes"]
+    assert summaries[0]["description"] == recipes[0]["description"]
+    assert summaries[0]["categories"] == ["热菜", "家常菜"]
+    assert summaries[0]["cover"] == recipes[0]["cover_images"][0]
+    # 旧版提取结果按原始数量换算
+    assert summaries[1]["ingredients"] == [["鸡蛋", 200, "克"], ["番茄", 200, "克"], ["盐", None, "适量"]]
+
+
+def _files(manifest):
+    return {*manifest["shards"], manifest["search"]}
+
+
+def test_rebuild_keeps_previous_generation_and_prunes_older(tmp_path, recipes):
+    bundle = tmp_path / "bundle"
+    first = build_bundle(_write(tmp_path / "a.ndjson", recipes), bundle, shard_size=10)
+    # 只改最后一条：前两个分片内容不变，文件名不变
+    changed = recipes[:-1] + [make_recipe("新菜谱")]
+    second = build_bundle(_write(tmp_path / "b.ndjson", changed), bundle, shard_size=10)
+    assert second["shards"][:2] == first["shards"][:2]
+    assert second["shards"][2] != first["shards"][2]
+    # 仍持有上一版 manifest 的页面要能取到旧分片
+    on_disk = {p.name for p in bundle.iterdir()}
+    assert on_disk == {MANIFEST_NAME, GENERATIONS_NAME, *_files(first), *_files(second)}
+
+    third = build_bundle(_write(tmp_path / "c.ndjson", changed[:-1] + [make_recipe("又一个")]), bundle, shard_size=10)
+    on_disk = {p.name for p in bundle.iterdir()}
+    assert on_disk == {MANIFEST_NAME, GENERATIONS_NAME, *_files(second), *_files(third)}
+    assert first["shards"][2] not in on_disk
+    assert all(name.startswith((SHARD_PREFIX, SEARCH_PREFIX)) for name in on_disk - {MANIFEST_NAME, GENERATIONS_NAME})
+
+    # 内容不变的重复构建不挤掉上一版
+    build_bundle(_write(tmp_path / "d.ndjson", changed[:-1] + [make_recipe("又一个")]), bundle, shard_size=10)
+    assert second["shards"][2] in {p.name for p in bundle.iterdir()}
+
+    # keep-old 时不清理任何文件
+    build_bundle(_write(tmp_path / "e.ndjson", recipes), bundle, shard_size=10, prune=False)
+    build_bundle(_write(tmp_path / "f.ndjson", changed), bundle, shard_size=10, prune=False)
+    assert third["shards"][2] in {p.name for p in bundle.iterdir()}
+
+
+def test_first_rebuild_without_history_keeps_existing_manifest_files(tmp_path, recipes):
+    bundle = tmp_path / "bundle"
+    first = build_bundle(_write(tmp_path / "a.ndjson", recipes), bundle, shard_size=10)
+    # 升级前构建的数据包没有 generations.json
+    (bundle / GENERATIONS_NAME).unlink()
+    build_bundle(_write(tmp_path / "b.ndjson", recipes[:-1] + [make_recipe("新菜谱")]), bundle, shard_size=10)
+    assert _files(first) <= {p.name for p in bundle.iterdir()}
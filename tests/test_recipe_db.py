@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""SQLite 导出：全文检索与子串匹配一致（含单字查询）、增量 upsert 和清理"""
+
+import sqlite3
+import unicodedata
+
+import pytest
+
+from conftest import make_recipe
+from recipe_db import RecipeDatabase, bigram_tokens, parse_time_minutes
+
+NAMES = ("红烧鸡翅", "烧鸡", "可乐鸡翅膀", "翅", "番茄炒蛋", "鸡蛋羹", "凉拌黄瓜", "Apple派")
+
+
+@pytest.fixture
+def recipes():
+    return [
+        make_recipe(
+            name,
+            ingredients=("鸡翅", "可乐") if "翅" in name else ("鸡蛋", "黄瓜"),
+            categories=("热菜",) if i % 2 else ("凉菜", "家常菜"),
+            time=("十分钟", "半小时", "数小时")[i % 3],
+            tips="小火慢炖" if i % 3 == 0 else "",
+        )
+        for i, name in enumerate(NAMES)
+    ]
+
+
+@pytest.fixture
+def db(tmp_path, recipes):
+    db = RecipeDatabase(tmp_path / "recipes.db")
+    for recipe in recipes:
+        db.upsert(recipe)
+    yield db
+    db.close()
+
+
+def _fields(recipe):
+    """按空白切开的各字段片段；全文检索的词元不跨空白、不跨步骤"""
+    texts = [recipe["name"], recipe["description"], recipe["tips"], *(s["description"] for s in recipe["steps"])]
+    return [part for text in texts for part in unicodedata.normalize("NFKC", text).lower().split()]
+
+
+def _names(rows):
+    return {row["name"] for row in rows}
+
+
+def test_single_character_queries(db):
+    assert _names(db.search(text="翅")) == {"红烧鸡翅", "可乐鸡翅膀", "翅"}
+    assert {"红烧鸡翅", "烧鸡", "鸡蛋羹"} <= _names(db.search(text="鸡"))
+
+
+def test_fulltext_equals_substring_match(db, recipes):
+    fields = {r["name"]: _fields(r) for r in recipes}
+    queries = {t[i:i + n] for ts in fields.values() for t in ts for n in (1, 2, 3, 4) for i in range(len(t) - n + 1)}
+    # 英文和数字按词索引，子串等价只对中文成立
+    queries = {q for q in queries if q.isalnum() and not any(ch.isascii() for ch in q)}
+    assert len(queries) > 100
+    for query in sorted(queries):
+        expected = {name for name, ts in fields.items() if any(query in t for t in ts)}
+        assert _names(db.search(text=query, limit=100)) == expected, query
+
+
+def test_combined_filters(db):
+    assert _names(db.search(text="鸡翅", category="凉菜", max_minutes=30)) == {"红烧鸡翅"}
+    assert _names(db.search(ingredient="可乐", category="热菜")) == {"翅"}
+    assert parse_time_minutes("1.5小时") == 90 and parse_time_minutes("") is None
+
+
+def test_ascii_words_are_separate_tokens(tmp_path):
+    assert bigram_tokens("Pizza dough 披萨") == ["pizza", "dough", "披萨", "萨"]
+    recipe = make_recipe(
+        "玛格丽特披萨", description="Pizza dough with mozzarella cheese",
+        steps=[{"step": "1", "description": "烤箱预热"}, {"step": "2", "description": "放入饼底"}],
+    )
+    with RecipeDatabase(tmp_path / "ascii.db") as db:
+        db.upsert(recipe)
+        for query in ("cheese", "mozzarella cheese", "PIZZA", "dough 披萨"):
+            assert _names(db.search(text=query)) == {"玛格丽特披萨"}, query
+        # 不把相邻的词或步骤连起来
+        for query in ("pizzadough", "热放"):
+            assert _names(db.search(text=query)) == set(), query
+
+
+def test_upsert_is_incremental_and_prune_cascades(tmp_path, db, recipes):
+    assert db.upsert(recipes[0]) == "unchanged"
+    changed = dict(recipes[0], name="香煎鸡翅", description="香煎鸡翅的做法")
+    assert db.upsert(changed) == "updated"
+    assert _names(db.search(text="红烧")) == set()
+    assert "香煎鸡翅" in _names(db.search(text="香煎"))
+    before = db.counts()
+    assert db.prune([r["source_file"] for r in recipes[1:]]) == 1
+    after = db.counts()
+    assert after["recipes"] == before["recipes"] - 1
+    assert after["ingredients"] == before["ingredients"] - len(recipes[0]["main_ingredients"]) - 1
+    assert _names(db.search(text="香煎")) == set()
+
+
+def test_reopen_with_old_schema_rebuilds_fulltext(tmp_path, recipes):
+    path = tmp_path / "old.db"
+    with RecipeDatabase(path) as db:
+        for recipe in recipes:
+            db.upsert(recipe)
+    conn = sqlite3.connect(str(path))
+    conn.execute("UPDATE meta SET value = '1' WHERE key = 'schema_version'")
+    conn.execute("DELETE FROM recipes_fts")
+    conn.commit()
+    conn.close()
+    with RecipeDatabase(path) as db:
+        assert _names(db.search(text="翅")) == {"红烧鸡翅", "可乐鸡翅膀", "翅"}
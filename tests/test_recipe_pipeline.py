@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""后处理流水线：各阶段统计，以及并行与单进程结果一致"""
+
+import json
+
+import pytest
+
+from conftest import make_recipe
+from recipe_pipeline import DEFAULT_STAGES, STAGES, run_pipeline
+from recipe_stream import iter_recipes
+
+
+def _corpus():
+    recipes = []
+    for i in range(40):
+        recipe = make_recipe(f"菜谱{i}", ingredients=("鸡蛋", f"食材{i % 7}"))
+        if i % 5 == 0:
+            recipe["main_ingredients"] = []
+            recipe["seasonings"] = []
+        if i % 6 == 0:
+            recipe["steps"] = [{"step": "1", "description": ""}]
+        if i % 4 == 0:
+            recipe["name"] = f"  菜谱 \n {i} "
+            recipe["categories"] = ["热菜", "热菜", "家常菜"]
+        recipes.append(recipe)
+    recipes.append(make_recipe("   "))
+    return recipes
+
+
+@pytest.fixture
+def input_file(tmp_path):
+    path = tmp_path / "recipes.ndjson"
+    path.write_text("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in _corpus()), encoding="utf-8")
+    return path
+
+
+def test_stage_counts(input_file, tmp_path):
+    output = tmp_path / "out.json"
+    stats = run_pipeline(input_file, output, [STAGES[name] for name in DEFAULT_STAGES]).to_dict()
+    corpus = _corpus()
+    assert stats["total"] == len(corpus)
+    by_stage = {item["stage"]: item for item in stats["stages"]}
+    assert by_stage["normalize"]["dropped"] == 1  # 名称为空
+    assert by_stage["normalize"]["modified"] == 10
+    assert by_stage["empty_ingredients"]["dropped"] == 8
+    assert by_stage["missing_steps"]["input"] == len(corpus) - 1 - 8
+    kept = list(iter_recipes(output))
+    assert len(kept) == stats["written"]
+    assert all(r["main_ingredients"] and r["steps"][0]["description"] for r in kept)
+    normalized = next(r for r in kept if r["source_file"] == "菜谱4.html")
+    assert normalized["name"] == "菜谱 4"
+    assert normalized["categories"] == ["热菜", "家常菜"]
+
+
+def test_parallel_output_identical_to_serial(input_file, tmp_path):
+    stages = [STAGES[name] for name in (*DEFAULT_STAGES, "no_images")]
+    serial = run_pipeline(input_file, tmp_path / "serial.ndjson", stages, workers=1, batch_size=3)
+    parallel = run_pipeline(input_file, tmp_path / "parallel.ndjson", stages, workers=3, batch_size=3)
+    assert (tmp_path / "serial.ndjson").read_bytes() == (tmp_path / "parallel.ndjson").read_bytes()
+    assert serial.to_dict() == parallel.to_dict()
+
+
+def test_overwrites_input_in_place(input_file):
+    run_pipeline(input_file, stages=[STAGES["empty_ingredients"]])
+    assert all(r["main_ingredients"] or r["seasonings"] for r in iter_recipes(input_file))
+    assert not input_file.with_name(input_file.name + ".tmp").exists()
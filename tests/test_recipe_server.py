@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""本地查询服务：索引查询与逐条扫描一致、分页、LRU 响应缓存、ETag 和 gzip"""
+
+import gzip
+import http.client
+import json
+import threading
+from urllib.parse import quote
+
+import pytest
+
+from conftest import make_recipe
+from recipe_server import RecipeIndex, RecipeService, ResponseCache, make_server
+from search_index import normalize_ingredient_name, normalize_term
+
+DISHES = (
+    ("番茄炒蛋", ("番茄", "鸡蛋"), ("热菜", "家常菜"), "十分钟"),
+    ("鸡蛋羹", ("鸡蛋",), ("蒸菜",), "十分钟"),
+    ("红烧鸡翅", ("鸡翅", "可乐"), ("热菜",), "半小时"),
+    ("凉拌黄瓜", ("黄瓜", "蒜"), ("凉菜", "家常菜"), "十分钟"),
+    ("土豆炖牛肉", ("土豆", "牛肉", "番茄"), ("热菜",), "数小时"),
+    ("番茄蛋汤", ("番茄", "鸡蛋", "葱"), ("汤羹",), "十分钟"),
+    ("蛋炒饭", ("米饭", "鸡蛋"), ("主食", "家常菜"), "十分钟"),
+)
+
+
+@pytest.fixture(scope="module")
+def index(tmp_path_factory):
+    path = tmp_path_factory.mktemp("server") / "recipes.ndjson"
+    recipes = [
+        make_recipe(name, ingredients=ings, categories=cats, time=time, flavor="酸甜" if "番茄" in ings else "咸鲜")
+        for name, ings, cats, time in DISHES * 5
+    ]
+    path.write_text("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in recipes), encoding="utf-8")
+    return RecipeIndex(path)
+
+
+def _ingredients(recipe):
+    names = (ing["name"] for key in ("main_ingredients", "auxiliary_ingredients", "seasonings") for ing in recipe[key])
+    return {normalize_ingredient_name(name) for name in names} - {""}
+
+
+def _scan_search(index, query):
+    """逐条扫描：任一查询词（或整个查询）出现在菜名、食材、分类、口味中"""
+    words = [normalize_term(w) for w in query.split()] + [normalize_term(query)]
+    result = set()
+    for i, recipe in enumerate(index.recipes):
+        texts = [normalize_term(recipe["name"]), normalize_term(recipe["flavor"])]
+        texts += [normalize_term(c) for c in recipe["categories"]] + list(_ingredients(recipe))
+        if any(w and w in text for w in words for text in texts):
+            result.add(i)
+    return result
+
+
+def test_search_and_filter_match_linear_scan(index):
+    queries = ["番茄", "蛋", "鸡", "炒", "热菜", "酸甜", "番茄 牛肉", "黄瓜 蒜", "羹", "不存在"]
+    for query in queries:
+        assert set(index.search(query)) == _scan_search(index, query), query
+    ranked = index.search("番茄炒蛋")
+    assert index.recipes[ranked[0]]["name"] == "番茄炒蛋"
+
+    for category, ingredient, max_minutes in [("热菜", None, None), ("家常菜", "蛋", 10), (None, "番茄", 30), (None, None, 30)]:
+        expected = [
+            i for i, recipe in enumerate(index.recipes)
+            if (category is None or category in recipe["categories"])
+            and (ingredient is None or any(ingredient in name for name in _ingredients(recipe)))
+            and (max_minutes is None or index.minutes[i] is not None and index.minutes[i] <= max_minutes)
+        ]
+        assert index.filter(category=category, ingredient=ingredient, max_minutes=max_minutes) == expected
+
+
+def test_pantry_ranks_by_missing_then_matched(index):
+    have = ["鸡蛋", "番茄"]
+    ranked = index.pantry(have, max_missing=1)
+    expected = []
+    for i, recipe in enumerate(index.recipes):
+        needed = _ingredients(recipe)
+        matched = len(needed & set(have))
+        if matched and len(needed) - matched <= 1:
+            expected.append((i, len(needed) - matched, matched))
+    assert ranked == sorted(expected, key=lambda item: (item[1], -item[2], item[0]))
+    # 每道菜都还缺调料"盐"，缺少数相同时命中多的在前
+    assert index.recipes[ranked[0][0]]["name"] == "番茄炒蛋"
+
+
+def test_response_cache_is_lru():
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", ("ea", b"a", None))
+    cache.put("b", ("eb", b"b", None))
+    assert cache.get("a") is not None
+    cache.put("c", ("ec", b"c", None))
+    assert cache.get("b") is None
+    assert cache.get("a") == ("ea", b"a", None) and cache.get("c") is not None
+    assert cache.stats() == {"entries": 2, "hits": 3, "misses": 1}
+
+
+def test_service_pages_and_caches_by_normalized_query(index):
+    service = RecipeService(index, cache_size=16)
+    status, etag, body, gzipped = service.respond("/api/recipes?page_size=4&category=热菜")
+    data = json.loads(body)
+    assert status == 200 and data["total"] == len(index.filter(category="热菜"))
+    assert [item["id"] for item in data["items"]] == [f"recipe_{i}" for i in index.filter(category="热菜")[:4]]
+    # 参数顺序不同命中同一缓存项
+    assert service.respond("/api/recipes?category=热菜&page_size=4") == (status, etag, body, gzipped)
+    assert service.cache.stats()["hits"] == 1
+    assert service.respond("/api/recipes?page=0")[0] == 400
+    assert service.respond("/api/search")[0] == 400
+    assert service.respond("/api/recipes/recipe_9999")[0] == 404
+    assert service.cache.stats()["entries"] == 1
+
+
+@pytest.fixture(scope="module")
+def server(index):
+    server = make_server(index, port=0, cache_size=64, quiet=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server.server_address[:2]
+    server.shutdown()
+    server.server_close()
+
+
+def _get(address, target, headers=None):
+    conn = http.client.HTTPConnection(*address, timeout=10)
+    conn.request("GET", quote(target, safe="/?=&"), headers=headers or {})
+    response = conn.getresponse()
+    body = response.read()
+    conn.close()
+    return response, body
+
+
+def test_http_etag_and_gzip(server, index):
+    response, body = _get(server, "/api/recipes?page_size=50")
+    assert response.status == 200 and len(json.loads(body)["items"]) == 35
+    etag = response.getheader("ETag")
+    response, empty = _get(server, "/api/recipes?page_size=50", {"If-None-Match": etag})
+    assert response.status == 304 and empty == b""
+    response, zipped = _get(server, "/api/recipes?page_size=50", {"Accept-Encoding": "gzip"})
+    assert response.getheader("Content-Encoding") == "gzip" and gzip.decompress(zipped) == body
+
+    response, body = _get(server, "/api/recipes/recipe_2")
+    assert json.loads(body)["name"] == index.recipes[2]["name"]
+    response, body = _get(server, "/api/pantry?have=鸡蛋，番茄,盐&max_missing=0")
+    items = json.loads(body)["items"]
+    assert items and all(item["missing"] == 0 for item in items)
+
+
+def test_non_ascii_digit_ids_are_not_found(index):
+    service = RecipeService(index, cache_size=16)
+    for recipe_id in ("recipe_²", "recipe_١", "recipe_", "recipe_-1"):
+        assert service.respond(f"/api/recipes/{recipe_id}")[0] == 404, recipe_id
+    assert json.loads(service.respond("/api/recipes/recipe_1")[2])["id"] == "recipe_1"
+
+
+def test_cache_key_escapes_parameter_values(index):
+    service = RecipeService(index, cache_size=16)
+    # 未转义时两者的键都是 category=热菜&page_size=2
+    first = json.loads(service.respond("/api/recipes?category=" + quote("热菜&page_size=2"))[2])
+    second = json.loads(service.respond("/api/recipes?category=" + quote("热菜") + "&page_size=2")[2])
+    assert first["total"] == 0
+    assert second["total"] == len(index.filter(category="热菜")) and second["page_size"] == 2
+    assert service.cache.stats()["hits"] == 0
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""搜索倒排索引：候选集合覆盖与前端相同的逐条扫描结果"""
+
+import random
+
+import pytest
+
+from conftest import ROOT, make_recipe
+from extract_recipe import extract_recipe_info
+from search_index import INGREDIENT_FIELDS, build_search_index, lookup, normalize_ingredient_name, normalize_term, scan
+
+DESCRIPTIONS = ("外焦里嫩，老少皆宜", "Crispy and juicy", "", "下饭神器！")
+NAMES = ("红烧鸡翅", "可乐鸡翅", "番茄炒蛋", "蛋炒饭", "鸡蛋羹", "酸辣土豆丝", "土豆炖牛肉", "清炒土豆片", "ＡＢＣ沙拉", "翅")
+INGREDIENTS = ("鸡翅", "鸡蛋（大）", "番茄", "土豆", "牛肉(肋条)", "米饭", "可乐", "Olive Oil")
+
+
+@pytest.fixture(scope="module")
+def recipes():
+    rng = random.Random(7)
+    corpus = [extract_recipe_info(path) for path in sorted((ROOT / "bench_fixtures").glob("*.html"))]
+    for i in range(200):
+        corpus.append(make_recipe(
+            rng.choice(NAMES) + ("" if i % 3 else str(i)),
+            ingredients=rng.sample(INGREDIENTS, 3),
+            categories=rng.sample(("热菜", "家常菜", "快手菜", "汤羹", "早餐"), 2),
+            flavor=rng.choice(("咸鲜", "酸甜", "香辣", "")),
+            technique=rng.choice(("炒", "红烧", "清蒸", "")),
+            description=rng.choice(DESCRIPTIONS),
+        ))
+    return corpus
+
+
+def _queries(recipes):
+    # 只出现在描述中的词、被规范化去掉的括号注释和标点、只出现在工艺中的词
+    queries = {"鸡", "翅", "土豆 牛肉", "ａｂｃ", "olive", "olive oil", "家常", "甜", "蛋 饭", "不存在的菜"}
+    queries |= {"外焦", "老少皆宜", "juicy", "and juicy", "神器！", "（大）", "大", "肋条", "(肋", "清蒸", "红烧"}
+    for recipe in recipes:
+        name = normalize_term(recipe["name"])
+        queries.update(name[i:i + n] for n in (1, 2, 3) for i in range(len(name) - n + 1))
+        queries.update(normalize_ingredient_name(ing["name"]) for f in INGREDIENT_FIELDS for ing in recipe[f])
+        queries.update(recipe["categories"])
+        description = recipe["description"].lower()
+        queries.update(description[i:i + 3] for i in range(0, len(description) - 2, 5))
+    return sorted(q for q in queries if q.strip())
+
+
+def test_candidates_cover_every_linear_scan_hit(recipes):
+    index = build_search_index(recipes)
+    descriptions = [r["description"] for r in recipes]
+    for query in _queries(recipes):
+        scanned = scan(recipes, query)
+        found = lookup(index, query, descriptions)
+        assert scanned <= found, query
+
+
+def test_description_and_raw_ingredient_hits_are_candidates(recipes):
+    index = build_search_index(recipes)
+    descriptions = [r["description"] for r in recipes]
+    juicy = {i for i, r in enumerate(recipes) if "juicy" in r["description"].lower()}
+    assert juicy and scan(recipes, "juicy") == juicy
+    assert juicy <= lookup(index, "juicy", descriptions)
+    # "大" 只在括号注释里，规范化食材名中没有，靠原始食材名命中
+    large = {i for i, r in enumerate(recipes) if any("鸡蛋（大）" == ing["name"] for ing in r["main_ingredients"])}
+    assert large and large <= scan(recipes, "大") <= lookup(index, "大", descriptions)
+
+
+def test_non_name_fields_match_exactly(recipes):
+    """食材、分类、口味按词表子串匹配，没有多余候选；多余的候选只能来自菜名字组的交集"""
+    index = build_search_index(recipes)
+    for query in ("鸡蛋", "牛肉", "家常菜", "酸甜", "olive"):
+        extra = lookup(index, query, fuzzy=False) - scan(recipes, query)
+        assert all(set(query) <= set(normalize_term(recipes[i]["name"])) for i in extra), query
+
+
+def test_postings_are_sorted_and_df_consistent(recipes):
+    index = build_search_index(recipes)
+    assert index["doc_count"] == len(recipes)
+    for field in ("names", "ingredients", "ingredient_names", "categories", "flavors", "techniques"):
+        for term, ordinals in index[field].items():
+            assert ordinals == sorted(set(ordinals)), (field, term)
+    # 括号注释不影响规范化后的食材名，df 即含该食材的菜谱数
+    egg = [
+        i for i, r in enumerate(recipes)
+        if any(normalize_ingredient_name(ing["name"]) == "鸡蛋" for f in INGREDIENT_FIELDS for ing in r[f])
+    ]
+    assert index["ingredients"]["鸡蛋"] == egg